@@ -1,7 +1,7 @@
 #!/usr/bin/env python3
 import cv2
 import argparse
-from vision.core.capture_source import CaptureSource, FpsLimiter
+from vision.core.capture_source import CaptureSource, FpsLimiter, parse_pyramid_scales
 
 CAMERA_DIRECTION = "forward"
 CAMERA_INDEX = 0
@@ -29,6 +29,8 @@ if __name__ == "__main__":
                         help='Device index (default=0)')
     parser.add_argument('--fps', default=15, type=int,
                         help='Capture speed (default=15)')
+    parser.add_argument('--pyramid', type=parse_pyramid_scales, default=[],
+                        help="also publish downscaled copies, e.g. '2,4' adds <direction>@2 and <direction>@4")
     args = parser.parse_args()
 
     CAMERA_DIRECTION = args.direction
@@ -36,5 +38,7 @@ if __name__ == "__main__":
     CAMERA_FPS = args.fps
 
     cs = CaptureSource()
+    if args.pyramid:
+        cs.pyramid(CAMERA_DIRECTION, *args.pyramid)
     cs.register_capture_udl(CAMERA_DIRECTION, generic_capture)
     cs.run_event_loop()
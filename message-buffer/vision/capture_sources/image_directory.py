@@ -1,39 +1,166 @@
 #!/usr/bin/env python3
 
 import os
+import re
 import cv2
 import argparse
-import itertools
+import numpy as np
 
-from typing import Tuple
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Tuple
 
-from vision.core.capture_source import CaptureSource, FpsLimiter
+from vision.core.capture_source import CaptureSource, FpsLimiter, parse_pyramid_scales
+
+IMAGE_EXTENSIONS = {'.bmp', '.jpeg', '.jpg', '.png', '.ppm', '.tif', '.tiff', '.webp'}
+
+
+def _natural_key(name: str):
+    # 'img2.png' sorts before 'img10.png'
+    return [int(part) if part.isdigit() else part.lower() for part in re.split(r'(\d+)', name)]
+
+
+def _timestamp_key(name: str):
+    # the longest number in the name is taken as its timestamp, e.g. 'forward_1712345678.123.png'
+    numbers = re.findall(r'\d+(?:\.\d+)?', os.path.splitext(name)[0])
+    if not numbers:
+        return (1, 0.0, name)
+    return (0, float(max(numbers, key=len)), name)
+
+
+ORDERINGS: Dict[str, Callable[[str], object]] = {
+    'sorted': lambda name: name,
+    'natural': _natural_key,
+    'timestamp': _timestamp_key,
+}
+
+
+def list_images(directory: str, order: str) -> List[str]:
+    """
+    Lists the image files of a directory without reading them.
+
+    Args:
+        directory: directory to list.
+        order: one of 'sorted', 'natural' or 'timestamp'.
+
+    Returns:
+        paths of the images in playback order.
+    """
+    names = [name for name in os.listdir(directory)
+             if os.path.splitext(name)[1].lower() in IMAGE_EXTENSIONS]
+    names.sort(key=ORDERINGS[order])
+    return [os.path.join(directory, name) for name in names]
+
+
+class ImageStream:
+    """
+    Decodes images on demand. A thread pool decodes the next few images ahead of
+    playback, and decoded images are kept in a cache bounded in megabytes, so a
+    directory that fits in the cache is only decoded once while looping. Playback
+    is sequential, so evicting the least recently used image would always evict
+    the one needed next in a directory larger than the cache. Instead the cache
+    fills up with the images played first and keeps them, which saves decoding
+    that prefix on every loop.
+    """
+
+    def __init__(self, paths: List[str], workers: int, prefetch: int, cache_mb: float, loop: bool):
+        """
+        Args:
+            paths: images in playback order.
+            workers: decoder threads.
+            prefetch: images to decode ahead of playback.
+            cache_mb: memory bound of the decoded image cache.
+            loop: whether playback wraps around, which makes prefetching wrap too.
+        """
+        self._paths = paths
+        self._prefetch = prefetch
+        self._cache_bytes = int(cache_mb * (1 << 20))
+        self._loop = loop
+
+        self._pool = ThreadPoolExecutor(max_workers=max(1, workers))
+        self._pending: Dict[int, Future] = {}
+        self._cache: Dict[int, np.ndarray] = {}
+        self._cached_bytes = 0
+
+    def __len__(self):
+        return len(self._paths)
+
+    def close(self):
+        for future in self._pending.values():
+            future.cancel()
+        self._pool.shutdown(wait=True)
+
+    def get(self, idx: int) -> Optional[np.ndarray]:
+        """
+        Args:
+            idx: position in playback order.
+
+        Returns:
+            the decoded image, or None if the file could not be read.
+        """
+        image = self._cache.get(idx)
+        if image is None:
+            future = self._pending.pop(idx, None)
+            image = future.result() if future is not None else self._read(idx)
+            if image is not None:
+                self._insert(idx, image)
+
+        self._schedule(idx)
+        return image
+
+    def _read(self, idx: int) -> Optional[np.ndarray]:
+        return cv2.imread(self._paths[idx])  # type: ignore
+
+    def _insert(self, idx: int, image: np.ndarray):
+        # a full cache keeps what it has, see the class docstring
+        if self._cached_bytes + image.nbytes > self._cache_bytes:
+            return
+
+        self._cache[idx] = image
+        self._cached_bytes += image.nbytes
+
+    def _schedule(self, idx: int):
+        for ahead in range(1, self._prefetch + 1):
+            nxt = idx + ahead
+            if nxt >= len(self._paths):
+                if not self._loop:
+                    break
+                nxt %= len(self._paths)
+
+            if nxt not in self._cache and nxt not in self._pending:
+                self._pending[nxt] = self._pool.submit(self._read, nxt)
 
 
 def image_direction_capture(fps: FpsLimiter, t: Tuple[argparse.Namespace]):
     args = t[0]
 
-    images = []
-    for name in os.listdir(args.directory):
-        filename = os.path.join(args.directory, name)
-        image = cv2.imread(filename)  # type: ignore
-        if image is not None:
-            images.append(image)
+    paths = list_images(args.directory, args.order)
+    if not paths:
+        return
 
-    if args.no_loop:
-        # use a regular iterator if we shouldn't loop
-        image_iter = iter(images)
-    else:
-        # use a looping iterator if we should loop
-        image_iter = itertools.cycle(images)
+    stream = ImageStream(paths, args.workers, args.prefetch, args.cache_mb, not args.no_loop)
+    try:
+        idx = 0
+        unreadable = 0
+        for acquisition_time in fps.rate(args.fps):
+            if idx == len(stream):
+                if args.no_loop:
+                    return
+                idx = 0
 
-    for acquisition_time in fps.rate(args.fps):
-        next_image = next(image_iter, None)
+            next_image = stream.get(idx)
+            idx += 1
 
-        if next_image is None:
-            return
-        
-        yield args.direction, acquisition_time, next_image
+            if next_image is None:
+                # give up once every file in a row turned out to be unreadable
+                unreadable += 1
+                if unreadable == len(stream):
+                    return
+                continue
+            unreadable = 0
+
+            yield args.direction, acquisition_time, next_image
+    finally:
+        stream.close()
 
 
 def main():
@@ -45,10 +172,30 @@ def main():
                         help='FPS to run the module at')
     parser.add_argument('--no-loop', action='store_true',
                         help='disable looping')
+    parser.add_argument('--order', choices=sorted(ORDERINGS), default='sorted',
+                        help="playback order: 'sorted' by name, 'natural' (img2 before img10), "
+                             "or 'timestamp' parsed from the file name (default=sorted)")
+    parser.add_argument('--workers', default=2, type=int,
+                        help='threads decoding images (default=2)')
+    parser.add_argument('--prefetch', default=8, type=int,
+                        help='images decoded ahead of playback (default=8)')
+    parser.add_argument('--cache-mb', default=512.0, type=float,
+                        help='memory for decoded images kept for looping; in a larger directory the first images are kept (default=512)')
+    parser.add_argument('--lockstep', action='store_true',
+                        help='write each frame only after every reader read the previous one, '
+                             'which plays back as fast as the slowest module')
+    parser.add_argument('--readers', type=int, default=1,
+                        help='readers to wait for before the first frame in lockstep mode (default=1)')
+    parser.add_argument('--pyramid', type=parse_pyramid_scales, default=[],
+                        help="also publish downscaled copies, e.g. '2,4' adds <direction>@2 and <direction>@4")
 
     args = parser.parse_args()
 
     cs = CaptureSource()
+    if args.lockstep:
+        cs.lockstep(args.readers)
+    if args.pyramid:
+        cs.pyramid(args.direction, *args.pyramid)
     cs.register_capture_udl(
         args.direction, image_direction_capture, args=(args, ))
     cs.run_event_loop()
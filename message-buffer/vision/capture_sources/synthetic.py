@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+import cv2
+import struct
+import argparse
+import numpy as np
+from typing import Callable, Dict, Tuple
+
+from vision.core.capture_source import CaptureSource, FpsLimiter, parse_pyramid_scales
+
+DTYPES: Dict[str, type] = {
+    'u8': np.uint8,
+    'i8': np.int8,
+    'i32': np.int32,
+    'f32': np.float32,
+    'f64': np.float64,
+}
+"""element types the camera message framework can carry that opencv can draw on"""
+
+COUNTER_BYTES = 8
+"""the frame index is stored little endian in the first bytes of every frame"""
+
+
+def _size(arg: str) -> Tuple[int, int]:
+    presets = {'vga': (640, 480), '720p': (1280, 720), '1080p': (1920, 1080), '4k': (3840, 2160)}
+    if arg.lower() in presets:
+        return presets[arg.lower()]
+    width, height = arg.lower().split('x')
+    return int(width), int(height)
+
+
+def _bars(height: int, width: int, channels: int) -> np.ndarray:
+    # eight horizontal bars of distinct intensity per channel
+    rows = np.arange(height) * 8 // height
+    levels = np.stack([(rows >> c) & 1 for c in range(channels)], axis=-1) * 0.75 + 0.125
+    return np.broadcast_to(levels[:, None, :], (height, width, channels))
+
+
+def _gradient(height: int, width: int, channels: int) -> np.ndarray:
+    ramp = np.abs(np.linspace(-1.0, 1.0, height))[:, None]
+    return np.broadcast_to((1 - ramp)[..., None], (height, width, channels))
+
+
+def _checker(height: int, width: int, channels: int) -> np.ndarray:
+    square = max(8, width // 32)
+    y, x = np.mgrid[0:height, 0:width]
+    board = ((y // square + x // square) & 1).astype(np.float32)
+    return np.broadcast_to(board[..., None], (height, width, channels))
+
+
+def _noise(height: int, width: int, channels: int) -> np.ndarray:
+    return np.random.default_rng(0).random((height, width, channels), dtype=np.float32)
+
+
+def _solid(height: int, width: int, channels: int) -> np.ndarray:
+    return np.full((height, width, channels), 0.5, dtype=np.float32)
+
+
+PATTERNS: Dict[str, Callable[[int, int, int], np.ndarray]] = {
+    'bars': _bars,
+    'gradient': _gradient,
+    'checker': _checker,
+    'noise': _noise,
+    'solid': _solid,
+}
+
+
+def _scale_to(pattern: np.ndarray, dtype: type) -> np.ndarray:
+    """pattern values in [0, 1] to the range of the element type"""
+    if np.issubdtype(dtype, np.floating):
+        return pattern.astype(dtype)
+    top = min(np.iinfo(dtype).max, 255)
+    return (pattern * top).astype(dtype)
+
+
+class SyntheticCamera:
+    """
+    Produces frames of any size, element type and channel count without a device
+    or a decoder. A pattern is rendered once onto a canvas taller than the frame,
+    and each frame is a contiguous window of it that moves down by `speed` rows,
+    so the per-frame cost is a copy at most, and nothing when frames carry no
+    counter.
+    """
+
+    def __init__(self, width: int, height: int, channels: int, dtype: type,
+                 pattern: str, speed: int, counter: bool):
+        """
+        Args:
+            width: frame width.
+            height: frame height.
+            channels: channels per pixel, 1 produces two dimensional frames.
+            dtype: element type.
+            pattern: one of PATTERNS.
+            speed: rows the pattern moves per frame, 0 for a still pattern.
+            counter: embed the frame index in every frame, both as text and in
+                the first COUNTER_BYTES bytes.
+        """
+        self._height = height
+        self._speed = speed
+        self._counter = counter
+        self._index = 0
+
+        canvas = _scale_to(PATTERNS[pattern](height, width, channels), dtype)
+        if speed:
+            # the pattern twice on top of each other, so every window wraps around
+            canvas = np.concatenate([canvas, canvas])
+        canvas = np.ascontiguousarray(canvas[..., 0] if channels == 1 else canvas)
+        self._canvas = canvas
+        self._frame = np.empty_like(self._canvas[:height])
+
+        self._text_scale = max(1.0, height / 360)
+        self._text_color = float(min(np.iinfo(dtype).max, 255)) if np.issubdtype(dtype, np.integer) else 1.0
+
+    def next(self) -> np.ndarray:
+        """
+        Returns:
+            the next frame. It is only valid until the next call.
+        """
+        offset = (self._index * self._speed) % self._height if self._speed else 0
+        window = self._canvas[offset:offset + self._height]
+
+        if self._counter:
+            np.copyto(self._frame, window)
+            window = self._frame
+
+            cv2.putText(window, str(self._index), (16, int(48 * self._text_scale)),  # type: ignore
+                        cv2.FONT_HERSHEY_SIMPLEX, self._text_scale,  # type: ignore
+                        (self._text_color,) * 4, max(1, int(2 * self._text_scale)))
+            window.reshape(-1).view(np.uint8)[:COUNTER_BYTES] = np.frombuffer(
+                struct.pack('<Q', self._index), dtype=np.uint8)
+
+        self._index += 1
+        return window
+
+
+def read_counter(frame: np.ndarray) -> int:
+    """
+    Args:
+        frame: a frame produced by SyntheticCamera with counters enabled.
+
+    Returns:
+        the index of the frame, e.g. for readers to count dropped frames.
+    """
+    return struct.unpack('<Q', np.ascontiguousarray(frame).reshape(-1).view(np.uint8)[:COUNTER_BYTES].tobytes())[0]
+
+
+def synthetic_capture(fps: FpsLimiter, t: Tuple[argparse.Namespace]):
+    args = t[0]
+
+    width, height = args.size
+    camera = SyntheticCamera(width, height, args.channels, DTYPES[args.dtype],
+                             args.pattern, args.speed, not args.no_counter)
+
+    for acquisition_time in fps.rate(args.fps):
+        yield args.direction, acquisition_time, camera.next()
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Generate synthetic frames to load test the vision bus, modules and webserver')
+    parser.add_argument('direction', default='forward', nargs='?',
+                        help='direction to write frames to (default=forward)')
+    parser.add_argument('--size', type=_size, default=(1280, 720),
+                        help="frame size as WIDTHxHEIGHT, or one of vga, 720p, 1080p, 4k (default=1280x720)")
+    parser.add_argument('--dtype', choices=list(DTYPES), default='u8',
+                        help='element type (default=u8)')
+    parser.add_argument('--channels', type=int, choices=[1, 2, 3, 4], default=3,
+                        help='channels per pixel (default=3)')
+    parser.add_argument('--fps', type=float, default=30.0,
+                        help='publish rate, 0 for as fast as possible (default=30)')
+    parser.add_argument('--pattern', choices=sorted(PATTERNS), default='bars',
+                        help='test pattern (default=bars)')
+    parser.add_argument('--speed', type=int, default=4,
+                        help='rows the pattern moves per frame, 0 for a still image (default=4)')
+    parser.add_argument('--no-counter', action='store_true',
+                        help='do not embed the frame index, which saves a copy per frame')
+    parser.add_argument('--streams', type=int, default=1,
+                        help='independent streams published as <direction>, <direction>1, ... (default=1)')
+    parser.add_argument('--report', type=float, default=5.0,
+                        help='seconds between publish rate and write time reports (default=5)')
+    parser.add_argument('--pyramid', type=parse_pyramid_scales, default=[],
+                        help="also publish downscaled copies, e.g. '2,4' adds <direction>@2 and <direction>@4")
+
+    args = parser.parse_args()
+
+    cs = CaptureSource()
+    cs.PACING_REPORT_PERIOD = args.report
+    for stream in range(args.streams):
+        stream_args = argparse.Namespace(**vars(args))
+        if stream > 0:
+            stream_args.direction = f'{args.direction}{stream}'
+        if args.pyramid:
+            cs.pyramid(stream_args.direction, *args.pyramid)
+        cs.register_capture_udl(stream_args.direction, synthetic_capture, args=(stream_args, ))
+    cs.run_event_loop()
+
+
+if __name__ == '__main__':
+    main()
@@ -1,32 +1,311 @@
 #!/usr/bin/env python3
 import os
 import cv2
+import json
+import queue
+import hashlib
 import argparse
-from typing import Tuple, List
-from vision.core.capture_source import CaptureSource, FpsLimiter
+import threading
+import numpy as np
+from typing import Tuple, List, Optional
+from vision.core.capture_source import CaptureSource, FpsLimiter, parse_pyramid_scales
 
 
-def video_to_directions(fps_limiter: FpsLimiter, args: Tuple[str, List[str], bool]):
-    source = args[0]
-    directions = args[1]
-    loop = args[2]
+_END = None
+
+
+class DecodeAhead:
+    """
+    Decodes a video on background threads ahead of playback. The file is split
+    into one contiguous segment per decoder thread; each thread decodes its
+    segment into a bounded queue and, when looping, seeks back to the start of
+    its segment while the other segments play. The consumer drains the segments
+    in order, so the next pass of a looping video is already decoded before the
+    wrap and seeking never stalls playback.
+    """
+
+    def __init__(self, source: str, frame_count: int, decoders: int = 1,
+                 queue_size: int = 16, loop: bool = False):
+        """
+        Args:
+            source: path of the video file.
+            frame_count: number of frames in the file, or <= 0 if unknown.
+            decoders: number of decoder threads, ignored if the frame count is unknown.
+            queue_size: frames each decoder may decode ahead.
+            loop: restart every segment after it is played.
+        """
+        decoders = max(1, decoders) if frame_count > 0 else 1
+        bounds = [frame_count * i // decoders for i in range(decoders + 1)]
+        if frame_count <= 0:
+            bounds = [0, -1]
+
+        self._source = source
+        self._loop = loop
+        self._stop = threading.Event()
+        self._segments = list(zip(bounds[:-1], bounds[1:]))
+        self._queues: List[queue.Queue] = [queue.Queue(maxsize=queue_size) for _ in self._segments]
+        self._threads = [
+            threading.Thread(target=self._decode, args=(idx,), daemon=True)
+            for idx in range(len(self._segments))
+        ]
+        # segments a decoder found without any frame, skipped without waiting on their queue
+        self._empty = [False] * len(self._segments)
+        self._current = 0
+
+    def __enter__(self):
+        for thread in self._threads:
+            thread.start()
+        return self
+
+    def __exit__(self, *_):
+        self._stop.set()
+        for thread in self._threads:
+            thread.join()
+
+    def next(self) -> Optional[np.ndarray]:
+        """
+        Returns:
+            the next frame in playback order, or None at the end of a video that does not loop.
+        """
+        exhausted = 0
+        while not self._stop.is_set():
+            if self._empty[self._current]:
+                # e.g. a segment past the real end of a video whose frame count was
+                # overestimated. It is skipped, until every segment turned out empty
+                exhausted += 1
+                if exhausted == len(self._segments):
+                    return None
+                frame = _END
+            else:
+                try:
+                    frame = self._queues[self._current].get(timeout=0.5)
+                except queue.Empty:
+                    if self._threads[self._current].is_alive() or not self._queues[self._current].empty():
+                        continue
+                    # the decoder stopped without finishing its segment
+                    return None
+
+            if frame is not _END:
+                return frame
+
+            self._current += 1
+            if self._current == len(self._segments):
+                if not self._loop:
+                    return None
+                self._current = 0
+        return None
+
+    def _put(self, idx: int, item: Optional[np.ndarray]) -> bool:
+        while not self._stop.is_set():
+            try:
+                self._queues[idx].put(item, timeout=0.5)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    @staticmethod
+    def _seek(cap, start: int) -> int:
+        """
+        Seek close to a frame. Some backends land on the keyframe before it, those
+        frames are decoded and dropped. Backends that land after it without saying
+        so cannot be corrected, so segments of such files may skip a few frames.
+
+        Returns:
+            the position the capture reports after seeking.
+        """
+        cap.set(cv2.CAP_PROP_POS_FRAMES, start)  # type: ignore
+        position = int(cap.get(cv2.CAP_PROP_POS_FRAMES))  # type: ignore
+        while position < start and cap.grab():
+            position += 1
+        return position
+
+    def _decode(self, idx: int):
+        start, end = self._segments[idx]
+        cap = cv2.VideoCapture(self._source)  # type: ignore
+        try:
+            rewind = start > 0
+            while not self._stop.is_set():
+                position = self._seek(cap, start) if rewind else start
+                rewind = True
+
+                played = 0
+                while end < 0 or position < end:
+                    ok, frame = cap.read()
+                    # the frame count in the container can be an estimate
+                    if not ok or frame is None:
+                        break
+                    if not self._put(idx, frame):
+                        return
+                    position += 1
+                    played += 1
+
+                # a segment without any readable frame would loop forever
+                if played == 0:
+                    self._empty[idx] = True
+                if not self._put(idx, _END) or not self._loop or played == 0:
+                    return
+        finally:
+            cap.release()
+
+
+def _file_hash(path: str) -> str:
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class FrameStore:
+    """
+    Every frame of a video decoded once into one contiguous raw array, so looping
+    costs a memory copy per frame instead of a decode. A disk store is a memory
+    mapped file named after the hash of the video and the stored resolution, and
+    is reused by later runs; a memory store lives only as long as the process.
+    """
+
+    def __init__(self, frames: np.ndarray):
+        self._frames = frames
+
+    def __len__(self):
+        return self._frames.shape[0]
+
+    def __getitem__(self, idx: int) -> np.ndarray:
+        return self._frames[idx]
+
+    @staticmethod
+    def _decode(source: str, scale: float):
+        cap = cv2.VideoCapture(source)  # type: ignore
+        try:
+            while True:
+                ok, frame = cap.read()
+                if not ok or frame is None:
+                    return
+                if scale != 1.0:
+                    frame = cv2.resize(frame, None, fx=scale, fy=scale,  # type: ignore
+                                       interpolation=cv2.INTER_AREA)  # type: ignore
+                yield frame
+        finally:
+            cap.release()
+
+    @staticmethod
+    def _valid_meta(raw_path: str, meta_path: str) -> Optional[dict]:
+        """the metadata of a complete store, or None if it has to be (re)built"""
+        try:
+            with open(meta_path) as f:
+                meta = json.load(f)
+            size = meta['count'] * int(np.prod(meta['shape'])) * np.dtype(meta['dtype']).itemsize
+            if os.path.getsize(raw_path) == size:
+                return meta
+        except (OSError, ValueError, KeyError, TypeError):
+            pass
+        return None
+
+    @classmethod
+    def in_memory(cls, source: str, scale: float = 1.0) -> 'FrameStore':
+        cap = cv2.VideoCapture(source)  # type: ignore
+        expected = max(1, int(cap.get(cv2.CAP_PROP_FRAME_COUNT)))  # type: ignore
+        cap.release()
+
+        # one buffer sized from the reported frame count, grown or trimmed in place
+        # when the count was wrong, so the frames are never held twice
+        frames: Optional[np.ndarray] = None
+        count = 0
+        for frame in cls._decode(source, scale):
+            if frames is None:
+                frames = np.empty((expected, *frame.shape), dtype=frame.dtype)
+            elif count == frames.shape[0]:
+                frames.resize((2 * count, *frame.shape), refcheck=False)
+            frames[count] = frame
+            count += 1
+        if frames is None:
+            raise RuntimeError(f"'{source}' has no readable frames")
+        if count != frames.shape[0]:
+            frames.resize((count, *frames.shape[1:]), refcheck=False)
+        return cls(frames)
+
+    @classmethod
+    def on_disk(cls, source: str, cache_dir: str, scale: float = 1.0) -> 'FrameStore':
+        """
+        Args:
+            source: video file.
+            cache_dir: directory holding the stores.
+            scale: resize factor applied before storing.
+
+        Returns:
+            the cached store of this video, decoded first if there is none yet.
+        """
+        cap = cv2.VideoCapture(source)  # type: ignore
+        width = round(cap.get(cv2.CAP_PROP_FRAME_WIDTH) * scale)  # type: ignore
+        height = round(cap.get(cv2.CAP_PROP_FRAME_HEIGHT) * scale)  # type: ignore
+        cap.release()
+
+        os.makedirs(cache_dir, exist_ok=True)
+        stem = os.path.join(cache_dir, f'{_file_hash(source)}_{width}x{height}')
+        raw_path, meta_path = stem + '.raw', stem + '.json'
+
+        meta = cls._valid_meta(raw_path, meta_path)
+        if meta is None:
+            count, shape, dtype = 0, None, None
+            tmp_path = f'{raw_path}.{os.getpid()}.tmp'
+            with open(tmp_path, 'wb') as f:
+                for frame in cls._decode(source, scale):
+                    shape, dtype = frame.shape, frame.dtype
+                    frame.tofile(f)
+                    count += 1
+            if count == 0:
+                os.unlink(tmp_path)
+                raise RuntimeError(f"'{source}' has no readable frames")
+
+            # both files are replaced whole, and a store is only used once the size
+            # of its frames matches its metadata
+            meta = {'count': count, 'shape': list(shape), 'dtype': str(dtype)}
+            os.replace(tmp_path, raw_path)
+            tmp_path = f'{meta_path}.{os.getpid()}.tmp'
+            with open(tmp_path, 'w') as f:
+                json.dump(meta, f)
+            os.replace(tmp_path, meta_path)
+
+        frames = np.memmap(raw_path, dtype=np.dtype(meta['dtype']), mode='r',
+                           shape=(meta['count'], *meta['shape']))
+        return cls(frames)
+
+
+def video_to_directions(fps_limiter: FpsLimiter, args: Tuple[str, List[str], argparse.Namespace]):
+    source, directions, options = args
 
     cap = cv2.VideoCapture(source)  # type: ignore
     target_fps = cap.get(cv2.CAP_PROP_FPS)  # type: ignore
+    frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))  # type: ignore
+    cap.release()
 
+    if options.cache != 'off':
+        if options.cache == 'disk':
+            store = FrameStore.on_disk(source, options.cache_dir, options.cache_scale)
+        else:
+            store = FrameStore.in_memory(source, options.cache_scale)
 
-    for curr_time in fps_limiter.rate(target_fps):
-        _, next_img = cap.read()
+        idx = 0
+        for curr_time in fps_limiter.rate(target_fps):
+            if idx == len(store):
+                if not options.loop:
+                    break
+                idx = 0
 
-        if next_img is None:
-            if loop:
-                cap.set(cv2.CAP_PROP_POS_FRAMES, 0) # type: ignore
-                continue
-            else:
+            next_img = store[idx]
+            idx += 1
+            yield directions[0], curr_time, next_img
+        return
+
+    with DecodeAhead(source, frame_count, options.decoders, options.queue_size, options.loop) as frames:
+        for curr_time in fps_limiter.rate(target_fps):
+            next_img = frames.next()
+            if next_img is None:
                 break
 
-        for direction in directions:
-            yield direction, curr_time, next_img
+            # the other directions are aliases of the first, see CaptureSource.alias
+            yield directions[0], curr_time, next_img
 
 
 if __name__ == '__main__':
@@ -34,6 +313,27 @@ if __name__ == '__main__':
     parser = argparse.ArgumentParser(
         f"{__file__}", description='CLI to pipe video frames into a vision module')
     parser.add_argument('--loop', action='store_true', help='loop video forever')
+    parser.add_argument('--decoders', type=int, default=1,
+                        help='threads decoding separate segments of each video ahead of playback. Segments '
+                             'start at seeks, which are not frame accurate for every codec, so frames at a '
+                             'segment boundary may repeat or be skipped with more than one (default=1)')
+    parser.add_argument('--queue-size', type=int, default=16,
+                        help='frames each decoder may decode ahead (default=16)')
+    parser.add_argument('--cache', choices=['off', 'memory', 'disk'], default='off',
+                        help="decode each video once and replay it from raw frames kept in 'memory', "
+                             "or in a 'disk' store that later runs reuse (default=off)")
+    parser.add_argument('--cache-dir', default=os.path.join(
+                            os.environ.get('XDG_CACHE_HOME', os.path.expanduser('~/.cache')), 'auv-vision'),
+                        help='directory of the disk cache (default=~/.cache/auv-vision)')
+    parser.add_argument('--cache-scale', type=float, default=1.0,
+                        help='resize factor applied to cached frames (default=1.0)')
+    parser.add_argument('--lockstep', action='store_true',
+                        help='write each frame only after every reader read the previous one, '
+                             'which plays back as fast as the slowest module')
+    parser.add_argument('--readers', type=int, default=1,
+                        help='readers to wait for before the first frame in lockstep mode (default=1)')
+    parser.add_argument('--pyramid', type=parse_pyramid_scales, default=[],
+                        help="also publish downscaled copies, e.g. '2,4' adds <direction>@2 and <direction>@4")
     parser.add_argument('sources', nargs="+", type=str,
                         help="specify video sources and their directions in the format 'filepath:dir1,dir2'")
     args = parser.parse_args()
@@ -49,8 +349,13 @@ if __name__ == '__main__':
             exit(1)
 
     cs = CaptureSource()
+    if args.lockstep:
+        cs.lockstep(args.readers)
     for file, directions in targets:
         lst = directions.split(',')
+        cs.alias(lst[0], *lst[1:])
+        if args.pyramid:
+            cs.pyramid(lst[0], *args.pyramid)
         cs.register_capture_udl(
-            ' '.join(lst), video_to_directions, args=(file, lst, args.loop))
+            ' '.join(lst), video_to_directions, args=(file, lst, args))
     cs.run_event_loop()
@@ -6,7 +6,7 @@ import cv2
 import pyzed.sl as sl
 from typing import Tuple
 
-from vision.core.capture_source import CaptureSource, FpsLimiter
+from vision.core.capture_source import CaptureSource, DerivedStream, FpsLimiter
 
 VIDEO_SETTINGS = sl.VIDEO_SETTINGS
 
@@ -31,34 +31,34 @@ ZED_NORMAL_FPS: int = 2
 
 
 
-def image_udl(fps_limiter: FpsLimiter, args: Tuple[sl.Camera]):
+def zed_grab(args: Tuple[sl.Camera]) -> sl.Camera:
+    zed = args[0]
+    if zed.grab() != sl.ERROR_CODE.SUCCESS:
+        raise RuntimeError("Zed grab error")
+    return zed
+
+
+def image_stream() -> DerivedStream:
     def to_rgb(x) -> np.ndarray:
         return cv2.cvtColor(x, cv2.COLOR_RGBA2RGB)  # type: ignore
 
-    zed = args[0]
     left_mat = sl.Mat()
     right_mat = sl.Mat()
 
-    for acquisition_time in fps_limiter.rate(ZED_IMAGE_FPS):
-
-        if zed.grab() != sl.ERROR_CODE.SUCCESS:
-            raise RuntimeError("Zed grab error")
-
+    def retrieve(zed: sl.Camera, acquisition_time: int):
         zed.retrieve_image(left_mat, sl.VIEW.LEFT)
         zed.retrieve_image(right_mat, sl.VIEW.RIGHT)
 
-        left_image = left_mat.get_data()
-        right_image = right_mat.get_data()
+        yield ZED_IMAGE_DIRECTION_LEFT, to_rgb(left_mat.get_data())
+        yield ZED_IMAGE_DIRECTION_RIGHT, to_rgb(right_mat.get_data())
 
-        yield ZED_IMAGE_DIRECTION_LEFT, acquisition_time, to_rgb(left_image)
-        yield ZED_IMAGE_DIRECTION_RIGHT, acquisition_time, to_rgb(right_image)
+    return DerivedStream('image', retrieve, ZED_IMAGE_FPS)
 
 
-def depth_udl(fps_limiter: FpsLimiter, args: Tuple[sl.Camera]):
-    zed = args[0]
-
+def depth_stream() -> DerivedStream:
     depth_mat = sl.Mat()
-    for acquisition_time in fps_limiter.rate(ZED_DEPTH_FPS):
+
+    def retrieve(zed: sl.Camera, acquisition_time: int):
         zed.retrieve_measure(depth_mat, sl.MEASURE.DEPTH)
 
         depth_ocv = depth_mat.get_data()
@@ -71,19 +71,20 @@ def depth_udl(fps_limiter: FpsLimiter, args: Tuple[sl.Camera]):
             neginf=ZED_MIN_DISTANCE
         )
 
-        yield ZED_DEPTH_DIRECTION, acquisition_time, depth_ocv
+        yield ZED_DEPTH_DIRECTION, depth_ocv
 
+    return DerivedStream('depth', retrieve, ZED_DEPTH_FPS)
 
-def normal_udl(fps_limiter: FpsLimiter, args: Tuple[sl.Camera]):
-    zed = args[0]
 
+def normal_stream() -> DerivedStream:
     normal_mat = sl.Mat()
-    for acquisition_time in fps_limiter.rate(ZED_NORMAL_FPS):
+
+    def retrieve(zed: sl.Camera, acquisition_time: int):
         zed.retrieve_measure(normal_mat, sl.MEASURE.NORMALS)
 
         normal_map = normal_mat.get_data()[..., :3]
         normal_map = np.ascontiguousarray(normal_map)
-        
+
         # normal_map = (normal_map + 1) / 2.0  # Range from [-1, 1] to [0, 1]
         normal_map += 1
         normal_map /= 2.0
@@ -95,7 +96,9 @@ def normal_udl(fps_limiter: FpsLimiter, args: Tuple[sl.Camera]):
             nan=0,
         )
 
-        yield ZED_NORMAL_DIRECTION, acquisition_time, normal_map
+        yield ZED_NORMAL_DIRECTION, normal_map
+
+    return DerivedStream('normal', retrieve, ZED_NORMAL_FPS)
 
 
 def calibrate_udl(fps_limiter: FpsLimiter, args: Tuple[sl.Camera]):
@@ -137,8 +140,8 @@ if __name__ == '__main__':
     print('ZED Camera initialized. Starting frame capture...')
 
     cs = CaptureSource()
-    cs.register_capture_udl('image udl', image_udl, (zed, ))
-    cs.register_capture_udl('depth udl', depth_udl, (zed, ))
-    cs.register_capture_udl('normal udl', normal_udl, (zed, ))
+    # one thread grabs, and depth and normals are retrieved from every n-th image grab
+    cs.register_grabber('zed', zed_grab, [image_stream(), depth_stream(), normal_stream()],
+                        args=(zed, ))
     cs.register_logical_udl(calibrate_udl, (zed, ))
     cs.run_event_loop()
@@ -19,6 +19,12 @@ build.install('auv-camera-stream-server', f='vision/capture_sources/stream_serve
 build.install('auv-camera-stream-client', f='vision/capture_sources/stream_client.py')
 build.install('auv-flir-camera', f='vision/capture_sources/flir.py')
 build.install('auv-zed-camera', f='vision/capture_sources/zed.py')
+build.install('auv-synthetic-camera', f='vision/capture_sources/synthetic.py')
 
 
 build.install('auv-yolo-shm', f='vision/misc/yolo_shm.py')
+build.install('auv-vision-benchmark', f='vision/misc/benchmark.py')
+build.install('auv-vision-supervisor', f='vision/misc/supervisor.py')
+build.install('auv-vision-fork-server', f='vision/misc/fork_server.py')
+build.install('auv-vision-import-time', f='vision/misc/import_time.py')
+build.install('auv-vision-preprocessor-benchmark', f='vision/misc/preprocessor_benchmark.py')
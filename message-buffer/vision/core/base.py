@@ -1,14 +1,18 @@
+import sys
+import math
 import time
 import signal
 import glob
 import argparse
+import functools
 import threading
 import contextlib
+import traceback
 import numpy as np
 
-from cv2 import UMat as cv2Mat  # type: ignore
 from abc import ABC, abstractmethod
 from typing import (
+    TYPE_CHECKING,
     List,
     Dict,
     OrderedDict as TOrderedDict,
@@ -24,13 +28,24 @@ from vision.core.bindings.camera_message_framework import (
     BLOCK_STUB,
     ReadStatus,
 )
-from vision.core.tuners import TunerBase, IntTuner, DoubleTuner, BoolTuner
-from vision.utils.helpers import from_umat
+from vision.core.tuners import TunerBase, TunerBlock
+from vision.core.pyramid import parse_pyramid_direction
+from vision.core.profiler import Profiler
+from vision.core.scheduler import FrameScheduler
+from vision.core.prefetch import FramePrefetcher
+from vision.core.hub import SourceHub, HubSubscription
+from vision.core.reloader import ClassReloader
+from vision.core.presets import PresetStore
+from vision.utils.frame_context import frame_context
 from collections import OrderedDict, deque
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 
-from auvlog.client import log as auvlog
-from auvlog.client import Logger
+# opencv, auvlog and shm are imported where they are first used, so importing a
+# module (or forking one from the fork server) does not pay for them up front
+if TYPE_CHECKING:
+    from cv2 import UMat as cv2Mat  # type: ignore
+    from auvlog.client import Logger
+    from vision.core.scaler import ResolutionScaler
 
 
 @dataclass
@@ -56,15 +71,19 @@ class VideoSource:
         """create a video source object from a correctly formatted string
         the format should be the name, followed by ":" delimitated data types
         like u8, i8, u32, i32, f32, u64, i64, f64. Example: "forward:f32" means
-        to decode 4 byte wide datatypes from forward as f32."""
+        to decode 4 byte wide datatypes from forward as f32. The name may end in a
+        downscale factor published by the capture source, like "forward@2:f32" for
+        half resolution, see CaptureSource.pyramid."""
         if isinstance(source_str, VideoSource):
             return source_str
 
         if ":" not in source_str:
             name = source_str
+            parse_pyramid_direction(name)
             return VideoSource(name)
 
         name, types = source_str.split(":", maxsplit=1)
+        parse_pyramid_direction(name)
 
         if "u8" in types:
             b_type = np.uint8
@@ -94,16 +113,25 @@ class VideoSource:
         return VideoSource(name, b_type, s_type, l_type)
 
     @classmethod
-    def into_accessor(cls, instn: "VideoSource"):
-        """Transform an accessor object into a BlockAccessor object in read mode."""
+    def into_accessor(cls, instn: "VideoSource", prefetch: bool = False, block_thread: bool = False):
+        """Transform an accessor object into a BlockAccessor object in read mode.
+        Prefetching accessors block on reads and own one frame slot per prefetch buffer.
+        Blocking accessors read in lockstep and register as consumers of the source."""
         return BlockAccessor(
             instn.name,
             byte_type=instn.byte_type,
             short_type=instn.short_type,
             long_type=instn.long_type,
+            block_thread=prefetch or block_thread,
+            frame_slots=FramePrefetcher.SLOTS if prefetch else 1,
+            consumer=block_thread,
         )
 
 
+STATS_BLOCK_SIZE = 1 << 16
+"""bytes reserved for the serialized profiling statistics of a module"""
+
+
 class ModuleManager:
     """Utility class used by vision modules to read from video sources, post output frames, and send tuner updates."""
 
@@ -112,18 +140,34 @@ class ModuleManager:
         module_name: str,
         video_sources: List[VideoSource],
         tuner_sources: List[TunerBase],
+        profiler: Optional[Profiler] = None,
+        prefetch: bool = False,
+        hub: Optional[SourceHub] = None,
+        lockstep: bool = False,
+        copy_frames: bool = False,
     ):
         """Create a module that can interface with a "ModuleReader"
 
         Args:
             module_name (str): Name of the module
             video_sources (List[VideoSource]): video inputs into the module, the class will try and create a "BlockAccessor" in read mode for each source
-            tuner_sources (List[TunerBase]): tuner inputs into the module, the class will try and create a "BlockAccessor" in write mode for each source
+            tuner_sources (List[TunerBase]): tuner inputs into the module, published together in one "TunerBlock"
+            profiler (Optional[Profiler]): times reads of every video source when enabled
+            prefetch (bool): copy frames out of every video source on a background thread while the module processes
+            hub (Optional[SourceHub]): read video sources through a hub shared with other modules in this process instead of opening them
+            lockstep (bool): wait for the next frame on every read instead of polling, for sources played back in lockstep
+            copy_frames (bool): with a hub, read private copies of the frames instead of the read-only frames shared with other modules
 
         Raises:
             RuntimeError: If there are duplicate video source names (ill defined because forward:f32 and forward:f64 contradict each other)
             RuntimeError: If there are duplicate tuner names of the same type (ill defined because it's difficult to differentiate as the programmer)
+            RuntimeError: If lockstep is combined with a hub, whose reader acknowledges frames before the module processed them
         """
+        if hub is not None and lockstep:
+            raise RuntimeError(
+                "lockstep cannot be used with a shared source hub: the hub reads frames ahead of the module, "
+                "so the capture source would overwrite frames that were not processed yet"
+            )
 
         # modules share the /dev/shm/ directory with capture sources, so we need a way to different between the two types of message buffers
         # solution is to have every "module" message buffer be prefixed with the "module" keyword
@@ -131,7 +175,9 @@ class ModuleManager:
         self._module_name = "module_" + module_name
         self._post_name = self._module_name + "_post"
         self._tune_name = self._module_name + "_tune"
-        self._first = True
+        self._stats_name = self._module_name + "_stats"
+        self._profiler = profiler if profiler is not None else Profiler()
+        self._read_keys = {vs.name: f"{vs.name}/read" for vs in video_sources}
 
         self._video_sources: Dict[str, VideoSource] = {
             vs.name: vs for vs in video_sources
@@ -142,21 +188,28 @@ class ModuleManager:
         }
 
         self._video_accessor: Dict[str, BlockAccessor] = {
-            vs.name: VideoSource.into_accessor(vs) for vs in video_sources
-        }
-
-        # encode an index into the tuner name so that the webgui knows how to order the 
-        # tuners
-        self._tuner_accessor: Dict[str, BlockAccessor] = {
-            ts.name: BlockAccessor(
-                f"{self._tune_name}%{idx}%{str(ts)}",
-                max_entry_size_bytes=ts.byte_size(),
-            )
-            for idx, ts in enumerate(tuner_sources)
+            vs.name: VideoSource.into_accessor(vs, prefetch, lockstep) for vs in video_sources
         }
+        self._prefetch = prefetch and hub is None
+        self._prefetchers: Dict[str, FramePrefetcher] = {}
+        self._hub = hub
+        self._copy_frames = copy_frames
+        self._subscriptions: Dict[str, HubSubscription] = {}
+
+        # every tuner lives in one block, ordered the same way the webgui displays
+        # them. It is created on entering the context, and a read costs a single
+        # generation check when no tuner was touched since the last tick
+        self._tuner_list = list(tuner_sources)
+        self._tuner_block: Optional[TunerBlock] = None
+
+        # bumped on every tuner value change, so modules can key caches on it
+        self._tuner_generation = 0
+        for tuner in self._tuner_list:
+            tuner.on_change(self._bump_tuner_generation)
 
         # initially empty, but expected to grow
         self._post_accessor: Dict[str, BlockAccessor] = {}
+        self._stats_accessor: Optional[BlockAccessor] = None
 
         if len(self._video_sources) != len(video_sources):
             raise RuntimeError("cannot have multiple video sources of the same name")
@@ -182,38 +235,66 @@ class ModuleManager:
             self._post_accessor[name] = accessor
             self._post_accessor[name].write_frame(acquisition_time, data)
 
-    def read_messages(self) -> List[Tuple[str, Tuple[ReadStatus, np.ndarray, int]]]:
+    def post_stats(self, acquisition_time: int, data: np.ndarray):
+        """Publish profiling statistics to the stats block of this module"""
         if not self._inside_ctx:
             raise RuntimeError(
                 f"attempted to access ModuleManager while not in a context manager"
             )
 
-        # deserialize tuners
-        for name, ta in self._tuner_accessor.items():
-            result, frame, _ = ta.read_frame()
+        if data.nbytes > STATS_BLOCK_SIZE:
+            return
+
+        if self._stats_accessor is None:
+            accessor = BlockAccessor(self._stats_name, STATS_BLOCK_SIZE)
+            self._exit_stack.enter_context(accessor)
+            self._stats_accessor = accessor
+        self._stats_accessor.write_frame(acquisition_time, data)
 
-            if result == ReadStatus.FRAMEWORK_DELETED:
-                raise RuntimeError("Unexpected deleted Tuner")
+    def read_messages(self) -> List[Tuple[str, Tuple[ReadStatus, np.ndarray, int]]]:
+        if not self._inside_ctx:
+            raise RuntimeError(
+                f"attempted to access ModuleManager while not in a context manager"
+            )
 
-            if frame is not None:
-                self._tuner_sources[name].deserialize(frame.tobytes("C"))
+        # deserialize tuners, but only if any of them changed since the last tick
+        if self._tuner_block is not None:
+            self._tuner_block.read()
 
         # deserialize frame information
         ret = []
-        for accessor in self._video_accessor.values():
-            read_result, data, acquisition_time = accessor.read_frame()
+        for name, accessor in self._video_accessor.items():
+            with self._profiler.section(self._read_keys[name]):
+                if self._hub is not None:
+                    read_result, data, acquisition_time = self._subscriptions[name].read_frame()
+                elif self._prefetch:
+                    read_result, data, acquisition_time = self._prefetchers[name].take()
+                else:
+                    read_result, data, acquisition_time = accessor.read_frame()
 
             if read_result == ReadStatus.FRAMEWORK_DELETED:
-                raise RuntimeError(f"{accessor.direction} was marked for deletion")
+                raise RuntimeError(f"{name} was marked for deletion")
 
             if data is not None:
-                ret.append((accessor.direction, (read_result, data, acquisition_time)))
+                ret.append((name, (read_result, data, acquisition_time)))
 
         return ret
 
     def __getitem__(self, key: str) -> Any:
         return self._tuner_sources[key].value
 
+    def tuner(self, key: str) -> TunerBase:
+        """the tuner object itself, e.g. to register on_change callbacks"""
+        return self._tuner_sources[key]
+
+    @property
+    def generation(self) -> int:
+        """number of tuner value changes since the module started"""
+        return self._tuner_generation
+
+    def _bump_tuner_generation(self, _: TunerBase):
+        self._tuner_generation += 1
+
     def __str__(self) -> str:
         return f"ModuleManager(name={self._module_name}, video_sources={self._video_sources}, tuner_sources={self._tuner_sources})"
 
@@ -226,28 +307,40 @@ class ModuleManager:
         self._exit_stack.__enter__()
 
         try:
-            for va in self._video_accessor.values():
-                self._exit_stack.enter_context(va)
-
-            for ta in self._tuner_accessor.values():
-                self._exit_stack.enter_context(ta)
-
-            # write tuner to accessors
-            if self._first:
-                self._first = False;
-                for name, ts in self._tuner_sources.items():
-                    data = np.frombuffer(ts.serialize(), dtype=np.uint8)
-
-                    ta = self._tuner_accessor[ts.name]
-                    ta.write_frame(int(time.monotonic() * 1000), data)
+            if self._hub is not None:
+                for name, vs in self._video_sources.items():
+                    self._subscriptions[name] = self._hub.subscribe(vs, self._copy_frames)
+            else:
+                for va in self._video_accessor.values():
+                    self._exit_stack.enter_context(va)
+
+            # stopped before the accessors close, the exit stack unwinds in reverse
+            if self._prefetch:
+                for name, va in self._video_accessor.items():
+                    prefetcher = FramePrefetcher(va)
+                    prefetcher.start()
+                    self._exit_stack.callback(prefetcher.stop)
+                    self._prefetchers[name] = prefetcher
+
+            # publishes the current tuner values, so they survive re-entering
+            if self._tuner_list:
+                self._tuner_block = self._exit_stack.enter_context(
+                    TunerBlock.create(self._tune_name, self._tuner_list)
+                )
 
         except KeyboardInterrupt or Exception as e:
             # clean up
+            for prefetcher in self._prefetchers.values():
+                prefetcher.stop()
+            self._prefetchers.clear()
+
+            self._subscriptions.clear()
             for _, va in self._video_accessor.items():
                 va.__exit__(None, None, None)
 
-            for _, ta in self._tuner_accessor.items():
-                ta.__exit__(None, None, None)
+            if self._tuner_block is not None:
+                self._tuner_block.close()
+                self._tuner_block = None
 
             raise e
 
@@ -256,6 +349,10 @@ class ModuleManager:
     def __exit__(self, type, value, traceback):
         self._exit_stack.__exit__(type, value, traceback)
         self._post_accessor.clear()
+        self._prefetchers.clear()
+        self._subscriptions.clear()
+        self._stats_accessor = None
+        self._tuner_block = None
         self._inside_ctx = False
 
 
@@ -271,29 +368,36 @@ class ModuleReader:
         self._base_module_name = module_name
         self._module_name = f"module_{module_name}"
         self._post_name = f"{self._module_name}_post%"
-        self._tune_name = f"{self._module_name}_tune%"
+        self._tune_name = f"{self._module_name}_tune"
+        self._stats_name = f"{self._module_name}_stats"
         self._quit_flag = threading.Event()
         self._thread: Optional[threading.Thread] = None
 
         self._post_udls: List[Callable[[str, str, int, np.ndarray], None]] = []
         self._tuner_udls: List[Callable[[str, str, int, TunerBase], None]] = []
+        self._stats_udls: List[Callable[[str, Dict[str, Dict[str, float]]], None]] = []
 
         # in the format name, (idx, accessor)
         self._all_posts: Dict[str, Tuple[int, BlockAccessor]] = {}
 
-        # in the format name, (idx, accessor, tuner)
-        self._all_tuners: Dict[str, Tuple[int, BlockAccessor, TunerBase]] = {}
+        # the tuner layout is read from the header of the module's tuner block
+        self._tuner_block: Optional[TunerBlock] = None
         self._tuner_guard = False
         self._framework_deleted = False
 
+        # the stats block only appears once a profiled module publishes
+        self._stats_accessor: Optional[BlockAccessor] = None
+
+        # tuner updates from the webgui are coalesced and written once per tick
+        self._pending_tuners: Dict[str, Any] = {}
+        self._pending_lock = threading.Lock()
+
         # populate the tuners and posters
         for active_post in self.active_posts:
             idx, name = self.parse_post_name(active_post)
             self._all_posts[name] = (idx, BlockAccessor(active_post))
 
-        for active_tuner in self.active_tuners:
-            idx, tuner_type, name = self.parse_tune_name(active_tuner)
-            self._all_tuners[name] = (idx, BlockAccessor(active_tuner), tuner_type)
+        self._tuner_block = TunerBlock.open(self._tune_name)
 
     @classmethod
     def get_active_modules(cls):
@@ -308,10 +412,10 @@ class ModuleReader:
         return [file[len(BLOCK_STUB) :] for file in glob.glob(glob_rule)]
 
     @property
-    def active_tuners(self):
-        prefix = BLOCK_STUB + self._tune_name
-        glob_rule = prefix + "*"
-        return [file[len(BLOCK_STUB) :] for file in glob.glob(glob_rule)]
+    def active_tuners(self) -> List[str]:
+        if self._tuner_block is None:
+            return []
+        return [tuner.name for tuner in self._tuner_block.tuners]
     
     @property
     def framework_deleted(self):
@@ -321,25 +425,15 @@ class ModuleReader:
         _, idx, post_name = s.split("%")
         return (int(idx), post_name)
 
-    def parse_tune_name(self, s: str) -> Tuple[int, TunerBase, str]:
-        _, idx, tuner_str = s.split("%")
-        tuner_type, tuner_name = tuner_str.split("_", maxsplit=1)
-
-        if tuner_type == "IntTuner":
-            tuner_type = IntTuner(tuner_name, 0)
-        elif tuner_type == "DoubleTuner":
-            tuner_type = DoubleTuner(tuner_name, 0)
-        else:
-            tuner_type = BoolTuner(tuner_name, False)
-
-        return (int(idx), tuner_type, tuner_name)
-
     def register_post_udl(self, udl: Callable[[str, str, int, np.ndarray], None]):
         self._post_udls.append(udl)
 
     def register_tuner_udl(self, udl: Callable[[str, str, int, TunerBase], None]):
         self._tuner_udls.append(udl)
 
+    def register_stats_udl(self, udl: Callable[[str, Dict[str, Dict[str, float]]], None]):
+        self._stats_udls.append(udl)
+
     def run_forever(self, fps: int = 60):
         if self._thread is not None:
             raise RuntimeError("cannot run already running module reader")
@@ -352,21 +446,84 @@ class ModuleReader:
         self._tuner_guard = True
 
     def update_tuner_value(self, name: str, value: Any):
-        _, accessor, tuner = self._all_tuners[name]
-        tuner._current_value = value
+        """Queue a tuner update. Updates are batched and written by the reader
+        thread, so a burst of slider events costs a single write."""
+        with self._pending_lock:
+            self._pending_tuners[name] = value
+
+    def update_tuner_values(self, values: Dict[str, Any]):
+        """Queue many tuner updates at once, e.g. a preset. They are written in
+        the same batch, so the module picks all of them up on the same tick."""
+        with self._pending_lock:
+            self._pending_tuners.update(values)
+
+    def tuner_values(self) -> Dict[str, Any]:
+        """current tuner values of the module, keyed by tuner name"""
+        if self._tuner_block is None:
+            return {}
+
+        values = self._tuner_block.values()
+        with self._pending_lock:
+            values.update((k, v) for k, v in self._pending_tuners.items() if k in values)
+        return values
+
+    def _flush_tuner_updates(self):
+        if self._tuner_block is None:
+            return
+
+        with self._pending_lock:
+            pending, self._pending_tuners = self._pending_tuners, {}
+
+        if pending:
+            self._tuner_block.write(pending)
+
+    def _read_stats(self, exit_stack: contextlib.ExitStack):
+        if self._stats_accessor is None:
+            if not glob.glob(BLOCK_STUB + self._stats_name):
+                return
+            self._stats_accessor = exit_stack.enter_context(
+                BlockAccessor(self._stats_name)
+            )
+
+        read_result, read_data, _ = self._stats_accessor.read_frame()
+        if read_result == ReadStatus.SUCCESS and read_data is not None:
+            stats = Profiler.deserialize(read_data)
+            for cbck in self._stats_udls:
+                cbck(self._base_module_name, stats)
+
+    def _read_tuners(self):
+        if self._tuner_block is None:
+            return
+
+        if self._tuner_block.deleted:
+            print(f"ModuleReader: {self._base_module_name} framework deleted")
+            self._framework_deleted = True
+            self._quit_flag.set()
+            return
+
+        self._flush_tuner_updates()
+        changed = self._tuner_block.read()
+
+        if self._tuner_guard:
+            self._tuner_guard = False
+            changed = list(range(len(self._tuner_block)))
 
-        data = np.frombuffer(tuner.serialize(), dtype=np.uint8)
-        accessor.write_frame(int(time.monotonic() * 1000), data)
+        for idx in changed:
+            tuner = self._tuner_block[idx]
+            for cbck in self._tuner_udls:
+                cbck(self._base_module_name, tuner.name, idx, tuner)
 
     def _loop(self, fps: int):
         with contextlib.ExitStack() as exit_stack:
             for _, accessor in self._all_posts.values():
                 exit_stack.enter_context(accessor)
 
-            for _, accessor, _ in self._all_tuners.values():
-                exit_stack.enter_context(accessor)
+            if self._tuner_block is not None:
+                exit_stack.enter_context(self._tuner_block)
 
             WAIT_TIME = 1.0 / fps
+            STATS_PERIOD = max(1, fps)
+            tick = 0
             while not self._quit_flag.is_set():
                 time_now = time.monotonic()
 
@@ -385,28 +542,11 @@ class ModuleReader:
                         self._framework_deleted = True
                         self._quit_flag.set()
 
-                flag = False
-                for name, (idx, accessor, tuner) in self._all_tuners.items():
-                    result = accessor.read_frame()
-
-                    if result is None:
-                        continue
+                self._read_tuners()
 
-                    read_result, read_data, _ = result
-                    if (
-                        self._tuner_guard or read_result == ReadStatus.SUCCESS
-                    ) and read_data is not None:
-                        flag = flag or self._tuner_guard
-                        tuner.deserialize(read_data.tobytes("C"))
-                        for cbck in self._tuner_udls:
-                            cbck(self._base_module_name, name, idx, tuner)
-                    elif read_result == ReadStatus.FRAMEWORK_DELETED:
-                        print(f"ModuleReader: {self._base_module_name} framework deleted")
-                        self._framework_deleted = True
-                        self._quit_flag.set()
-
-                if flag:
-                    self._tuner_guard = False
+                if tick % STATS_PERIOD == 0:
+                    self._read_stats(exit_stack)
+                tick += 1
 
                 time_end = time.monotonic()
                 time_elapsed = time_end - time_now
@@ -431,6 +571,29 @@ class ModuleReader:
             self._thread.join()
 
 
+_ARGV_OVERRIDE: Optional[List[str]] = None
+_HUB_OVERRIDE: Optional[SourceHub] = None
+
+
+@contextlib.contextmanager
+def module_arguments(argv: List[str], hub: Optional[SourceHub] = None):
+    """Construct modules inside this context with `argv` as their command line
+    instead of sys.argv. Used by tools that host modules outside of their own
+    process entry point, like the benchmark harness and the supervisor.
+
+    Args:
+        argv (List[str]): arguments accepted by the ModuleBase command line, without the program name
+        hub (Optional[SourceHub]): read video sources through this hub instead of opening them
+    """
+    global _ARGV_OVERRIDE, _HUB_OVERRIDE
+    previous = _ARGV_OVERRIDE, _HUB_OVERRIDE
+    _ARGV_OVERRIDE, _HUB_OVERRIDE = list(argv), hub
+    try:
+        yield
+    finally:
+        _ARGV_OVERRIDE, _HUB_OVERRIDE = previous
+
+
 VideoOrdDict_T = TOrderedDict[str, BlockAccessor]
 TunerOrdDict_T = TOrderedDict[str, Tuple[TunerBase, BlockAccessor]]
 
@@ -439,24 +602,46 @@ TunerOrdDict_T = TOrderedDict[str, Tuple[TunerBase, BlockAccessor]]
 class VideoSourceMetadata:
     _frames_read: int = 0
     _shape: Tuple[int, int] = (1, 1)
-    _acquisition_times: Deque[int] = deque(maxlen=30)
-    _dead_counter = 0
+    _acquisition_times: Deque[int] = field(default_factory=lambda: deque(maxlen=30))
+    _last_arrival: float = 0.0
+    _period: float = 0.0
+    _dead: bool = False
 
     def update(self, mat: np.ndarray, acquisition_time: int):
         """update the metadata with the new frame"""
         self._acquisition_times.append(int(time.monotonic() * 1000 - acquisition_time))
         self._shape = (mat.shape[0], mat.shape[1])
         self._frames_read += 1
-        self._dead_counter = max(0, self._dead_counter - 1)
+
+    def arrived(self):
+        """record that the source produced a new frame, whether or not it gets processed"""
+        now = time.monotonic()
+        if self._last_arrival > 0:
+            elapsed = now - self._last_arrival
+            self._period = elapsed if self._period == 0 else 0.8 * self._period + 0.2 * elapsed
+        self._last_arrival = now
+        self._dead = False
+
+    def silence(self) -> float:
+        """seconds since the source last produced a frame"""
+        return time.monotonic() - self._last_arrival
 
     def mark_as_dead(self):
-        """marks the vision module as dead and returns if the vision was stable before"""
-        alive = self._dead_counter == 0
-        self._dead_counter = 3
+        """called when there is no new frame. A source only counts as dead once it has
+        been silent for three of its own frame periods (and at least a second), so
+        sources slower than the module are not misreported. Returns if the source
+        was alive before"""
+        if self.silence() < max(3 * self._period, 1.0):
+            return False
+
+        alive = not self._dead
+        self._dead = True
         return alive
 
     def get_latency(self) -> int:
-        """returns the running average latency of this video source in ms of the last 10 frames"""
+        """returns the running average latency of this video source in ms of the last 30 frames"""
+        if len(self._acquisition_times) == 0:
+            return 0
         average = sum(self._acquisition_times) / len(self._acquisition_times)
         return int(average)
 
@@ -484,18 +669,111 @@ class VideoSourceMetadata:
         return self.normalize_axis(coord[0], 1), self.normalize_axis(coord[1], 0)
 
 
+@functools.lru_cache(maxsize=None)
+def _module_parser() -> argparse.ArgumentParser:
+    """Command line shared by every module. Built once per process, and only when
+    the first module is constructed, so importing a module stays cheap"""
+    parser = argparse.ArgumentParser(
+        f"{__file__}",
+        description="CLI to run this particular vision module",
+        formatter_class=argparse.RawTextHelpFormatter,
+    )
+    parser.add_argument(
+        "-f",
+        "--fps",
+        type=int,
+        default=None,
+        help="maximum fps to run (capped at speed of video sources) (recommended to specify a value <= 10)",
+    )
+    parser.add_argument(
+        "--verbose", action="store_true", help="display debug messages"
+    )
+    parser.add_argument(
+        "--enable-performance",
+        action="store_true",
+        help="disable posting to help with performance during competition runs",
+    )
+    parser.add_argument(
+        "--max-frame-age",
+        type=int,
+        default=None,
+        help="drop frames older than this many milliseconds instead of processing them late (not with --lockstep)",
+    )
+    parser.add_argument(
+        "--priority",
+        type=str,
+        default="",
+        help="relative processing share of each source, e.g. 'forward=1,downward=3'",
+    )
+    parser.add_argument(
+        "--frame-budget",
+        type=float,
+        default=None,
+        help="per-frame time budget in ms; frames are downscaled while process() exceeds it",
+    )
+    parser.add_argument(
+        "--prefetch",
+        action="store_true",
+        help="copy the next frame out of shared memory while the current one is processed",
+    )
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="time every stage of the module and publish the statistics to the webgui",
+    )
+    parser.add_argument(
+        "--preset",
+        type=str,
+        default=None,
+        help="start with the tuner values of a preset saved for this module class, see vision.core.presets",
+    )
+    parser.add_argument(
+        "--reload",
+        action="store_true",
+        help="reload the module class whenever its source file changes, keeping shared memory blocks and tuner values",
+    )
+    parser.add_argument(
+        "--lockstep",
+        action="store_true",
+        help="process every frame of sources played back in lockstep, as fast as possible instead of at the target fps "
+        "(not available for modules hosted by the supervisor)",
+    )
+
+    parser.add_argument(
+        "sources",
+        nargs="*",
+        type=str,
+        help=(
+            "Specifies video sources. If left empty, default sources will be used.\n"
+            "Provide sources in the following format: {name}:<type>, where:\n"
+            "\t- {name}: A unique identifier for the source (e.g., 'camera1').\n"
+            "\t- <type1>: Specifies the data type for the first field (choose from 'u8', 'i8')\n"
+            "\t- <type2>: Specifies the data type for the second field (choose from 'u32', 'i32', or 'f32').\n"
+            "\t- <type3>: Specifies the data type for the third field (choose from 'u64', 'i64', or 'f64').\n\n"
+            "Example: 'forward:f64' interprets 8 byte wide as f64 and uses 1 and 4 byte wide defaults\n"
+            "Example: 'forward:i8:f32' uses 8 byte wide defaults"
+        ),
+    )
+    return parser
+
+
 class ModuleBase(ABC):
-    """_summary_
+    """Base class of every vision module.
 
-    Args:
-        ABC (_type_): _description_
+    Modules hosted by the supervisor receive the frame shared by every module
+    reading the source, which is read-only. A module whose process() draws on its
+    input must set MUTATES_FRAMES to get a private copy of each frame instead.
     """
 
+    MUTATES_FRAMES: bool = False
+    """process() writes to its input, so hosted modules need private copies of the shared frames, see SourceHub"""
+
     def __init__(
         self,
         video_sources: List[Union[VideoSource, str]] = [],
         tuners: List[TunerBase] = [],
         fps: int = 10,
+        frame_budget_ms: Optional[float] = None,
     ):
         """_summary_
 
@@ -503,45 +781,13 @@ class ModuleBase(ABC):
             video_sources (List[VideoSource], optional): _description_. Defaults to [].
             tuners (List[TunerBase], optional): _description_. Defaults to [].
             fps (int, optional): _description_. Defaults to 10.
+            frame_budget_ms (Optional[float], optional): per-frame time budget for process(); frames are downscaled while it is exceeded. Defaults to None (never scale).
         """
-        # parse arguments
-        parser = argparse.ArgumentParser(
-            f"{__file__}",
-            description="CLI to run this particular vision module",
-            formatter_class=argparse.RawTextHelpFormatter,
-        )
-        parser.add_argument(
-            "-f",
-            "--fps",
-            type=int,
-            default=fps,
-            help="maximum fps to run (capped at speed of video sources) (recommended to specify a value <= 10)",
-        )
-        parser.add_argument(
-            "--verbose", action="store_true", help="display debug messages"
-        )
-        parser.add_argument(
-            "--enable-performance",
-            action="store_true",
-            help="disable posting to help with performance during competition runs",
-        )
-
-        parser.add_argument(
-            "sources",
-            nargs="*",
-            type=str,
-            help=(
-                "Specifies video sources. If left empty, default sources will be used.\n"
-                "Provide sources in the following format: {name}:<type>, where:\n"
-                "\t- {name}: A unique identifier for the source (e.g., 'camera1').\n"
-                "\t- <type1>: Specifies the data type for the first field (choose from 'u8', 'i8')\n"
-                "\t- <type2>: Specifies the data type for the second field (choose from 'u32', 'i32', or 'f32').\n"
-                "\t- <type3>: Specifies the data type for the third field (choose from 'u64', 'i64', or 'f64').\n\n"
-                "Example: 'forward:f64' interprets 8 byte wide as f64 and uses 1 and 4 byte wide defaults\n"
-                "Example: 'forward:i8:f32' uses 8 byte wide defaults"
-            ),
-        )
-        args = parser.parse_args()
+        args = _module_parser().parse_args(_ARGV_OVERRIDE)
+        if args.lockstep and args.max_frame_age is not None:
+            raise RuntimeError(
+                "--max-frame-age cannot be used with --lockstep, which processes every frame however late it is"
+            )
 
         if "_" in self.__class__.__name__:
             raise RuntimeError(
@@ -558,26 +804,66 @@ class ModuleBase(ABC):
 
         # initialize fields
         self._fps: int = args.fps if args.fps else fps
+        frame_budget = args.frame_budget if args.frame_budget is not None else frame_budget_ms
         self._verbose: bool = args.verbose
-        self._module_manager = ModuleManager(self._name, src, tuners)
+        self._profiler = Profiler(args.profile)
+        self._lockstep: bool = args.lockstep
+        if args.preset is not None:
+            preset = PresetStore(self.__class__.__name__).load(args.preset)
+            for tuner in tuners:
+                if tuner.name in preset:
+                    tuner.assign(preset[tuner.name])
+        self._module_manager = ModuleManager(
+            self._name, src, tuners, self._profiler, args.prefetch, _HUB_OVERRIDE, self._lockstep,
+            self.MUTATES_FRAMES,
+        )
         self._post_queue: TOrderedDict[str, np.ndarray] = OrderedDict()
         self._performance_enabled = args.enable_performance
         self._retry = True
 
         self._video_metadata = {s.name: VideoSourceMetadata() for s in src}
+        self._process_keys = {s.name: f"{s.name}/process" for s in src}
+        self._scalers: Dict[str, "ResolutionScaler"] = {}
+        if frame_budget:
+            from vision.core.scaler import ResolutionScaler
+
+            self._scalers = {s.name: ResolutionScaler(frame_budget) for s in src}
+        self._scheduler = FrameScheduler(
+            [s.name for s in src],
+            args.max_frame_age,
+            {
+                k: float(v)
+                for k, v in (p.split("=") for p in args.priority.split(",") if p)
+            },
+        )
         self._current_direction = ""
+        self._reloader = ClassReloader(type(self)) if args.reload else None
 
     @property
     def tuners(self):
         return self._module_manager
 
+    @property
+    def tuner_generation(self) -> int:
+        """changes whenever any tuner value changes, so state derived from tuners
+        can be cached until it does, see also TunerBase.on_change and tuners.Derived"""
+        return self._module_manager.generation
+
     def __call__(self):
+        from auvlog.client import log as auvlog
+
         logger = auvlog.__getattr__(self._name)
         logger(f"Running {self._name}", True)
 
         if self._performance_enabled:
             logger(f"Module running in performance mode", True)
 
+        if self._profiler.enabled:
+            logger(f"Module running with profiling enabled", True)
+
+        if self._reloader is not None:
+            logger(f"Reloading {self.__class__.__name__} when {self._reloader.path} changes", True)
+
         original_sigint_handler = signal.getsignal(signal.SIGINT)
         quit_flag = threading.Event()
 
@@ -591,56 +877,132 @@ class ModuleBase(ABC):
             )
             quit()
 
+        # the loop runs on its own thread so the main thread stays free to handle signals
+        signal.signal(signal.SIGINT, sigh)
+        logger(f"Registered SIGINT handler", self._verbose)
+        main_thread = threading.Thread(target=self.run, args=(quit_flag, logger))
+        main_thread.start()
+        main_thread.join()
+        signal.signal(signal.SIGINT, original_sigint_handler)
+        logger(f"Unregistered SIGINT handler", self._verbose)
+
+        logger(f"Cleaning {self.__class__.__name__}", True)
+
+    def run(self, quit_flag: threading.Event, logger: "Logger"):
+        """Run the module until `quit_flag` is set, reopening the module manager
+        whenever a video source disappears. Does not touch signal handlers, so hosts
+        like the supervisor can call it from any thread.
+
+        Args:
+            quit_flag (threading.Event): set to stop the module, must be clear when called
+            logger (Logger): logger for framework messages
+        """
         logger(f"Target FPS = {self._fps}", self._verbose)
 
-        while self._retry:
+        # the flag belongs to the caller and is never cleared here, so a stop that
+        # arrives while the module manager is reopened is not lost
+        self._retry = True
+        while self._retry and not quit_flag.is_set():
             self._retry = False
-            quit_flag.clear()
             with self._module_manager:
-                signal.signal(signal.SIGINT, sigh)
-                logger(f"Registered SIGINT handler", self._verbose)
                 logger(f"Initialized module manager {self._module_manager}", self._verbose)
-                args = quit_flag, logger
-                main_thread = threading.Thread(target=self._loop, args=args)
-                main_thread.start()
-                main_thread.join()
-            
-            if self._retry:
-                signal.signal(signal.SIGINT, original_sigint_handler)
-                logger(f"Unregistered SIGINT handler", self._verbose)
-
-        logger(f"Cleaning {self.__class__.__name__}", True)
+                self._loop(quit_flag, logger)
 
-    def _loop(self, quit_flag: threading.Event, logger: Logger):
+    def _loop(self, quit_flag: threading.Event, logger: "Logger"):
         while not quit_flag.is_set():
             start = time.monotonic()
 
+            if self._reloader is not None:
+                self._reload(logger)
+
             try:
                 video_messages = self._module_manager.read_messages()
             except RuntimeError as e:
                 logger(f"Error: {e}", True)
-                quit_flag.set()
                 self._retry = True
                 break
 
             for source_name, (read_status, image, acq_time) in video_messages:
+                metadata = self._video_metadata[source_name]
                 if read_status == ReadStatus.SUCCESS:
-                    self._video_metadata[source_name].update(image, acq_time)
-                    self._current_direction = source_name
-                    self.process(source_name, image)
+                    metadata.arrived()
+                    self._scheduler.offer(source_name, image, acq_time)
                 elif read_status == ReadStatus.NO_NEW_FRAME:
-                    if self._video_metadata[source_name].mark_as_dead():
+                    if metadata.mark_as_dead():
                         logger(
-                            f"{source_name} appears to be slow or dead!", self._verbose
+                            f"{source_name} has not produced a frame in {metadata.silence():.1f}s, it appears to be dead!",
+                            self._verbose,
                         )
 
-            for idx, (name, data) in enumerate(self._post_queue.items()):
-                self._module_manager.post(name, idx, int(time.monotonic() * 1000), data)
-            self._post_queue.clear()
+            # in lockstep every frame is processed, however long it takes
+            budget = math.inf if self._lockstep else (1 / self._fps) - (time.monotonic() - start)
+            for source_name, image, acq_time in self._scheduler.schedule(budget):
+                if self._reloader is None:
+                    self._process_frame(source_name, image, acq_time)
+                    continue
+
+                # while iterating on a module, a broken edit should not take it down
+                try:
+                    self._process_frame(source_name, image, acq_time)
+                except Exception:
+                    logger(f"process() failed:\n{traceback.format_exc()}", True)
+
+            with self._profiler.section("tick/post"):
+                for idx, (name, data) in enumerate(self._post_queue.items()):
+                    self._module_manager.post(name, idx, int(time.monotonic() * 1000), data)
+                self._post_queue.clear()
+
+            if self._profiler.due():
+                self._module_manager.post_stats(
+                    int(time.monotonic() * 1000), self._profiler.serialize()
+                )
+
+            # lockstep reads already wait for the next frame
+            if not self._lockstep:
+                with self._profiler.section("tick/sleep"):
+                    time.sleep(max((1 / self._fps) - (time.monotonic() - start), 0))
+
+    def _reload(self, logger: "Logger"):
+        """Swap in the newest version of this module's class. Only methods change;
+        __init__ is not run again, so shared memory blocks, tuners and any state
+        set up there are kept"""
+        assert self._reloader is not None
+        try:
+            cls = self._reloader.poll()
+        except Exception:
+            logger(f"Reload failed, keeping the old code:\n{traceback.format_exc()}", True)
+            return
 
-            time.sleep(max((1 / self._fps) - (time.monotonic() - start), 0))
+        if cls is None:
+            return
+        if not issubclass(cls, ModuleBase):
+            logger(f"Reload failed, {cls.__name__} is no longer a ModuleBase", True)
+            return
 
-    def post(self, name: str, image: Union[np.ndarray, cv2Mat]):
+        self.__class__ = cls
+        logger(f"Reloaded {cls.__name__}", True)
+
+    def _process_frame(self, source_name: str, image: np.ndarray, acq_time: int):
+        """Run process() on a single frame and keep the per-source metadata current"""
+        scaler = self._scalers.get(source_name)
+        if scaler is not None:
+            image = scaler.apply(image)
+
+        # metadata tracks the shape process() sees, so normalized coordinates
+        # are the same as they would be at the original resolution
+        self._video_metadata[source_name].update(image, acq_time)
+        self._current_direction = source_name
+        start = time.perf_counter()
+        # conversions of the frame are shared by every helper until process() returns
+        with self._profiler.section(self._process_keys[source_name]), frame_context():
+            self.process(source_name, image)
+        elapsed = time.perf_counter() - start
+
+        self._scheduler.record_cost(source_name, elapsed)
+        if scaler is not None:
+            scaler.record(elapsed)
+
+    def post(self, name: str, image: Union[np.ndarray, "cv2Mat"]):
         """Send a message to the WebGui. Note that the image is copied,
         so post is disabled if performance mode is on.
 
@@ -653,13 +1015,49 @@ class ModuleBase(ABC):
 
         if "%" in name:
             raise RuntimeError("Cannot have % in name")
-        if type(image) is cv2Mat:
+        # a UMat can only exist once opencv is loaded
+        cv2 = sys.modules.get("cv2")
+        if cv2 is not None and type(image) is cv2.UMat:
+            from vision.utils.helpers import from_umat
+
             image = from_umat(image).astype(np.uint8)
         else:
             image = np.array(image, np.uint8, copy=True, order="C", ndmin=1)
 
         self._post_queue[name] = image
 
+    def profile(self, name: str):
+        """Time a section of user code for the current direction. Costs a single
+        attribute check when profiling is disabled.
+
+        Example:
+            with self.profile("threshold"):
+                mask = cv2.inRange(image, lower, upper)
+
+        Args:
+            name (str): name of the section
+        """
+        if not self._profiler.enabled:
+            return self._profiler.section(name)
+        return self._profiler.section(f"{self._current_direction}/{name}")
+
+    def set_priority(self, direction: str, weight: float):
+        """Change the relative share of processing time a direction gets when the
+        module cannot keep up with all of its sources
+
+        Args:
+            direction (str): video source name
+            weight (float): relative weight, 0 pauses the direction
+        """
+        self._scheduler.set_weight(direction, weight)
+
+    @property
+    def frame_scale(self) -> float:
+        """scale of the current frame relative to the source resolution. Pixel sized
+        constants (areas, kernel sizes) should be multiplied by it in budgeted mode"""
+        scaler = self._scalers.get(self._current_direction)
+        return scaler.scale if scaler is not None else 1.0
+
     def get_latency(self) -> int:
         """return the latency in ms for the current direction"""
         return self._video_metadata[self._current_direction].get_latency()
@@ -7,6 +7,7 @@ import numpy as np
 
 from typing import (
     Any,
+    List,
     Tuple,
     Optional,
 )
@@ -31,8 +32,13 @@ typedef struct Frame {
     void* data;
 } Frame;
 Block* create_block(const char* direction, const size_t max_entry_size_bytes);
-Block* open_block(const char* direction);
+Block* open_block(const char* direction, bool consumer);
 void delete_block(Block* block);
+bool create_alias(Block* block, const char* alias);
+void set_lockstep(Block* block, bool lockstep);
+bool is_lockstep(Block* block);
+size_t consumer_count(Block* block);
+bool wait_consumers(Block* block, size_t min_consumers, uint64_t timeout_ms);
 int write_frame(Block* block,
 				 uint64_t acquisition_time,
 				 size_t width,
@@ -105,6 +111,8 @@ class BlockAccessor:
         short_type: type = np.float32,
         long_type: type = np.float64,
         block_thread: bool = False,
+        frame_slots: int = 1,
+        consumer: bool = False,
     ):
         """Initializes a BlockAccessor that will create/access the volatile-memory
         backed object within a context manager. The behavior of the accessor depends
@@ -117,6 +125,9 @@ class BlockAccessor:
             byte_type (type, optional): 1-byte wide data format from this block. Defaults to np.uint8.
             short_type (type, optional): 4-byte wide data format from this block. Defaults to np.float32.
             long_type (type, optional): 8-byte wide data format from this block. Defaults to np.float64.
+            block_thread (bool, optional): see `block_thread`. Defaults to False.
+            frame_slots (int, optional): number of independent local frame buffers, see `read_frame_into`. Defaults to 1.
+            consumer (bool, optional): register as a reader that a lockstep writer waits for, see `wait_consumers`. Only readers that process every frame should. Defaults to False.
         """
 
         assert (max_entry_size_bytes is None) or (
@@ -125,6 +136,7 @@ class BlockAccessor:
         assert np.dtype(byte_type).itemsize == 1, "byte type must be 1 byte wide"
         assert np.dtype(short_type).itemsize == 4, "short type must be 4 bytes wide"
         assert np.dtype(long_type).itemsize == 8, "long type must be 8 bytes wide"
+        assert frame_slots > 0, "need at least one frame slot"
 
         self._direction = direction
         self._max_entry_size_bytes = max_entry_size_bytes
@@ -132,10 +144,18 @@ class BlockAccessor:
 
         self._inside_ctx_manager = False
         self._block_ptr = ffi.NULL
-        self._frame_ptr = ffi.NULL
+        self._frame_slots = frame_slots
+        self._consumer = consumer
+        self._frame_ptrs: List[Any] = []
         self._frame_data: Optional[np.ndarray] = None
         self._block_thread: bool = block_thread
 
+        # uid of the newest frame read into any slot
+        self._uid = 0
+
+        # numpy views over each slot, reused while the slot keeps its address and shape
+        self._views: List[Optional[Tuple[Tuple[int, ...], np.ndarray]]] = []
+
     @property
     def direction(self) -> str:
         """Get name of the mmap-ed object"""
@@ -200,11 +220,89 @@ class BlockAccessor:
 
         return write_status
 
+    def create_alias(self, alias: str):
+        """Publish the block under another name as well. Accessors opening `alias` read
+        the frames written to this block, without a second copy. The alias is removed
+        together with the block.
+
+        Args:
+            alias (str): direction name that should resolve to this block
+
+        Raises:
+            RuntimeError: Thrown when this function is not accessed in a context manager
+            RuntimeError: Thrown when this accessor did not create the block, or the name is taken by another block
+        """
+        if not self._inside_ctx_manager:
+            raise RuntimeError(
+                f"Attempted to access block while not in a context manager: {__file__}:{sys._getframe(1).f_lineno}"
+            )
+
+        if self._max_entry_size_bytes is None:
+            raise RuntimeError(f"{self._direction} can only be aliased by its creator")
+
+        if not _dllib.create_alias(self._block_ptr, alias.encode("utf8")):  # type: ignore
+            raise RuntimeError(f"Failed to alias {self._direction} as {alias}")
+
+    def set_lockstep(self, lockstep: bool = True):
+        """Make the writer of this block wait for its readers, see `wait_consumers`.
+        Readers opened as consumers register themselves when they open the block and
+        acknowledge every frame they read.
+
+        Args:
+            lockstep (bool): whether the block is written in lockstep
+
+        Raises:
+            RuntimeError: Thrown when this accessor did not create the block
+        """
+        if self._max_entry_size_bytes is None:
+            raise RuntimeError(f"only the creator of {self._direction} can change lockstep mode")
+        _dllib.set_lockstep(self._block_ptr, lockstep)  # type: ignore
+
+    def is_lockstep(self) -> bool:
+        """Whether the writer waits for every reader to read a frame before writing the next"""
+        return bool(_dllib.is_lockstep(self._block_ptr))  # type: ignore
+
+    def consumer_count(self) -> int:
+        """Number of readers the writer of this block waits for in lockstep mode"""
+        return int(_dllib.consumer_count(self._block_ptr))  # type: ignore
+
+    def wait_consumers(self, min_consumers: int = 1, timeout_ms: int = 1000) -> bool:
+        """Wait until at least `min_consumers` readers are registered and all of them
+        read the newest frame, so the next write does not overwrite an unread frame.
+
+        Args:
+            min_consumers (int, optional): readers that must be registered. Defaults to 1.
+            timeout_ms (int, optional): maximum time to wait. Defaults to 1000.
+
+        Returns:
+            bool: whether the readers are ready for the next frame
+        """
+        return bool(_dllib.wait_consumers(  # type: ignore
+            self._block_ptr, ffi.cast("size_t", min_consumers), ffi.cast("uint64_t", timeout_ms)
+        ))
+
     def read_frame(self) -> Tuple[ReadStatus, Optional[np.ndarray], int]:
         """Read the latest frame, if any, from the data segment in the mmap-ed object.
         If the block_thread property was set to true, this function may register itself as a
         watcher with a few second timeout to try and catch the latest frame.
 
+        Raises:
+            RuntimeError: Thrown when this function is not accessed in a context manager
+
+        Returns:
+            Tuple[ReadStatus, Optional[np.ndarray], int]: ReadStatus, most recent frame (could be stale, or no frame at all), acquisition time
+        """
+        return self.read_frame_into(0)
+
+    def read_frame_into(self, slot: int) -> Tuple[ReadStatus, Optional[np.ndarray], int]:
+        """Same as `read_frame`, but copies the frame into the given local frame slot.
+        The returned array is a view over that slot, so it stays valid until the slot is
+        read into again, which lets a reader thread fill one slot while another thread
+        still works on a different one.
+
+        Args:
+            slot (int): local frame buffer to copy into, less than `frame_slots`
+
         Raises:
             RuntimeError: Thrown when this function is not accessed in a context manager
 
@@ -218,29 +316,44 @@ class BlockAccessor:
                 f"Attempted to access block while not in a context manager: {file}:{frame}"
             )
 
+        # a slot only knows the last frame it held itself
+        frame_ptr = self._frame_ptrs[slot]
+        frame_ptr.uid = self._uid  # type: ignore
+
         read_status = ReadStatus(
-            _dllib.read_frame(self._block_ptr, self._frame_ptr, self._block_thread)
+            _dllib.read_frame(self._block_ptr, frame_ptr, self._block_thread)
         )
 
         if read_status == ReadStatus.SUCCESS:
-            width = self._frame_ptr.width  # type: ignore
-            height = self._frame_ptr.height  # type: ignore
-            depth = self._frame_ptr.depth  # type: ignore
-            itemsize = self._frame_ptr.type_size  # type: ignore
-            data = self._frame_ptr.data  # type: ignore
-            acquisition_time: int = self._frame_ptr.acquisition_time  # type: ignore
+            self._uid = frame_ptr.uid  # type: ignore
+            self._acquisition_time = frame_ptr.acquisition_time  # type: ignore
+            self._frame_data = self._view(slot)
 
-            total_bytes = width * height * depth * itemsize
+        return read_status, self._frame_data, self._acquisition_time
 
-            frame_buffer = ffi.buffer(data, total_bytes)
-            interpret_type = self._type_lookup[itemsize // 4]
+    def _view(self, slot: int) -> np.ndarray:
+        frame_ptr = self._frame_ptrs[slot]
+        width = frame_ptr.width  # type: ignore
+        height = frame_ptr.height  # type: ignore
+        depth = frame_ptr.depth  # type: ignore
+        itemsize = frame_ptr.type_size  # type: ignore
+        data = frame_ptr.data  # type: ignore
 
-            self._acquisition_time = acquisition_time
-            self._frame_data = np.frombuffer(
-                frame_buffer, dtype=interpret_type  # type: ignore
-            ).reshape(height, width, depth)
+        key = (int(ffi.cast("uintptr_t", data)), width, height, depth, itemsize)
+        cached = self._views[slot]
+        if cached is not None and cached[0] == key:
+            return cached[1]
 
-        return read_status, self._frame_data, self._acquisition_time
+        total_bytes = width * height * depth * itemsize
+
+        frame_buffer = ffi.buffer(data, total_bytes)
+        interpret_type = self._type_lookup[itemsize // 4]
+
+        view = np.frombuffer(
+            frame_buffer, dtype=interpret_type  # type: ignore
+        ).reshape(height, width, depth)
+        self._views[slot] = (key, view)
+        return view
 
     def __str__(
         self,
@@ -262,7 +375,7 @@ class BlockAccessor:
         if self._max_entry_size_bytes is None:
             retried = False
             retry_count = 0
-            self._block_ptr = _dllib.open_block(cstr_ptr)  # type: ignore
+            self._block_ptr = _dllib.open_block(cstr_ptr, self._consumer)  # type: ignore
             while self._block_ptr == ffi.NULL:
                 retry_count += 1
 
@@ -273,7 +386,7 @@ class BlockAccessor:
                 )
                 retried = True
                 time.sleep(1)
-                self._block_ptr = _dllib.open_block(cstr_ptr)  # type: ignore
+                self._block_ptr = _dllib.open_block(cstr_ptr, self._consumer)  # type: ignore
 
             if retried:
                 print(f"\nfound {self._direction}!!!", flush=True)
@@ -286,7 +399,11 @@ class BlockAccessor:
             if self._block_ptr == ffi.NULL:
                 raise RuntimeError(f"Failed to access {self._direction}")
 
-        self._frame_ptr = _dllib.create_frame()  # type: ignore
+        self._frame_ptrs = [
+            _dllib.create_frame() for _ in range(self._frame_slots)  # type: ignore
+        ]
+        self._views = [None] * self._frame_slots
+        self._uid = 0
         self._acquisition_time = 0
         self._frame_data = None
         self._inside_ctx_manager = True
@@ -296,10 +413,12 @@ class BlockAccessor:
         if self._block_ptr != ffi.NULL:
             _dllib.delete_block(self._block_ptr)  # type: ignore
 
-        if self._frame_ptr != ffi.NULL:
-            _dllib.delete_frame(self._frame_ptr)  # type: ignore
+        for frame_ptr in self._frame_ptrs:
+            _dllib.delete_frame(frame_ptr)  # type: ignore
 
         self._block_ptr = ffi.NULL;
-        self._frame_ptr = ffi.NULL;
+        self._frame_ptrs = [];
+        self._views = [];
+        self._frame_data = None
         self._inside_ctx_manager = False
     
\ No newline at end of file
@@ -1,60 +1,195 @@
+import os
+import cv2
+import enum
 import time
 import signal
+import multiprocessing
 import threading
 import traceback
+from dataclasses import dataclass
 from numpy import ndarray
-from typing import Tuple, Dict, Callable, List, Generator, Any, Optional
+from typing import Tuple, Dict, Callable, List, Generator, Iterable, Iterator, Any, Optional
 
 from auvlog.client import Logger, log as auvlog
 from vision.core.bindings.camera_message_framework import BlockAccessor
+from vision.core.profiler import LatencyHistogram
+from vision.core.pyramid import PYRAMID_SEPARATOR, pyramid_direction, parse_pyramid_direction, parse_pyramid_scales
+
+
+class PacingPolicy(enum.Enum):
+    """What an FpsLimiter does after falling behind its schedule"""
+
+    SKIP = "skip"
+    """drop the missed deadlines and continue on the original grid"""
+
+    CATCH_UP = "catch-up"
+    """run without sleeping until the missed frames are made up (at most one second worth)"""
 
 
 class FpsLimiter:
-    def __init__(self, name: str, quit_flag: threading.Event):
+    """Paces a capture loop against absolute monotonic deadlines, so sleep overshoot
+    and slow iterations do not accumulate into a lower frame rate. Every wake-up
+    records its lateness against the deadline and the jitter of the frame interval."""
+
+    MAX_BACKLOG = 1.0
+
+    def __init__(self, name: str, quit_flag: threading.Event, policy: PacingPolicy = PacingPolicy.SKIP):
 
         fps_logger: Logger = getattr(
             auvlog.vision.capture_source.fps_limiter, name)
 
+        self._name = name
         self._slow = False
         self._logger = fps_logger
         self._quit_flag = quit_flag
+        self._policy = policy
+
+        self._fps = 0
+        self._target = 0.0
+        self._throttled = True
+        self._deadline = 0.0
+        self._last_wake = 0.0
+
+        self._jitter = LatencyHistogram()
+        self._lateness = LatencyHistogram()
+        self._frames = 0
+        self._skipped = 0
+        self._window_start = time.monotonic()
 
-    def rate(self, fps: Optional[int]):
+    @property
+    def name(self) -> str:
+        return self._name
+
+    def rate(self, fps: Optional[int], policy: Optional[PacingPolicy] = None):
         fps = fps if fps else 0
         assert fps >= 0, "given negative fps which is invalid"
 
         self._fps = fps
-        self._target = 1.0 / fps if fps > 0 else 0
-        self._last_time = 0
+        self._target = 1.0 / fps if fps > 0 and self._throttled else 0
+        if policy is not None:
+            self._policy = policy
         return self
 
+    def unthrottle(self):
+        """Ignore the requested rate and run as fast as the consumer of the frames
+        allows, e.g. in lockstep playback"""
+        self._throttled = False
+        self._target = 0
+
     def __iter__(self):
-        self._last_time = time.monotonic()
+        self._deadline = time.monotonic()
+        self._last_wake = 0.0
         return self
 
     def __next__(self):
         if self._quit_flag.is_set():
             raise StopIteration
 
-        current_time = time.monotonic()
-        elapsed = current_time - self._last_time
+        now = time.monotonic()
+        if now < self._deadline:
+            time.sleep(self._deadline - now)
+
+        wake = time.monotonic()
+        self._frames += 1
+        if self._last_wake > 0:
+            self._jitter.record(abs(wake - self._last_wake - self._target) * 1000)
+        self._last_wake = wake
+
+        if self._target == 0:
+            # unthrottled, there is no schedule to be late for
+            self._deadline = wake
+            return int(wake * 1000)
+
+        late = wake - self._deadline
+        self._lateness.record(late * 1000)
+
+        self._deadline += self._target
+        behind = wake - self._deadline
+        if behind > 0:
+            if not self._slow:
+                self._slow = True
+                self._logger(f"too slow! {late * 1000:.1f} ms behind schedule", True)
+
+            if self._policy == PacingPolicy.SKIP or behind > self.MAX_BACKLOG:
+                missed = int(behind // self._target) + 1
+                self._deadline += missed * self._target
+                self._skipped += missed
+        elif self._slow:
+            self._slow = False
+            self._logger("recovered!", True)
+
+        return int(wake * 1000)
+
+    def stats(self, reset: bool = False) -> Dict[str, Any]:
+        """Pacing statistics since the last reset
+
+        Args:
+            reset (bool): start a new window after reading
+
+        Returns:
+            Dict[str, Any]: target and measured fps, skipped deadlines, and jitter and lateness summaries in ms
+        """
+        elapsed = time.monotonic() - self._window_start
+        frames = self._frames
+        ret = {
+            "target_fps": self._fps,
+            "fps": frames / elapsed if elapsed > 0 else 0.0,
+            "skipped": self._skipped,
+            "jitter": self._jitter.summary(),
+            "lateness": self._lateness.summary(),
+        }
+
+        if reset:
+            self._jitter.reset()
+            self._lateness.reset()
+            self._frames = 0
+            self._skipped = 0
+            self._window_start = time.monotonic()
+        return ret
+
+
+@dataclass
+class DerivedStream:
+    """
+    A stream computed from the frames of a grabber, see CaptureSource.register_grabber.
+    """
+
+    name: str
+    """name of the stream in logs"""
+
+    retrieve: Callable[[Any, int], Iterable[Tuple[str, ndarray]]]
+    """called with the grab result and its acquisition time, yields (direction, image) pairs"""
 
-        time_to_sleep = 0
+    fps: Optional[float] = None
+    """rate of the stream, or None to retrieve on every grab"""
 
-        if elapsed < self._target:
-            if self._slow:
-                self._slow = False
-                self._logger("recovered!", True)
-            time_to_sleep = self._target - elapsed
 
-        elif not self._slow:
-            self._slow = True
-            self._logger("too slow! dropped frames!", True)
+class _StreamSchedule:
+    """Decides on which grabs a derived stream is retrieved. Deadlines lie on a
+    fixed grid like FpsLimiter's; a grab within half a grab period of the deadline
+    counts as on time, so a 2 fps stream on a 30 fps grabber fires every 15th grab
+    instead of drifting to every 16th."""
 
-        time.sleep(time_to_sleep)
+    def __init__(self, stream: DerivedStream, grab_fps: float):
+        self.stream = stream
+        self.retrieved = 0
+        self._period = 1000.0 / stream.fps if stream.fps else 0.0
+        self._slack = 500.0 / grab_fps if grab_fps else 0.0
+        self._deadline: Optional[float] = None
 
-        self._last_time = time.monotonic()
-        return int(self._last_time * 1000)
+    def due(self, acquisition_time: int) -> bool:
+        if self._period == 0:
+            return True
+        if self._deadline is None:
+            self._deadline = float(acquisition_time)
+        if acquisition_time + self._slack < self._deadline:
+            return False
+
+        self._deadline += self._period
+        if self._deadline <= acquisition_time:
+            # fell behind the grid, e.g. after a stalled grab
+            self._deadline = acquisition_time + self._period
+        return True
 
 
 class CaptureSource:
@@ -63,6 +198,8 @@ class CaptureSource:
     instead should be subclassed.
     """
 
+    PACING_REPORT_PERIOD = 10.0
+
     def __init__(self):
         """
         Initializes a capture source in the specified direction.
@@ -82,6 +219,16 @@ class CaptureSource:
         self._frameworks: Dict[str, BlockAccessor] = {}
         self._threads: List[threading.Thread] = []
         self._quit_flag = threading.Event()
+        self._limiters: List[FpsLimiter] = []
+        self._aliases: Dict[str, List[str]] = {}
+        self._schedules: Dict[str, List[_StreamSchedule]] = {}
+        self._pyramids: Dict[str, List[int]] = {}
+        self._write_times: Dict[str, LatencyHistogram] = {}
+        self._written_bytes: Dict[str, int] = {}
+        self._write_window = time.monotonic()
+        self._isolated: List[Tuple[str, PacingPolicy, Callable[[FpsLimiter], Iterable[Tuple[str, int, ndarray]]]]] = []
+        self._process_quit: Optional[Any] = None
+        self._lockstep = 0
 
     def run_event_loop(self):
         def signal_handler(sig, frame):
@@ -90,20 +237,103 @@ class CaptureSource:
 
         signal.signal(signal.SIGINT, signal_handler)
 
+        # fork before any thread runs, so no child inherits a lock held by a thread
+        for name, policy, frames in self._isolated:
+            self._threads.append(self._spawn(name, policy, frames))
+
         for t in self._threads:
             t.start()
 
+        next_report = time.monotonic() + self.PACING_REPORT_PERIOD
         while not self._quit_flag.is_set():
             time.sleep(0.1)
 
+            if time.monotonic() >= next_report:
+                next_report += self.PACING_REPORT_PERIOD
+                self._report_pacing()
+
         for t in self._threads:
             t.join()
 
         self._logger(f"graceful shut down", True)
 
-    def register_logical_udl(self, udl: Callable[[FpsLimiter, Tuple[Any, ...]], None], args: Tuple[Any, ...] = ()):
+    def pacing_stats(self, reset: bool = False) -> Dict[str, Dict[str, Any]]:
+        """
+        Pacing statistics of every udl's FpsLimiter, see FpsLimiter.stats.
+
+        Args:
+            reset: start a new statistics window after reading.
+
+        Returns:
+            statistics keyed by udl name.
+        """
+        ret = {limiter.name: limiter.stats(reset) for limiter in self._limiters}
+        for name, schedules in self._schedules.items():
+            ret[name]["streams"] = {schedule.stream.name: schedule.retrieved for schedule in schedules}
+            if reset:
+                for schedule in schedules:
+                    schedule.retrieved = 0
+        return ret
+
+    def write_stats(self, reset: bool = False) -> Dict[str, Dict[str, Any]]:
+        """
+        Time spent writing frames into each direction since the last reset,
+        excluding lockstep waits.
+
+        Args:
+            reset: start a new statistics window after reading.
+
+        Returns:
+            write time summaries in ms and throughput in MB/s, keyed by direction.
+        """
+        elapsed = time.monotonic() - self._write_window
+        ret = {}
+        for direction, histogram in list(self._write_times.items()):
+            ret[direction] = {
+                "write": histogram.summary(),
+                "mb_per_s": self._written_bytes[direction] / (1 << 20) / elapsed if elapsed > 0 else 0.0,
+            }
+            if reset:
+                histogram.reset()
+                self._written_bytes[direction] = 0
+        if reset:
+            self._write_window = time.monotonic()
+        return ret
+
+    def _report_pacing(self):
+        for direction, stats in self.write_stats(reset=True).items():
+            if stats["write"]["count"] == 0:
+                continue
+            self._logger(
+                f"'{direction}' write p50 {stats['write']['p50']:.2f} ms p99 {stats['write']['p99']:.2f} ms, "
+                f"{stats['mb_per_s']:.1f} MB/s",
+                True,
+            )
+
+        for name, stats in self.pacing_stats(reset=True).items():
+            if stats["lateness"]["count"] == 0:
+                continue
+            self._logger(
+                f"'{name}' {stats['fps']:.1f}/{stats['target_fps']} fps, "
+                f"jitter p50 {stats['jitter']['p50']:.2f} ms p99 {stats['jitter']['p99']:.2f} ms, "
+                f"late p99 {stats['lateness']['p99']:.2f} ms, skipped {stats['skipped']}"
+                + "".join(f", '{stream}' {count} frames" for stream, count in stats.get("streams", {}).items()),
+                True,
+            )
+
+    def register_logical_udl(self, udl: Callable[[FpsLimiter, Tuple[Any, ...]], None], args: Tuple[Any, ...] = (),
+                             policy: PacingPolicy = PacingPolicy.SKIP):
+        # limiters are reported by name, so every logical udl gets its own
+        taken = {limiter.name for limiter in self._limiters}
+        name, suffix = udl.__name__, 1
+        while name in taken:
+            suffix += 1
+            name = f"{udl.__name__}{suffix}"
+
+        fps_limiter = FpsLimiter(name, self._quit_flag, policy)
+        self._limiters.append(fps_limiter)
+
         def callback():
-            fps_limiter = FpsLimiter('', self._quit_flag)
             try:
                 udl(fps_limiter, args)
             except Exception as e:
@@ -116,14 +346,91 @@ class CaptureSource:
         thread = threading.Thread(target=callback)
         self._threads.append(thread)
 
-    def register_capture_udl(self, name: str, udl: Callable[[FpsLimiter, Tuple[Any, ...]], Generator[Tuple[str, int, ndarray], None, None]], args: Tuple[Any, ...] = ()):
+    def register_capture_udl(self, name: str, udl: Callable[[FpsLimiter, Tuple[Any, ...]], Generator[Tuple[str, int, ndarray], None, None]], args: Tuple[Any, ...] = (),
+                             policy: PacingPolicy = PacingPolicy.SKIP, isolation: str = "thread"):
+        """
+        Registers a udl that yields (direction, acquisition time, image) tuples.
+
+        Args:
+            name: name of the udl in logs and pacing statistics.
+            udl: generator paced by the FpsLimiter it is given.
+            args: arguments to `udl`.
+            policy: pacing policy of the udl.
+            isolation: "thread" runs the udl on a thread of this process.
+                "process" runs it in a forked child process that writes its own
+                blocks, so CPU heavy Python in the udl does not hold the GIL of
+                the other udls. The child stops with the capture source, and an
+                exception in it stops the capture source. Device handles in
+                `args` must survive a fork, or be opened inside the udl.
+        """
+        self._add_capture(name, policy, lambda fps_limiter: udl(fps_limiter, args), isolation)
+
+    def register_grabber(self, name: str, grab: Callable[[Tuple[Any, ...]], Any], streams: List[DerivedStream],
+                         fps: Optional[float] = None, args: Tuple[Any, ...] = (),
+                         policy: PacingPolicy = PacingPolicy.SKIP, isolation: str = "thread"):
+        """
+        Registers one producer thread that acquires frames from a device and any
+        number of streams derived from them. Every iteration calls `grab` once,
+        then retrieves the streams that are due at their own rates from that same
+        grab, in the order given. Nothing else touches the device from this
+        thread, so streams never race the grab or retrieve a result twice.
+
+        Args:
+            name: name of the grabber in logs and pacing statistics.
+            grab: called with `args` at the grab rate. Returns the grab result
+                that is handed to the streams, or None once the device is
+                exhausted. Raises on device errors.
+            streams: streams derived from each grab.
+            fps: grab rate, by default the rate of the fastest stream.
+            args: arguments to `grab`.
+            policy: pacing policy of the grab loop.
+            isolation: "thread" or "process", see register_capture_udl.
+        """
+        assert streams, "a grabber needs at least one stream"
+        if fps is None:
+            rates = [stream.fps for stream in streams]
+            fps = 0 if not all(rates) else max(rates)  # type: ignore
+
+        schedules = [_StreamSchedule(stream, fps) for stream in streams]
+        self._schedules[name] = schedules
+
+        def frames(fps_limiter: FpsLimiter) -> Iterator[Tuple[str, int, ndarray]]:
+            for acquisition_time in fps_limiter.rate(fps):  # type: ignore
+                result = grab(args)
+                if result is None:
+                    return
+
+                for schedule in schedules:
+                    if not schedule.due(acquisition_time):
+                        continue
+                    schedule.retrieved += 1
+                    for direction, img in schedule.stream.retrieve(result, acquisition_time):
+                        yield direction, acquisition_time, img
+
+        self._add_capture(name, policy, frames, isolation)
+
+    def _capture_limiter(self, name: str, policy: PacingPolicy) -> FpsLimiter:
+        fps_limiter = FpsLimiter(name, self._quit_flag, policy)
+        if self._lockstep:
+            fps_limiter.unthrottle()
+        self._limiters.append(fps_limiter)
+        return fps_limiter
+
+    def _add_capture(self, name: str, policy: PacingPolicy,
+                     frames: Callable[[FpsLimiter], Iterable[Tuple[str, int, ndarray]]], isolation: str):
+        assert isolation in ("thread", "process"), f"unknown isolation '{isolation}'"
+        if isolation == "process":
+            # the limiter is created in the child, see _run_isolated
+            self._isolated.append((name, policy, frames))
+            return
+
+        fps_limiter = self._capture_limiter(name, policy)
+
         def callback():
             self._logger(f"starting capture udl '{name}'", True)
 
-            fps_limiter = FpsLimiter(name, self._quit_flag)
-
             try:
-                for direction, acquisition_time, img in udl(fps_limiter, args):
+                for direction, acquisition_time, img in frames(fps_limiter):
                     self._send(direction, acquisition_time, img)
             except Exception as e:
                 self._logger(
@@ -131,26 +438,224 @@ class CaptureSource:
                 traceback.print_exc()
                 self._quit_flag.set()
 
-            ive_set = not self._quit_flag.is_set()
-            self._quit_flag.set()
-
-            if ive_set:
-                self._logger(f"capture udl '{name}' exhausted", True)
-            else:
-                self._logger(
-                    f"capture udl '{name}' stopped as a result of another stop signal", True)
+            self._stopped(name)
 
         thread = threading.Thread(target=callback)
         self._threads.append(thread)
 
-    def _send(self, direction: str, acquisition_time: int, img: ndarray):
+    def _stopped(self, name: str):
+        ive_set = not self._quit_flag.is_set()
+        self._quit_flag.set()
+
+        if ive_set:
+            self._logger(f"capture udl '{name}' exhausted", True)
+        else:
+            self._logger(
+                f"capture udl '{name}' stopped as a result of another stop signal", True)
+
+    def _spawn(self, name: str, policy: PacingPolicy,
+               frames: Callable[[FpsLimiter], Iterable[Tuple[str, int, ndarray]]]) -> threading.Thread:
+        """Forks the child of an isolated udl, and returns the thread that relays
+        quit signals and exceptions between it and this process"""
+        ctx = multiprocessing.get_context("fork")
+        if self._process_quit is None:
+            self._process_quit = ctx.Event()
+        quit_event = self._process_quit
+
+        receiver, sender = ctx.Pipe(duplex=False)
+        process = ctx.Process(target=self._run_isolated, args=(name, policy, frames, sender, os.getpid()),
+                              name=f"capture udl {name}")
+        process.start()
+        sender.close()
+
+        def monitor():
+            # the child sends its traceback, or an empty string, right before it
+            # exits. It is read while waiting, since a traceback larger than the
+            # pipe buffer blocks the child until it is received
+            error = None
+            while error is None:
+                if self._quit_flag.is_set():
+                    quit_event.set()
+                if receiver.poll(0.1):
+                    try:
+                        error = receiver.recv()
+                    except EOFError:
+                        error = ""
+                elif not process.is_alive() and not receiver.poll():
+                    error = ""
+
+            quit_event.set()
+            process.join()
+
+            if error:
+                self._logger(
+                    f"Caught exception in {name} (pid {process.pid}) printing stack trace and unwinding ...")
+                print(error, end="")
+            elif process.exitcode != 0:
+                self._logger(f"capture udl '{name}' (pid {process.pid}) died with exit code {process.exitcode}", True)
+            receiver.close()
+
+            self._stopped(name)
+
+        return threading.Thread(target=monitor)
+
+    def _run_isolated(self, name: str, policy: PacingPolicy,
+                      frames: Callable[[FpsLimiter], Iterable[Tuple[str, int, ndarray]]],
+                      errors: Any, parent: int):
+        # entry point of the child process. Ctrl-C reaches the parent, which
+        # stops every child through the shared quit event
+        signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+        # blocks and statistics of the parent stay with the parent; the child
+        # exits through os._exit, so nothing inherited is ever torn down here
+        self._frameworks = {}
+        self._limiters = []
+        self._write_times = {}
+        self._written_bytes = {}
+        self._write_window = time.monotonic()
+        self._schedules = {k: v for k, v in self._schedules.items() if k == name}
+        self._quit_flag = self._process_quit
+
+        fps_limiter = self._capture_limiter(name, policy)
+        self._logger(f"starting capture udl '{name}' in process {os.getpid()}", True)
+
+        error = ""
+        try:
+            next_report = time.monotonic() + self.PACING_REPORT_PERIOD
+            for direction, acquisition_time, img in frames(fps_limiter):
+                self._send(direction, acquisition_time, img)
+
+                if os.getppid() != parent:
+                    break
+                if time.monotonic() >= next_report:
+                    next_report += self.PACING_REPORT_PERIOD
+                    self._report_pacing()
+        except Exception:
+            error = traceback.format_exc()
+        finally:
+            for accessor in self._frameworks.values():
+                accessor.__exit__(None, None, None)
+
+        errors.send(error)
+        errors.close()
+
+    def lockstep(self, consumers: int = 1):
+        """
+        Plays back in lockstep with the readers instead of at a fixed rate. Every
+        frame is written only after all registered readers of the direction, and at
+        least `consumers` of them, have read the previous one. Udls run as fast as
+        the slowest reader, and no frame is overwritten unread. Meant for offline
+        sources like video files and image directories. Only modules started with
+        --lockstep register as readers; viewers like the stream server and modules
+        hosted by the supervisor, which read through a hub, are not waited for.
+
+        Args:
+            consumers: readers to wait for before the first frame is written.
+        """
+        assert consumers > 0, "lockstep needs at least one consumer"
+        self._lockstep = consumers
+        for limiter in self._limiters:
+            limiter.unthrottle()
+
+    def alias(self, direction: str, *aliases: str):
+        """
+        Publishes a direction under more names. Frames sent to `direction` are
+        written once and readers of any alias see them, so mirroring a stream
+        costs no extra bandwidth. Only send frames to `direction` itself.
+
+        Args:
+            direction: direction the udl sends frames to.
+            aliases: additional direction names.
+        """
+        self._aliases.setdefault(direction, []).extend(aliases)
+        for scale in [1] + self._pyramids.get(direction, []):
+            level = pyramid_direction(direction, scale)
+            if level in self._frameworks:
+                for alias in aliases:
+                    self._frameworks[level].create_alias(pyramid_direction(alias, scale))
+
+    def pyramid(self, direction: str, *scales: int):
+        """
+        Publishes downscaled copies of a direction next to it, e.g. 'forward@2' and
+        'forward@4' for scales 2 and 4. Every level is computed once per frame in
+        the capture process, each from the finest level it evenly divides, so
+        modules subscribe to the resolution they need instead of resizing the full
+        frame themselves. Aliases of `direction` get aliased levels too, e.g.
+        'forward2@2'.
+
+        Args:
+            direction: direction the udl sends frames to.
+            scales: downscale factors, at least 2, by default 2 and 4.
+        """
+        scales = scales or (2, 4)
+        assert all(scale >= 2 for scale in scales), "downscale factors must be at least 2"
+        self._pyramids[direction] = sorted(set(scales))
+
+    def _accessor(self, direction: str, img: ndarray, aliases: List[str]) -> BlockAccessor:
         if direction not in self._frameworks:
             self._frameworks[direction] = BlockAccessor(
                 direction,
                 max_entry_size_bytes=img.size*img.itemsize
             )
             self._frameworks[direction].__enter__()
-        self._frameworks[direction].write_frame(acquisition_time, img)
+            for alias in aliases:
+                self._frameworks[direction].create_alias(alias)
+            if self._lockstep:
+                self._frameworks[direction].set_lockstep()
+        return self._frameworks[direction]
+
+    def _levels(self, direction: str, img: ndarray) -> List[Tuple[int, ndarray]]:
+        levels = [(1, img)]
+        computed = {1: img}
+        for scale in self._pyramids.get(direction, []):
+            base = max(s for s in computed if scale % s == 0)
+            factor = scale // base
+            src = computed[base]
+            size = (max(1, src.shape[1] // factor), max(1, src.shape[0] // factor))
+            computed[scale] = cv2.resize(src, size, interpolation=cv2.INTER_AREA)  # type: ignore
+            levels.append((scale, computed[scale]))
+        return levels
+
+    def _wait_readers(self, direction: str, accessors: List[BlockAccessor]) -> bool:
+        # readers may subscribe to any level of a pyramid, so the minimum applies to
+        # all of its levels together and every level waits for its own readers
+        waited = 0
+        while not self._quit_flag.is_set():
+            if all(accessor.wait_consumers(0, 500) for accessor in accessors):
+                registered = sum(accessor.consumer_count() for accessor in accessors)
+                if registered >= self._lockstep:
+                    return True
+                time.sleep(0.1)
+
+            waited += 1
+            if waited % 10 == 0:
+                self._logger(
+                    f"lockstep: '{direction}' waiting for readers "
+                    f"({sum(a.consumer_count() for a in accessors)} of at least {self._lockstep} registered)", True)
+        return False
+
+    def _send(self, direction: str, acquisition_time: int, img: ndarray):
+        levels = self._levels(direction, img)
+        aliases = self._aliases.get(direction, [])
+        accessors = [
+            self._accessor(pyramid_direction(direction, scale), level,
+                           [pyramid_direction(alias, scale) for alias in aliases])
+            for scale, level in levels
+        ]
+
+        if self._lockstep and not self._wait_readers(direction, accessors):
+            return
+
+        for accessor, (scale, level) in zip(accessors, levels):
+            name = pyramid_direction(direction, scale)
+            if name not in self._write_times:
+                self._write_times[name] = LatencyHistogram()
+                self._written_bytes[name] = 0
+
+            start = time.perf_counter()
+            accessor.write_frame(acquisition_time, level)
+            self._write_times[name].record((time.perf_counter() - start) * 1000)
+            self._written_bytes[name] += level.nbytes
 
     def __del__(self):
         for accessors in self._frameworks.values():
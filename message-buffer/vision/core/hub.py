@@ -0,0 +1,140 @@
+import threading
+import numpy as np
+
+from typing import Any, Dict, List, Optional, Tuple
+
+from vision.core.bindings.camera_message_framework import BlockAccessor, ReadStatus
+
+
+class SharedSource:
+    """Reads a single video source on a background thread on behalf of every module
+    in the process. Each new frame is copied out of shared memory once into a fresh
+    read-only array, which subscribers receive by reference unless they asked for
+    a copy."""
+
+    def __init__(self, name: str, byte_type: type, short_type: type, long_type: type):
+        self._name = name
+        self._types = (byte_type, short_type, long_type)
+        self._quit_flag = threading.Event()
+
+        # sequence number, frame and acquisition time of the newest frame. Replaced
+        # as a whole, so readers never see a torn update
+        self._latest: Tuple[int, Optional[np.ndarray], int] = (0, None, 0)
+        self._deleted = False
+
+        self._thread = threading.Thread(target=self._run, name=f"hub-{name}", daemon=True)
+        self._thread.start()
+
+    @property
+    def deleted(self) -> bool:
+        return self._deleted
+
+    @property
+    def latest(self) -> Tuple[int, Optional[np.ndarray], int]:
+        return self._latest
+
+    def stop(self):
+        """Stop reading. A source that never appeared leaves its thread waiting for the
+        block, which exits on its own if the block ever shows up"""
+        self._quit_flag.set()
+        self._thread.join(timeout=2)
+
+    def _run(self):
+        accessor = BlockAccessor(
+            self._name,
+            byte_type=self._types[0],
+            short_type=self._types[1],
+            long_type=self._types[2],
+            block_thread=True,
+        )
+        with accessor:
+            while not self._quit_flag.is_set():
+                status, data, acquisition_time = accessor.read_frame()
+
+                if status == ReadStatus.SUCCESS and data is not None:
+                    frame = data.copy()
+                    frame.flags.writeable = False
+                    self._latest = (self._latest[0] + 1, frame, acquisition_time)
+                elif status == ReadStatus.FRAMEWORK_DELETED:
+                    self._deleted = True
+                    return
+
+
+class HubSubscription:
+    """A module's view of a shared source, with the same read semantics as a
+    BlockAccessor. By default it returns the frame all subscribers share, which is
+    read-only. Copying subscriptions copy every new frame into an array they own,
+    so the module may draw on it like on a frame it read itself."""
+
+    def __init__(self, source: SharedSource, types: Tuple[type, type, type], copy: bool = False):
+        self._source = source
+        self._types = types
+        self._copy = copy
+        self._seen = 0
+        self._frame: Optional[np.ndarray] = None
+        self._acquisition_time = 0
+
+    def read_frame(self) -> Tuple[ReadStatus, Optional[np.ndarray], int]:
+        seq, frame, acquisition_time = self._source.latest
+
+        if seq == self._seen or frame is None:
+            status = ReadStatus.FRAMEWORK_DELETED if self._source.deleted else ReadStatus.NO_NEW_FRAME
+            return status, self._frame, self._acquisition_time
+
+        # subscribers may interpret the same bytes with different types
+        dtype = self._types[frame.itemsize // 4]
+        if frame.dtype != dtype:
+            frame = frame.view(dtype)
+
+        if self._copy:
+            frame = frame.copy()
+
+        self._seen = seq
+        self._frame = frame
+        self._acquisition_time = acquisition_time
+        return ReadStatus.SUCCESS, frame, acquisition_time
+
+
+class SourceHub:
+    """Owns one SharedSource per video source name, so modules hosted in the same
+    process read every source from shared memory exactly once."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._sources: Dict[str, SharedSource] = {}
+
+    def subscribe(self, source: Any, copy: bool = False) -> HubSubscription:
+        """Subscribe to a video source
+
+        Args:
+            source (VideoSource): source name and data types to read with
+            copy (bool): receive a private copy of every frame instead of the read-only frame shared by all subscribers
+
+        Returns:
+            HubSubscription: reader for the source
+        """
+        types = (source.byte_type, source.short_type, source.long_type)
+
+        with self._lock:
+            shared_source = self._sources.get(source.name)
+
+            # a deleted source is reopened, and waits for the capture source to return
+            if shared_source is not None and shared_source.deleted:
+                shared_source.stop()
+                shared_source = None
+
+            if shared_source is None:
+                shared_source = SharedSource(source.name, *types)
+                self._sources[source.name] = shared_source
+
+        return HubSubscription(shared_source, types, copy)
+
+    @property
+    def sources(self) -> List[str]:
+        return list(self._sources.keys())
+
+    def close(self):
+        with self._lock:
+            for shared in self._sources.values():
+                shared.stop()
+            self._sources.clear()
@@ -0,0 +1,174 @@
+import numpy as np
+
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Sequence, Union
+
+from vision.core.base import ModuleBase
+
+
+@dataclass
+class Stage:
+    """data class describing a single node of a pipeline"""
+
+    name: str
+
+    fn: Callable[..., Any]
+    """called with the outputs of `inputs`, in order"""
+
+    inputs: List[str] = field(default_factory=list)
+    """names of the stages (or pipeline inputs) this stage consumes"""
+
+    post: bool = False
+    """if true, the output of this stage is posted to the webgui after every run"""
+
+    level: int = 0
+    """longest distance from a pipeline input; stages on the same level are independent"""
+
+
+class Pipeline:
+    """Chains vision stages as a DAG inside a single process.
+
+    Stages exchange outputs by reference, so nothing is copied between stages
+    (stages must therefore never modify their inputs in place). Stages that do
+    not depend on each other run concurrently on a thread pool, which scales
+    well because OpenCV releases the GIL. Selected intermediate outputs can
+    still be posted to the webgui through the owning module.
+
+    Example:
+        pipeline = Pipeline(["image"], module=self)
+        pipeline.add("pre", lambda img: self.preprocessor.process(img)[0], ["image"])
+        pipeline.add("lab", lambda img: cv2.cvtColor(img, cv2.COLOR_BGR2LAB), ["pre"])
+        pipeline.add("hsv", lambda img: cv2.cvtColor(img, cv2.COLOR_BGR2HSV), ["pre"])
+        pipeline.add("mask", threshold, ["lab", "hsv"], post=True)
+        outputs = pipeline.run(image=image)
+    """
+
+    def __init__(
+        self,
+        inputs: Sequence[str] = ("image",),
+        module: Optional[ModuleBase] = None,
+        max_workers: Optional[int] = None,
+    ):
+        """Create an empty pipeline
+
+        Args:
+            inputs (Sequence[str], optional): names of the values passed into `run`. Defaults to ("image",).
+            module (Optional[ModuleBase], optional): module used to post stage outputs. Defaults to None.
+            max_workers (Optional[int], optional): threads used to run independent stages. Defaults to the widest level.
+        """
+        self._inputs = list(inputs)
+        self._module = module
+        self._max_workers = max_workers
+        self._stages: Dict[str, Stage] = {}
+        self._levels: List[List[Stage]] = []
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    @property
+    def stages(self) -> List[Stage]:
+        return list(self._stages.values())
+
+    def add(
+        self,
+        name: str,
+        fn: Callable[..., Any],
+        inputs: Union[str, Sequence[str]] = "image",
+        post: bool = False,
+    ) -> "Pipeline":
+        """Add a stage. Inputs must already exist, which keeps the graph acyclic.
+
+        Args:
+            name (str): unique name of the stage, also used as the post name
+            fn (Callable[..., Any]): stage function, called with the outputs of `inputs`
+            inputs (Union[str, Sequence[str]], optional): stages or pipeline inputs to consume. Defaults to "image".
+            post (bool, optional): post the output of this stage. Defaults to False.
+
+        Raises:
+            RuntimeError: if the name is taken, or an input does not exist
+
+        Returns:
+            Pipeline: self, so stages can be chained
+        """
+        inputs = [inputs] if isinstance(inputs, str) else list(inputs)
+
+        if name in self._stages or name in self._inputs:
+            raise RuntimeError(f"pipeline already has a stage named '{name}'")
+
+        for inp in inputs:
+            if inp not in self._stages and inp not in self._inputs:
+                raise RuntimeError(f"stage '{name}' depends on unknown stage '{inp}'")
+
+        level = 1 + max(
+            (self._stages[inp].level for inp in inputs if inp in self._stages),
+            default=0,
+        )
+        stage = Stage(name, fn, inputs, post, level)
+        self._stages[name] = stage
+
+        while len(self._levels) < level:
+            self._levels.append([])
+        self._levels[level - 1].append(stage)
+
+        # the pool is sized for the widest level, so recreate it lazily
+        self._shutdown_executor()
+        return self
+
+    def run(self, **inputs: Any) -> Dict[str, Any]:
+        """Run every stage once, level by level
+
+        Returns:
+            Dict[str, Any]: outputs of every stage and the pipeline inputs, by name
+        """
+        missing = set(self._inputs) - inputs.keys()
+        if missing:
+            raise RuntimeError(f"missing pipeline inputs: {sorted(missing)}")
+
+        outputs: Dict[str, Any] = dict(inputs)
+
+        for level in self._levels:
+            if len(level) == 1:
+                stage = level[0]
+                outputs[stage.name] = stage.fn(*(outputs[i] for i in stage.inputs))
+                continue
+
+            executor = self._get_executor()
+            futures = [
+                (stage, executor.submit(stage.fn, *(outputs[i] for i in stage.inputs)))
+                for stage in level
+            ]
+            for stage, future in futures:
+                outputs[stage.name] = future.result()
+
+        if self._module is not None:
+            for stage in self._stages.values():
+                if stage.post and isinstance(outputs[stage.name], np.ndarray):
+                    self._module.post(stage.name, outputs[stage.name])
+
+        return outputs
+
+    def close(self):
+        """Release the worker threads"""
+        self._shutdown_executor()
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            width = max(len(level) for level in self._levels)
+            workers = self._max_workers if self._max_workers else width
+            self._executor = ThreadPoolExecutor(
+                max_workers=workers, thread_name_prefix="pipeline"
+            )
+        return self._executor
+
+    def _shutdown_executor(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, type, value, traceback):
+        self.close()
+
+    def __del__(self):
+        self._shutdown_executor()
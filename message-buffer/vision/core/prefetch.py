@@ -0,0 +1,105 @@
+import time
+import threading
+import numpy as np
+
+from typing import Optional, Tuple
+
+from vision.core.bindings.camera_message_framework import BlockAccessor, ReadStatus
+
+
+class FramePrefetcher:
+    """Copies the newest frame of a source out of shared memory on a background thread.
+
+    The accessor owns three local frame slots: the one handed to the consumer, the
+    newest complete frame waiting to be taken, and the one being filled. The reader
+    thread always fills a slot that is neither of the first two, so process() starts
+    on a frame that already sits in local memory and is never overwritten while it
+    is in use. Slots and their numpy views are reused between frames.
+    """
+
+    SLOTS = 3
+
+    def __init__(self, accessor: BlockAccessor):
+        """Create a prefetcher over an accessor opened with `frame_slots=3` and
+        `block_thread` enabled, so the reader wakes as soon as a frame is written
+
+        Args:
+            accessor (BlockAccessor): accessor to read from, already inside its context manager
+        """
+        self._accessor = accessor
+        self._lock = threading.Lock()
+        self._quit_flag = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+        self._ready: Optional[int] = None
+        self._busy: Optional[int] = None
+        self._frames: list = [None] * self.SLOTS
+        self._last: Tuple[Optional[np.ndarray], int] = (None, 0)
+        self._deleted = False
+        self._error: Optional[BaseException] = None
+
+    def start(self):
+        if self._thread is not None:
+            raise RuntimeError("prefetcher is already running")
+
+        self._quit_flag.clear()
+        self._thread = threading.Thread(
+            target=self._run, name=f"prefetch-{self._accessor.direction}", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self):
+        """Stop the reader thread. Blocking reads time out within about a second"""
+        if self._thread is None:
+            return
+
+        self._quit_flag.set()
+        self._thread.join()
+        self._thread = None
+
+    def take(self) -> Tuple[ReadStatus, Optional[np.ndarray], int]:
+        """Hand the newest prefetched frame to the caller, with the same return
+        values as `BlockAccessor.read_frame`. The frame stays valid until the next call."""
+        with self._lock:
+            if self._error is not None:
+                raise RuntimeError(
+                    f"prefetching {self._accessor.direction} failed: {self._error}"
+                )
+
+            if self._ready is None:
+                status = (
+                    ReadStatus.FRAMEWORK_DELETED if self._deleted else ReadStatus.NO_NEW_FRAME
+                )
+                return status, self._last[0], self._last[1]
+
+            self._busy, self._ready = self._ready, None
+            self._last = self._frames[self._busy]
+            return ReadStatus.SUCCESS, self._last[0], self._last[1]
+
+    def _run(self):
+        try:
+            while not self._quit_flag.is_set():
+                # in lockstep every frame must reach the consumer, so an untaken
+                # frame is never replaced by a newer one
+                if self._ready is not None and self._accessor.is_lockstep():
+                    time.sleep(0.0005)
+                    continue
+
+                with self._lock:
+                    slot = next(
+                        s for s in range(self.SLOTS) if s != self._ready and s != self._busy
+                    )
+
+                status, data, acquisition_time = self._accessor.read_frame_into(slot)
+
+                if status == ReadStatus.SUCCESS:
+                    with self._lock:
+                        self._frames[slot] = (data, acquisition_time)
+                        self._ready = slot
+                elif status == ReadStatus.FRAMEWORK_DELETED:
+                    with self._lock:
+                        self._deleted = True
+                    return
+        except Exception as e:
+            with self._lock:
+                self._error = e
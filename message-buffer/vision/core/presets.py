@@ -0,0 +1,111 @@
+import os
+import json
+from typing import Any, Dict, List, Optional, Tuple
+
+PRESET_DIRECTORY_ENV = "AUV_VISION_PRESETS"
+"""environment variable overriding the directory presets are stored in"""
+
+
+def preset_directory() -> str:
+    """
+    Returns:
+        the directory holding one preset file per module class.
+    """
+    if os.environ.get(PRESET_DIRECTORY_ENV):
+        return os.environ[PRESET_DIRECTORY_ENV]
+    config = os.environ.get("XDG_CONFIG_HOME", os.path.expanduser("~/.config"))
+    return os.path.join(config, "auv-vision", "presets")
+
+
+def module_class(module_name: str) -> str:
+    """
+    Args:
+        module_name: name of a running module, like 'Buoy-on-forward'.
+
+    Returns:
+        the module class the name belongs to, which presets are keyed by.
+    """
+    return module_name.split("-on-")[0]
+
+
+class PresetStore:
+    """
+    Named snapshots of tuner values for one module class, kept in a single JSON
+    file mapping preset names to {tuner name: value}. Presets are shared by every
+    instance of the class regardless of its video sources, and only hold the
+    tuners they were saved with, so a preset still applies after tuners were
+    added to or removed from the module.
+    """
+
+    def __init__(self, module_class: str, directory: Optional[str] = None):
+        """
+        Args:
+            module_class: class name of the module.
+            directory: directory of the preset files, see preset_directory.
+        """
+        self._path = os.path.join(directory or preset_directory(), f"{module_class}.json")
+
+    @property
+    def path(self) -> str:
+        return self._path
+
+    def _read(self) -> Dict[str, Dict[str, Any]]:
+        try:
+            with open(self._path) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+
+    def _write(self, presets: Dict[str, Dict[str, Any]]):
+        os.makedirs(os.path.dirname(self._path), exist_ok=True)
+        tmp_path = f"{self._path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(presets, f, indent=2, sort_keys=True)
+        os.replace(tmp_path, self._path)
+
+    def names(self) -> List[str]:
+        return sorted(self._read())
+
+    def load(self, name: str) -> Dict[str, Any]:
+        """
+        Args:
+            name: preset name.
+
+        Raises:
+            KeyError: if there is no preset of that name.
+
+        Returns:
+            tuner values keyed by tuner name.
+        """
+        presets = self._read()
+        if name not in presets:
+            raise KeyError(f"no preset '{name}' in {self._path}, available: {sorted(presets)}")
+        return presets[name]
+
+    def save(self, name: str, values: Dict[str, Any]):
+        """Store `values` under `name`, replacing a preset of the same name"""
+        presets = self._read()
+        presets[name] = dict(values)
+        self._write(presets)
+
+    def delete(self, name: str):
+        presets = self._read()
+        if presets.pop(name, None) is not None:
+            self._write(presets)
+
+    @staticmethod
+    def diff(current: Dict[str, Any], preset: Dict[str, Any]) -> Dict[str, Tuple[Any, Any]]:
+        """
+        Args:
+            current: tuner values of a running module.
+            preset: values of a preset.
+
+        Returns:
+            (current, preset) value pairs of the tuners the preset would change.
+            Tuners the module no longer has are left out.
+        """
+        return {
+            name: (current[name], value)
+            for name, value in preset.items()
+            if name in current and current[name] != value
+        }
@@ -0,0 +1,142 @@
+import json
+import time
+import bisect
+import contextlib
+import numpy as np
+
+from typing import Dict, List
+
+from vision.core.bindings.camera_message_framework import encode_str, decode_str
+
+# 8 log-spaced bins per decade between 1 us and 100 s, in milliseconds
+_BIN_EDGES_MS: List[float] = [10 ** (e / 8) for e in range(-24, 41)]
+
+_NO_PROFILE = contextlib.nullcontext()
+
+
+class LatencyHistogram:
+    """Log-spaced histogram of durations in milliseconds. Recording is a bisect
+    and an increment, so it is cheap enough to run on every frame."""
+
+    def __init__(self):
+        self._counts = [0] * (len(_BIN_EDGES_MS) + 1)
+        self._count = 0
+        self._total = 0.0
+        self._max = 0.0
+
+    @property
+    def count(self) -> int:
+        return self._count
+
+    def record(self, ms: float):
+        self._counts[bisect.bisect_left(_BIN_EDGES_MS, ms)] += 1
+        self._count += 1
+        self._total += ms
+        self._max = max(self._max, ms)
+
+    def percentile(self, p: float) -> float:
+        """returns the p-th percentile (0-100), interpolated within its bin and never
+        above the largest recorded duration"""
+        if self._count == 0:
+            return 0.0
+
+        target = self._count * p / 100
+        cumulative = 0
+        for idx, count in enumerate(self._counts):
+            if count == 0 or cumulative + count < target:
+                cumulative += count
+                continue
+            if idx == 0 or idx == len(_BIN_EDGES_MS):
+                return self._max if idx > 0 else min(_BIN_EDGES_MS[0], self._max)
+
+            # bins are log-spaced, so interpolate the exponent
+            lower, upper = _BIN_EDGES_MS[idx - 1], _BIN_EDGES_MS[idx]
+            fraction = (target - cumulative) / count
+            return min(lower * (upper / lower) ** fraction, self._max)
+        return self._max
+
+    def mean(self) -> float:
+        return self._total / self._count if self._count > 0 else 0.0
+
+    def summary(self) -> Dict[str, float]:
+        return {
+            "count": self._count,
+            "mean": self.mean(),
+            "p50": self.percentile(50),
+            "p95": self.percentile(95),
+            "p99": self.percentile(99),
+            "max": self._max,
+        }
+
+    def reset(self):
+        self._counts = [0] * len(self._counts)
+        self._count = 0
+        self._total = 0.0
+        self._max = 0.0
+
+
+class _Section:
+    __slots__ = ("_histogram", "_start")
+
+    def __init__(self, histogram: LatencyHistogram):
+        self._histogram = histogram
+        self._start = 0.0
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, type, value, traceback):
+        self._histogram.record((time.perf_counter() - self._start) * 1000)
+
+
+class Profiler:
+    """Collects per-section timing histograms for a vision module. When disabled,
+    `section` hands out a shared no-op context manager and nothing is recorded."""
+
+    def __init__(self, enabled: bool = False, publish_interval: float = 1.0):
+        self._enabled = enabled
+        self._publish_interval = publish_interval
+        self._next_publish = 0.0
+        self._histograms: Dict[str, LatencyHistogram] = {}
+
+    @property
+    def enabled(self) -> bool:
+        return self._enabled
+
+    def histogram(self, name: str) -> LatencyHistogram:
+        if name not in self._histograms:
+            self._histograms[name] = LatencyHistogram()
+        return self._histograms[name]
+
+    def section(self, name: str):
+        """context manager that times the enclosed block under `name`"""
+        if not self._enabled:
+            return _NO_PROFILE
+        return _Section(self.histogram(name))
+
+    def record(self, name: str, seconds: float):
+        if self._enabled:
+            self.histogram(name).record(seconds * 1000)
+
+    def due(self) -> bool:
+        """returns true at most once per publish interval"""
+        now = time.monotonic()
+        if not self._enabled or now < self._next_publish:
+            return False
+        self._next_publish = now + self._publish_interval
+        return True
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        return {name: h.summary() for name, h in sorted(self._histograms.items())}
+
+    def serialize(self) -> np.ndarray:
+        return encode_str(json.dumps(self.summary()))
+
+    @staticmethod
+    def deserialize(data: np.ndarray) -> Dict[str, Dict[str, float]]:
+        return json.loads(decode_str(data))
+
+    def reset(self):
+        for h in self._histograms.values():
+            h.reset()
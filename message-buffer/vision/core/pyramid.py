@@ -0,0 +1,46 @@
+"""Names of pyramid levels, the downscaled copies a capture source publishes next
+to a direction. Kept apart from capture_source so modules can resolve them
+without importing opencv or the logger."""
+from typing import List, Tuple
+
+
+PYRAMID_SEPARATOR = "@"
+"""separates a direction from the downscale factor of one of its pyramid levels, e.g. forward@2"""
+
+
+def pyramid_direction(direction: str, scale: int) -> str:
+    """
+    Args:
+        direction: full resolution direction.
+        scale: downscale factor of the level.
+
+    Returns:
+        the direction name that the level is published under.
+    """
+    return direction if scale == 1 else f"{direction}{PYRAMID_SEPARATOR}{scale}"
+
+
+def parse_pyramid_direction(name: str) -> Tuple[str, int]:
+    """
+    Inverse of pyramid_direction.
+
+    Args:
+        name: direction name, possibly with a downscale suffix.
+
+    Returns:
+        the full resolution direction and the downscale factor, 1 without a suffix.
+    """
+    direction, sep, scale = name.rpartition(PYRAMID_SEPARATOR)
+    if not sep:
+        return name, 1
+    if not scale.isdigit() or int(scale) < 1:
+        raise ValueError(f"'{name}' has an invalid downscale factor, expected e.g. '{direction}@2'")
+    return direction, int(scale)
+
+
+def parse_pyramid_scales(arg: str) -> List[int]:
+    """argparse type of the --pyramid option of capture sources, e.g. '2,4'"""
+    scales = [int(scale) for scale in arg.split(",") if scale.strip()]
+    if any(scale < 2 for scale in scales):
+        raise ValueError("downscale factors must be at least 2")
+    return scales
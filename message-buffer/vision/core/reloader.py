@@ -0,0 +1,66 @@
+import os
+import time
+import inspect
+import importlib.util
+
+from typing import Optional
+
+
+class ClassReloader:
+    """Watches the source file of a class and loads the class again when it changes.
+
+    The file is executed as a fresh module that is not `__main__`, so a module's
+    `if __name__ == "__main__":` block does not start a second module. Only the
+    class is taken from it; the caller decides what to do with it, e.g. swap the
+    `__class__` of a running instance, which keeps all instance state.
+    """
+
+    POLL_PERIOD = 0.5
+
+    def __init__(self, cls: type):
+        self._name = cls.__name__
+        self._path = inspect.getfile(cls)
+        self._mtime = os.stat(self._path).st_mtime
+        self._next_poll = 0.0
+        self._generation = 0
+
+    @property
+    def path(self) -> str:
+        return self._path
+
+    def poll(self) -> Optional[type]:
+        """Check the source file, at most every POLL_PERIOD seconds
+
+        Returns:
+            Optional[type]: the reloaded class if the file changed, otherwise None
+
+        Raises:
+            Exception: anything raised while executing the new source. The file is
+            not loaded again until it changes once more
+        """
+        now = time.monotonic()
+        if now < self._next_poll:
+            return None
+        self._next_poll = now + self.POLL_PERIOD
+
+        try:
+            mtime = os.stat(self._path).st_mtime
+        except FileNotFoundError:
+            # editors that save by renaming briefly remove the file
+            return None
+
+        if mtime == self._mtime:
+            return None
+        self._mtime = mtime
+        self._generation += 1
+
+        name = f"_reloaded_{self._name}_{self._generation}"
+        spec = importlib.util.spec_from_file_location(name, self._path)
+        assert spec is not None and spec.loader is not None
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+
+        cls = getattr(module, self._name, None)
+        if not isinstance(cls, type):
+            raise RuntimeError(f"{self._path} no longer defines {self._name}")
+        return cls
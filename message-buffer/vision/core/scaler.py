@@ -0,0 +1,81 @@
+import cv2
+import numpy as np
+
+from typing import Dict, Tuple
+
+
+class ResolutionScaler:
+    """Keeps process() inside a per-frame time budget by downscaling frames.
+
+    When the smoothed process() time exceeds the budget the scaler steps down to the
+    next smaller scale, and it steps back up once the cost predicted for the larger
+    scale (assumed proportional to the pixel count) fits comfortably. A few frames
+    of cooldown after every change keep it from oscillating. Resize targets are
+    cached per input shape, so steady state costs one cv2.resize into a reused
+    buffer and no allocations.
+    """
+
+    SCALES: Tuple[float, ...] = (1.0, 0.75, 0.5, 0.375, 0.25)
+    SMOOTHING = 0.2
+    HEADROOM = 0.8
+    COOLDOWN_FRAMES = 5
+
+    def __init__(self, budget_ms: float):
+        assert budget_ms > 0, "frame budget must be positive"
+        self._budget = budget_ms / 1000
+        self._level = 0
+        self._cost = 0.0
+        self._cooldown = 0
+
+        # input shape and scale level -> preallocated output buffer
+        self._targets: Dict[Tuple[Tuple[int, ...], int], np.ndarray] = {}
+
+    @property
+    def scale(self) -> float:
+        """current scale factor relative to the original resolution"""
+        return self.SCALES[self._level]
+
+    def apply(self, image: np.ndarray) -> np.ndarray:
+        """Downscale the frame to the current scale. The returned buffer is reused
+        by the next frame of the same shape."""
+        if self._level == 0:
+            return image
+
+        key = (image.shape, self._level)
+        target = self._targets.get(key)
+        if target is None:
+            scale = self.SCALES[self._level]
+            height = max(1, round(image.shape[0] * scale))
+            width = max(1, round(image.shape[1] * scale))
+            target = np.empty((height, width) + image.shape[2:], dtype=image.dtype)
+            self._targets[key] = target
+
+        dsize = (target.shape[1], target.shape[0])
+        resized = cv2.resize(image, dsize, dst=target, interpolation=cv2.INTER_AREA)
+
+        # cv2 drops a trailing channel axis of 1
+        return resized.reshape(target.shape)
+
+    def record(self, seconds: float):
+        """Feed back the process() time of the last frame and adapt the scale"""
+        if self._cost == 0:
+            self._cost = seconds
+        else:
+            self._cost += self.SMOOTHING * (seconds - self._cost)
+
+        if self._cooldown > 0:
+            self._cooldown -= 1
+            return
+
+        if self._cost > self._budget and self._level < len(self.SCALES) - 1:
+            self._change_level(self._level + 1)
+        elif self._level > 0:
+            ratio = (self.SCALES[self._level - 1] / self.SCALES[self._level]) ** 2
+            if self._cost * ratio < self.HEADROOM * self._budget:
+                self._change_level(self._level - 1)
+
+    def _change_level(self, level: int):
+        ratio = (self.SCALES[level] / self.SCALES[self._level]) ** 2
+        self._cost *= ratio
+        self._level = level
+        self._cooldown = self.COOLDOWN_FRAMES
@@ -0,0 +1,175 @@
+import time
+import numpy as np
+
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Set, Tuple
+
+
+@dataclass
+class SourceSchedule:
+    """scheduling state of a single video source"""
+
+    weight: float = 1.0
+    """relative share of processing time"""
+
+    cost: float = 0.0
+    """exponential moving average of process() time in seconds"""
+
+    credit: float = 0.0
+    """accumulated weight; the source with the most credit goes first"""
+
+    dropped: int = 0
+    """frames discarded because they were older than the maximum age"""
+
+    pending: Optional[Tuple[np.ndarray, int]] = None
+    """newest frame that has not been processed yet, with its acquisition time"""
+
+
+class FrameScheduler:
+    """Decides which video sources a module processes on each tick.
+
+    Frames older than `max_frame_age_ms` are dropped instead of processed late.
+    Fresh frames compete for the tick's time budget with smooth weighted round
+    robin: every waiting source earns its weight in credit, sources are served in
+    order of credit while their estimated cost fits the budget, and a served source
+    pays back the total weight. A source with weight 3 therefore gets three turns
+    for every turn of a source with weight 1 when only one fits per tick. Ticks on
+    which every waiting source fits leave the credits unchanged, so a period of
+    spare time does not skew the turns once sources compete again.
+
+    Weights can be changed at runtime with `set_weight`, or from the
+    `vision_priorities` shm group, which is polled for a variable per direction.
+    A shm value is applied when it changes, and when it is first seen for a source
+    whose weight was not set otherwise, so it does not override weights given on
+    the command line or with `set_weight` until someone writes it.
+    """
+
+    COST_SMOOTHING = 0.2
+    SHM_POLL_PERIOD = 1.0
+
+    def __init__(
+        self,
+        sources: List[str],
+        max_frame_age_ms: Optional[int] = None,
+        weights: Optional[Dict[str, float]] = None,
+    ):
+        self._sources: Dict[str, SourceSchedule] = {s: SourceSchedule() for s in sources}
+        self._max_frame_age_ms = max_frame_age_ms
+        self._next_shm_poll = 0.0
+        # last value seen in shm per source, and the sources weighted explicitly
+        self._shm_weights: Dict[str, float] = {}
+        self._explicit: Set[str] = set()
+
+        for name, weight in (weights or {}).items():
+            self.set_weight(name, weight)
+
+    @property
+    def sources(self) -> Dict[str, SourceSchedule]:
+        return self._sources
+
+    def set_weight(self, source: str, weight: float):
+        if source not in self._sources:
+            raise RuntimeError(f"'{source}' is not a video source of this module")
+        if weight < 0:
+            raise RuntimeError(f"priority of '{source}' cannot be negative")
+        self._sources[source].weight = weight
+        self._explicit.add(source)
+
+    def offer(self, source: str, image: np.ndarray, acquisition_time: int):
+        """register a newly read frame, replacing any unprocessed older one"""
+        self._sources[source].pending = (image, acquisition_time)
+
+    def record_cost(self, source: str, seconds: float):
+        state = self._sources[source]
+        if state.cost == 0:
+            state.cost = seconds
+        else:
+            state.cost += self.COST_SMOOTHING * (seconds - state.cost)
+
+    def schedule(self, budget: float) -> List[Tuple[str, np.ndarray, int]]:
+        """Pick the frames to process this tick
+
+        Args:
+            budget (float): seconds available for processing this tick
+
+        Returns:
+            List[Tuple[str, np.ndarray, int]]: source name, frame and acquisition time, in processing order
+        """
+        self._poll_shm()
+        now_ms = time.monotonic() * 1000
+
+        waiting: List[Tuple[str, SourceSchedule]] = []
+        for name, state in self._sources.items():
+            if state.pending is None:
+                continue
+
+            _, acquisition_time = state.pending
+            if self._max_frame_age_ms is not None and now_ms - acquisition_time > self._max_frame_age_ms:
+                state.pending = None
+                state.dropped += 1
+                continue
+
+            if state.weight > 0:
+                waiting.append((name, state))
+
+        total_weight = sum(state.weight for _, state in waiting)
+        for _, state in waiting:
+            state.credit += state.weight
+
+        waiting.sort(key=lambda x: x[1].credit, reverse=True)
+
+        ret = []
+        served: List[SourceSchedule] = []
+        for name, state in waiting:
+            if ret and state.cost > budget:
+                continue
+
+            assert state.pending is not None
+            image, acquisition_time = state.pending
+            ret.append((name, image, acquisition_time))
+
+            state.pending = None
+            served.append(state)
+            budget -= state.cost
+
+        if len(served) == len(waiting):
+            # nobody had to wait, so nobody is owed a turn
+            for _, state in waiting:
+                state.credit -= state.weight
+            return ret
+
+        for state in served:
+            state.credit -= total_weight
+
+        # several winners in one tick pay back more than was earned; re-centre
+        # so the credits of contending sources keep summing to zero
+        mean = sum(state.credit for _, state in waiting) / len(waiting)
+        for _, state in waiting:
+            state.credit -= mean
+
+        return ret
+
+    def _poll_shm(self):
+        now = time.monotonic()
+        if now < self._next_shm_poll:
+            return
+        self._next_shm_poll = now + self.SHM_POLL_PERIOD
+
+        # imported here, so importing the scheduler (and base.py) does not load shm
+        try:
+            import shm
+        except ImportError:
+            self._next_shm_poll = float("inf")
+            return
+        if not hasattr(shm, "vision_priorities"):
+            return
+
+        group = shm.vision_priorities  # type: ignore
+        for name, state in self._sources.items():
+            if not hasattr(group, name):
+                continue
+            weight = max(0.0, float(getattr(group, name).get()))
+            last = self._shm_weights.get(name)
+            self._shm_weights[name] = weight
+            if weight != last and (last is not None or name not in self._explicit):
+                state.weight = weight
@@ -0,0 +1,172 @@
+import os
+import time
+import threading
+import traceback
+
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional
+
+from auvlog.client import log as auvlog
+
+from vision.core.base import ModuleBase, module_arguments
+from vision.core.hub import SourceHub
+
+try:
+    import shm
+except ImportError:
+    shm = None
+
+
+@dataclass
+class ModuleSpec:
+    """how to construct one hosted module"""
+
+    name: str
+    """name used for logging and the `vision_modules` shm flag"""
+
+    cls: Callable[..., ModuleBase]
+    """ModuleBase subclass"""
+
+    init: List[Any] = field(default_factory=list)
+    """positional constructor arguments"""
+
+    args: List[str] = field(default_factory=list)
+    """module command line, e.g. ['forward', '--fps', '5']"""
+
+    cpus: Optional[List[int]] = None
+    """cpus the module thread may run on, or None for any. Only confines the thread,
+    hosted modules still take turns holding the GIL"""
+
+
+class HostedModule:
+    """Runs one module on its own thread, constructing it again after a crash"""
+
+    BACKOFF_MIN = 1.0
+    BACKOFF_MAX = 30.0
+
+    # module_arguments overrides the command line for the whole process
+    _construct_lock = threading.Lock()
+
+    def __init__(self, spec: ModuleSpec, hub: SourceHub):
+        self._spec = spec
+        self._hub = hub
+        self._logger = getattr(auvlog.vision.supervisor, spec.name)
+        self._quit_flag = threading.Event()
+        self._stop_flag = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._restarts = 0
+
+    @property
+    def name(self) -> str:
+        return self._spec.name
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    @property
+    def restarts(self) -> int:
+        return self._restarts
+
+    def start(self):
+        if self.running:
+            return
+
+        self._quit_flag.clear()
+        self._stop_flag.clear()
+        self._thread = threading.Thread(target=self._supervise, name=self.name, daemon=True)
+        self._thread.start()
+        self._logger(f"Started {self.name}", True)
+
+    def stop(self):
+        """Stop the module and wait for it to release its sources"""
+        if self._thread is None:
+            return
+
+        self._stop_flag.set()
+        self._quit_flag.set()
+        self._thread.join()
+        self._thread = None
+        self._logger(f"Stopped {self.name}", True)
+
+    def _supervise(self):
+        if self._spec.cpus is not None:
+            # pid 0 is the calling thread, so this pins only this module
+            os.sched_setaffinity(0, self._spec.cpus)
+
+        backoff = self.BACKOFF_MIN
+        while not self._stop_flag.is_set():
+            started = time.monotonic()
+            try:
+                with self._construct_lock, module_arguments(self._spec.args, self._hub):
+                    module = self._spec.cls(*self._spec.init)
+                module.run(self._quit_flag, self._logger)
+                return
+            except Exception:
+                self._logger(
+                    f"{self.name} crashed:\n{traceback.format_exc()}", True
+                )
+
+            # a module that ran for a while before crashing starts over with a short delay
+            if time.monotonic() - started > self.BACKOFF_MAX:
+                backoff = self.BACKOFF_MIN
+
+            self._logger(f"Restarting {self.name} in {backoff:.0f}s", True)
+            if self._stop_flag.wait(backoff):
+                return
+            backoff = min(2 * backoff, self.BACKOFF_MAX)
+            self._restarts += 1
+
+
+class ModuleSupervisor:
+    """Hosts several vision modules in one process.
+
+    Every video source is read from shared memory once by a SourceHub and handed
+    to the modules from there by reference, copied only for those that set
+    MUTATES_FRAMES. Each module runs on its own thread, optionally pinned to a set
+    of cpus, and is restarted with exponential backoff when it crashes. The
+    threads share the GIL, so pinning keeps a module off other cpus but does not
+    make modules run in parallel beyond what their native code releases the GIL
+    for. If the `vision_modules` shm group has a flag for a module, under its
+    spec name, the module runs only while the flag is set.
+    """
+
+    SHM_POLL_PERIOD = 0.5
+
+    def __init__(self, specs: List[ModuleSpec]):
+        names = [spec.name for spec in specs]
+        if len(set(names)) != len(names):
+            raise RuntimeError(f"module names must be unique: {names}")
+
+        self._hub = SourceHub()
+        self._modules: Dict[str, HostedModule] = {
+            spec.name: HostedModule(spec, self._hub) for spec in specs
+        }
+
+    @property
+    def modules(self) -> Dict[str, HostedModule]:
+        return self._modules
+
+    def run(self, quit_flag: threading.Event):
+        """Start the modules and keep them in line with their shm flags until `quit_flag` is set"""
+        try:
+            while not quit_flag.is_set():
+                for name, module in self._modules.items():
+                    if self._enabled(name):
+                        module.start()
+                    else:
+                        module.stop()
+                quit_flag.wait(self.SHM_POLL_PERIOD)
+        finally:
+            for module in self._modules.values():
+                module.stop()
+            self._hub.close()
+
+    def _enabled(self, name: str) -> bool:
+        if shm is None or not hasattr(shm, "vision_modules"):
+            return True
+
+        group = shm.vision_modules  # type: ignore
+        if not hasattr(group, name):
+            return True
+        return bool(getattr(group, name).get())
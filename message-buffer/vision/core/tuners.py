@@ -1,7 +1,10 @@
+import os
+import mmap
+import fcntl
 import struct
 from abc import ABC, abstractmethod
-from typing import Generic, TypeVar, Optional, Callable, List, Any
-from vision.core.bindings.camera_message_framework import BlockAccessor
+from typing import Generic, TypeVar, Optional, Callable, Dict, List, Any, Tuple, Union
+from vision.core.bindings.camera_message_framework import BLOCK_STUB
 MAX_OPTION_SIZE_BYTE = 256
 
 T = TypeVar('T')
@@ -13,6 +16,7 @@ class TunerBase(ABC, Generic[T]):
         assert name.count('/') == 0, f"Tuner name '{name}' cannot have slashes"
         self._name = name
         self._current_value = default_value
+        self._callbacks: List[Callable[["TunerBase[T]"], None]] = []
 
     def __hash__(self) -> int:
         return hash(str(self))
@@ -33,6 +37,42 @@ class TunerBase(ABC, Generic[T]):
     def value(self):
         return self._current_value
 
+    def accepts(self, value: Any) -> bool:
+        """whether `value` passes the validator of the tuner"""
+        return True
+
+    def cast(self, value: Any) -> T:
+        """convert a value decoded from a tuner block or sent by the webgui"""
+        return value
+
+    def assign(self, value: Any) -> bool:
+        """Set the value if it passes the validator of the tuner. The on_change
+        callbacks run if the value differs from the current one.
+
+        Returns:
+            whether the value was accepted.
+        """
+        if not self.accepts(value):
+            return False
+
+        value = self.cast(value)
+        if value != self._current_value:
+            self._current_value = value
+            for callback in self._callbacks:
+                callback(self)
+        return True
+
+    def on_change(self, callback: Callable[["TunerBase[T]"], None]) -> Callable[["TunerBase[T]"], None]:
+        """Run `callback` with the tuner whenever its value changes. In a module,
+        callbacks run on the module thread between frames, so they may touch any
+        state that `process` uses. Usable as a decorator.
+
+        Returns:
+            the callback.
+        """
+        self._callbacks.append(callback)
+        return callback
+
     @abstractmethod
     def byte_size(self) -> int:
         raise NotImplementedError('_TunerBase.byte_size')
@@ -62,7 +102,7 @@ class IntTuner(TunerBase[int]):
         self._max_value = max_value
         self._packing_format = f'{len(self._name)}siii'
         self._validator = lambda x: validator(
-            x) and min_value <= x <= max_value
+            x) and self._min_value <= x <= self._max_value
 
     def byte_size(self) -> int:
         return struct.calcsize(self._packing_format)
@@ -75,8 +115,13 @@ class IntTuner(TunerBase[int]):
             self._packing_format, buffer)
 
         self._name = name.decode()
-        if self._validator(current_value):
-            self._current_value = current_value
+        self.assign(current_value)
+
+    def accepts(self, value: Any) -> bool:
+        return self._validator(value)
+
+    def cast(self, value: Any) -> int:
+        return int(value)
 
 
 class DoubleTuner(TunerBase[float]):
@@ -95,7 +140,7 @@ class DoubleTuner(TunerBase[float]):
         self._max_value = max_value
         self._packing_format = f'{len(self._name)}sddd'
         self._validator = lambda x: validator(
-            x) and min_value <= x <= max_value
+            x) and self._min_value <= x <= self._max_value
 
     def byte_size(self) -> int:
         return struct.calcsize(self._packing_format)
@@ -108,8 +153,13 @@ class DoubleTuner(TunerBase[float]):
             self._packing_format, buffer)
 
         self._name = name.decode()
-        if self._validator(current_value):
-            self._current_value = current_value
+        self.assign(current_value)
+
+    def accepts(self, value: Any) -> bool:
+        return self._validator(value)
+
+    def cast(self, value: Any) -> float:
+        return float(value)
 
 
 class BoolTuner(TunerBase[bool]):
@@ -132,7 +182,345 @@ class BoolTuner(TunerBase[bool]):
         name, current_value = struct.unpack(self._packing_format, buffer)
 
         self._name = name.decode()
-        self._current_value = current_value
+        self.assign(current_value)
+
+    def cast(self, value: Any) -> bool:
+        return bool(value)
+
+
+class Derived(Generic[T]):
+    """A value computed from tuners, like a kernel, lookup table or warp matrix,
+    that is only rebuilt after one of the tuners it depends on changed."""
+
+    def __init__(self, build: Callable[[], T], *dependencies: TunerBase):
+        """
+        Args:
+            build: computes the value from the current tuner values.
+            dependencies: tuners whose changes invalidate the value.
+        """
+        self._build = build
+        self._stale = True
+        self._value: Optional[T] = None
+        for tuner in dependencies:
+            tuner.on_change(self.invalidate)
+
+    def invalidate(self, *_):
+        self._stale = True
+
+    def get(self) -> T:
+        if self._stale:
+            self._value = self._build()
+            self._stale = False
+        return self._value  # type: ignore
+
+
+_TUNER_TYPES: List[type] = [IntTuner, DoubleTuner, BoolTuner]
+_TUNER_DEFAULTS: List[Any] = [0, 0.0, False]
+_VALUE_FORMATS: List[struct.Struct] = [struct.Struct('=q'), struct.Struct('=d'), struct.Struct('=q')]
+
+TUNER_BLOCK_MAGIC = b'AUVTUNE1'
+
+# magic, tuner count, offset of the value array, deleted flag, pad, generation, creator pid
+_BLOCK_HEADER = struct.Struct('=8sIIIIQQ')
+_BLOCK_HEADER_SIZE = 64
+_GENERATION_OFFSET = 24
+_DELETED_OFFSET = 16
+
+# type index, pad, name length, name offset, min value, max value
+_DESCRIPTOR = struct.Struct('=BxHIdd')
+
+# version (odd while the value is written), raw value
+_SLOT = struct.Struct('=Q8s')
+_VERSION = struct.Struct('=Q')
+_FLAG = struct.Struct('=I')
+_SEQLOCK_RETRIES = 1000
+
+
+class TunerBlock:
+    """All tuners of a module in one shared memory file with a fixed layout.
+
+    The header describing every tuner (type, name and range) is written once when
+    the module creates the block. Values follow as a packed array of 16 byte
+    slots, a version counter and an 8 byte value each. Writers hold an exclusive
+    flock, make the version odd while they write a value, and bump the block
+    generation after each batch, so readers skip the block with a single 8 byte
+    read when nothing changed and decode only the entries whose version moved.
+
+    The file lives next to the message buffer blocks so ModuleReader finds it
+    under the same name as before, but it is not a BlockAccessor block.
+    """
+
+    def __init__(self, path: str, fd: int, mm: mmap.mmap, tuners: List[TunerBase], creator: bool):
+        self._path = path
+        self._fd = fd
+        self._mm = mm
+        self._tuners = tuners
+        self._index = {t.name: idx for idx, t in enumerate(tuners)}
+        self._creator = creator
+
+        self._values_offset = _BLOCK_HEADER.unpack_from(mm, 0)[2]
+        self._versions = [0] * len(tuners)
+        self._generation = 0
+
+    @classmethod
+    def create(cls, name: str, tuners: List[TunerBase]) -> "TunerBlock":
+        """Publish the current values of `tuners`. A block left over under the same
+        name is marked as deleted and replaced, and the new file is only moved
+        into place once it is complete, so readers never see a partial header.
+
+        Args:
+            name: block name, the file is BLOCK_STUB + name.
+            tuners: tuners of the module. `read` updates these objects in place.
+
+        Returns:
+            the block, owned by the caller until `close`.
+        """
+        names = [t.name.encode() for t in tuners]
+        descriptors_end = _BLOCK_HEADER_SIZE + _DESCRIPTOR.size * len(tuners)
+        values_offset = descriptors_end + sum(map(len, names))
+        values_offset = (values_offset + 15) // 16 * 16
+        size = max(values_offset + _SLOT.size * len(tuners), mmap.PAGESIZE)
+
+        buffer = bytearray(size)
+        name_offset = descriptors_end
+        for idx, (tuner, encoded) in enumerate(zip(tuners, names)):
+            type_idx = _TUNER_TYPES.index(type(tuner))
+            low, high = getattr(tuner, '_min_value', 0), getattr(tuner, '_max_value', 1)
+            _DESCRIPTOR.pack_into(buffer, _BLOCK_HEADER_SIZE + idx * _DESCRIPTOR.size,
+                                  type_idx, len(encoded), name_offset, low, high)
+            buffer[name_offset:name_offset + len(encoded)] = encoded
+            name_offset += len(encoded)
+
+            _SLOT.pack_into(buffer, values_offset + idx * _SLOT.size,
+                            2, _VALUE_FORMATS[type_idx].pack(tuner.value))
+
+        _BLOCK_HEADER.pack_into(buffer, 0, TUNER_BLOCK_MAGIC, len(tuners), values_offset, 0, 0, 1, os.getpid())
+
+        path = BLOCK_STUB + name
+        stale = cls.open(name)
+        if stale is not None:
+            stale._mark_deleted()
+            stale.close()
+
+        tmp_path = f'{path}.{os.getpid()}.tmp'
+        fd = os.open(tmp_path, os.O_RDWR | os.O_CREAT | os.O_TRUNC, 0o666)
+        os.write(fd, bytes(buffer))
+        os.rename(tmp_path, path)
+
+        block = cls(path, fd, mmap.mmap(fd, size), list(tuners), True)
+        block._versions = [2] * len(tuners)
+        block._generation = 1
+        return block
+
+    @classmethod
+    def open(cls, name: str) -> Optional["TunerBlock"]:
+        """Open the block of a running module, rebuilding its tuners from the header.
+
+        Args:
+            name: block name, the file is BLOCK_STUB + name.
+
+        Returns:
+            the block, or None if there is none.
+        """
+        path = BLOCK_STUB + name
+        try:
+            fd = os.open(path, os.O_RDWR)
+        except FileNotFoundError:
+            return None
+
+        size = os.fstat(fd).st_size
+        if size < _BLOCK_HEADER_SIZE:
+            os.close(fd)
+            return None
+
+        mm = mmap.mmap(fd, size)
+        magic, count, _, _, _, _, _ = _BLOCK_HEADER.unpack_from(mm, 0)
+        if magic != TUNER_BLOCK_MAGIC:
+            mm.close()
+            os.close(fd)
+            return None
+
+        tuners: List[TunerBase] = []
+        for idx in range(count):
+            type_idx, name_len, name_offset, low, high = _DESCRIPTOR.unpack_from(
+                mm, _BLOCK_HEADER_SIZE + idx * _DESCRIPTOR.size)
+            tuner_name = mm[name_offset:name_offset + name_len].decode()
+            tuner_type = _TUNER_TYPES[type_idx]
+            if tuner_type is BoolTuner:
+                tuners.append(BoolTuner(tuner_name, False))
+            else:
+                cast = int if tuner_type is IntTuner else float
+                tuners.append(tuner_type(tuner_name, cast(low), cast(low), cast(high)))
+
+        return cls(path, fd, mm, tuners, False)
+
+    @property
+    def tuners(self) -> List[TunerBase]:
+        return self._tuners
+
+    @property
+    def deleted(self) -> bool:
+        """whether the module that created the block exited"""
+        return _FLAG.unpack_from(self._mm, _DELETED_OFFSET)[0] != 0
+
+    @property
+    def generation(self) -> int:
+        """number of write batches since the block was created"""
+        return _VERSION.unpack_from(self._mm, _GENERATION_OFFSET)[0]
+
+    def read(self) -> List[int]:
+        """Update the tuners with the values written since the last call.
+
+        Returns:
+            indices of the tuners whose value was written, whether or not it passed their validator.
+        """
+        generation = self.generation
+        if generation == self._generation:
+            return []
+        self._generation = generation
+
+        changed = []
+        for idx, tuner in enumerate(self._tuners):
+            offset = self._values_offset + idx * _SLOT.size
+            if _VERSION.unpack_from(self._mm, offset)[0] == self._versions[idx]:
+                continue
+
+            version, raw = self._read_slot(offset)
+            self._versions[idx] = version
+            if not tuner.assign(_VALUE_FORMATS[_TUNER_TYPES.index(type(tuner))].unpack(raw)[0]):
+                # the module's own validator can be stricter than the range writers
+                # check, put back the value the module keeps using
+                self._revert(idx, version)
+            changed.append(idx)
+
+        return changed
+
+    def _revert(self, idx: int, version: int):
+        offset = self._values_offset + idx * _SLOT.size
+        fcntl.flock(self._fd, fcntl.LOCK_EX)
+        try:
+            # a newer write is left for the next read
+            if _VERSION.unpack_from(self._mm, offset)[0] != version:
+                return
+            self._versions[idx] = self._write_slot(idx, self._tuners[idx].value)
+            self._generation = self.generation + 1
+            _VERSION.pack_into(self._mm, _GENERATION_OFFSET, self._generation)
+        finally:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+    def _write_slot(self, idx: int, value: Any) -> int:
+        """write a value with the flock held, returning the new version"""
+        tuner = self._tuners[idx]
+        type_idx = _TUNER_TYPES.index(type(tuner))
+        offset = self._values_offset + idx * _SLOT.size
+
+        version = _VERSION.unpack_from(self._mm, offset)[0]
+        _VERSION.pack_into(self._mm, offset, version + 1)
+        self._mm[offset + 8:offset + 16] = _VALUE_FORMATS[type_idx].pack(tuner.cast(value))
+        _VERSION.pack_into(self._mm, offset, version + 2)
+        return version + 2
+
+    def write(self, values: Dict[str, Any]) -> int:
+        """Write a batch of values. Readers see the whole batch on their next read.
+
+        Args:
+            values: new values keyed by tuner name. Unknown names and values the
+                tuner does not accept, like ones out of its range, are ignored.
+
+        Returns:
+            number of values written.
+        """
+        written = 0
+        fcntl.flock(self._fd, fcntl.LOCK_EX)
+        try:
+            for name, value in values.items():
+                idx = self._index.get(name)
+                if idx is None:
+                    continue
+                try:
+                    value = self._tuners[idx].cast(value)
+                except (TypeError, ValueError):
+                    continue
+                if not self._tuners[idx].accepts(value):
+                    continue
+
+                self._write_slot(idx, value)
+                written += 1
+
+            if written:
+                _VERSION.pack_into(self._mm, _GENERATION_OFFSET, self.generation + 1)
+        finally:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+        return written
+
+    def values(self) -> Dict[str, Any]:
+        """Current values in the block, which may differ from the tuner objects
+        until the next `read`"""
+        ret = {}
+        for idx, tuner in enumerate(self._tuners):
+            _, raw = self._read_slot(self._values_offset + idx * _SLOT.size)
+            type_idx = _TUNER_TYPES.index(type(tuner))
+            ret[tuner.name] = tuner.cast(_VALUE_FORMATS[type_idx].unpack(raw)[0])
+        return ret
+
+    def _read_slot(self, offset: int) -> Tuple[int, bytes]:
+        for _ in range(_SEQLOCK_RETRIES):
+            before = _VERSION.unpack_from(self._mm, offset)[0]
+            if before & 1:
+                continue
+            raw = self._mm[offset + 8:offset + 16]
+            if _VERSION.unpack_from(self._mm, offset)[0] == before:
+                return before, raw
+
+        # a writer that died mid-write leaves the version odd, and its flock was
+        # released with it. Under the lock, whatever it left is the value
+        fcntl.flock(self._fd, fcntl.LOCK_EX)
+        try:
+            version = _VERSION.unpack_from(self._mm, offset)[0]
+            if version & 1:
+                version += 1
+                _VERSION.pack_into(self._mm, offset, version)
+            return version, self._mm[offset + 8:offset + 16]
+        finally:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+    def _mark_deleted(self):
+        _FLAG.pack_into(self._mm, _DELETED_OFFSET, 1)
+
+    def close(self):
+        """Release the block. The creator marks it as deleted for readers and
+        removes the file, unless another module already replaced it."""
+        if self._mm.closed:
+            return
+
+        if self._creator:
+            self._mark_deleted()
+            try:
+                if os.stat(self._path).st_ino == os.fstat(self._fd).st_ino:
+                    os.unlink(self._path)
+            except FileNotFoundError:
+                pass
+
+        self._mm.close()
+        os.close(self._fd)
+
+    def __len__(self) -> int:
+        return len(self._tuners)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._index
+
+    def __getitem__(self, key: Union[int, str]) -> TunerBase:
+        if isinstance(key, str):
+            key = self._index[key]
+        return self._tuners[key]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        self.close()
 
 
 def tuner_from_bytes(name: str, data: bytes):
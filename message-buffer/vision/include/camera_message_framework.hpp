@@ -3,6 +3,7 @@
 #pragma once
 
 #include <string>
+#include <vector>
 
 namespace cmf {
 /// @brief number of frames to store in each buffer
@@ -17,6 +18,9 @@ inline constexpr int NO_NEW_FRAME = 1;
 /// @brief buffer is marked for deletion and should not be read from
 inline constexpr int FRAMEWORK_DELETED = 2;
 
+/// @brief maximum number of readers of a block that lockstep writers wait for
+inline constexpr std::size_t MAX_CONSUMERS = 64;
+
 /// @brief File stub for page mappings
 inline const std::string BLOCK_STUB{ "/dev/shm/auv_visiond_" };
 
@@ -132,6 +136,46 @@ public:
    */
 	int read_frame(Frame& frame, bool block_thread);
 
+	/**
+   * @brief publish this block under another direction name as well. Readers that
+   * open `alias` map the same memory, so a frame written once is visible under
+   * every name. Only the creator may add aliases, and they are removed when the
+   * creator is destroyed. Throws `system_error` if the name is taken by a block.
+   *
+   * @param alias direction name that should resolve to this block
+   */
+	void create_alias(const std::string& alias);
+
+	/**
+   * @brief mark the block as written in lockstep, which makes readers notify the
+   * writer whenever they consume a frame. Only the creator may change it.
+   */
+	void set_lockstep(bool lockstep);
+
+	/// @brief whether the writer of this block waits for its readers
+	bool is_lockstep() const noexcept;
+
+	/// @brief number of readers currently registered as consumers
+	std::size_t consumer_count() const noexcept;
+
+	/**
+   * @brief register this reader as a consumer, which lockstep writers wait for
+   * until it read their newest frame. Readers that only watch the block, like
+   * the stream server, do not register. Registering twice has no effect.
+   */
+	void register_consumer() noexcept;
+
+	/**
+   * @brief wait until at least `min_consumers` readers are registered and every
+   * registered reader has read the newest frame. Readers whose process died are
+   * unregistered while waiting.
+   *
+   * @param min_consumers readers that must be registered
+   * @param timeout_ms maximum time to wait
+   * @return true if the consumers are ready for the next frame
+   */
+	bool wait_consumers(std::size_t min_consumers, std::uint64_t timeout_ms);
+
 	/// @brief get the underlying file that backs the buffer
 	inline const std::string& filename() const noexcept {
 		return _filename;
@@ -154,12 +198,15 @@ public:
 
 private:
 	void close_block();
+	void release_consumer() noexcept;
 
 private:
 	std::string _filename = "";
 	std::string _direction = "";
 	bool _creator;
 	Buffer* _buffer;
+	std::vector<std::string> _aliases;
+	int _consumer = -1;
 };
 
 } // namespace cmf
\ No newline at end of file
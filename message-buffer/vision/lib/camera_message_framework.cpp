@@ -3,6 +3,8 @@
 
 #include <atomic>
 #include <auvlog/logger.h>
+#include <chrono>
+#include <csignal>
 #include <cstring>
 #include <fcntl.h>
 #include <filesystem>
@@ -34,6 +36,14 @@ public:
 	pthread_cond_t cond;
 	pthread_mutex_t cond_mutex;
 
+	// lockstep: readers own a bit of consumer_mask and publish the uid they last
+	// read in consumed; the writer waits on ack_cond until all of them caught up
+	bool lockstep;
+	std::atomic<uint64_t> consumer_mask;
+	std::atomic<uint64_t> consumed[MAX_CONSUMERS];
+	std::atomic<pid_t> consumer_pid[MAX_CONSUMERS];
+	pthread_cond_t ack_cond;
+
 	alignas(64) unsigned char data[];
 };
 
@@ -54,6 +64,29 @@ inline const std::size_t shm_size(const Buffer* buffer) noexcept {
 	return sizeof(Buffer) + buffer->max_entry_size_bytes * BUFFER_CNT;
 }
 
+// the mutex is robust, so a process that died holding it does not wedge the block
+void lock_buffer(Buffer* buffer) {
+	int mutex_errno = pthread_mutex_lock(&buffer->cond_mutex);
+	if(mutex_errno == EOWNERDEAD) {
+		pthread_mutex_consistent(&buffer->cond_mutex);
+	} else if(mutex_errno != 0) {
+		buffer->deleted = true;
+		throw std::runtime_error("Failed to lock mutex: " + std::string(strerror(mutex_errno)));
+	}
+}
+
+timespec realtime_in(std::uint64_t ms) {
+	struct timespec t;
+	clock_gettime(CLOCK_REALTIME, &t);
+	t.tv_sec += ms / 1000;
+	t.tv_nsec += (ms % 1000) * 1000000L;
+	if(t.tv_nsec >= 1000000000L) {
+		t.tv_sec += 1;
+		t.tv_nsec -= 1000000000L;
+	}
+	return t;
+}
+
 ///////////////////////////////////////////////////////////////////////////////
 /// Buffer
 ///////////////////////////////////////////////////////////////////////////////
@@ -89,10 +122,18 @@ Buffer* create_block(int fd, std::size_t max_entry_size, const Block& b) {
 	buffer->uid = 0;
 	buffer->deleted = false;
 
+	buffer->lockstep = false;
+	buffer->consumer_mask = 0;
+	for(std::size_t i = 0; i < MAX_CONSUMERS; i++) {
+		buffer->consumed[i] = 0;
+		buffer->consumer_pid[i] = 0;
+	}
+
 	pthread_condattr_t attrcond;
 	pthread_condattr_init(&attrcond);
 	pthread_condattr_setpshared(&attrcond, PTHREAD_PROCESS_SHARED);
 	pthread_cond_init(&buffer->cond, &attrcond);
+	pthread_cond_init(&buffer->ack_cond, &attrcond);
 
 	pthread_mutexattr_t attrmutex;
 	pthread_mutexattr_init(&attrmutex);
@@ -126,6 +167,12 @@ Block::Block(const std::string& direction, const size_t max_entry_size) {
 	std::string filename = filename_from_direction(direction);
 
 	bool file_exists = access(filename.c_str(), F_OK) == 0;
+
+	// an alias left behind by a creator that crashed, which O_CREAT would follow
+	if(!file_exists && std::filesystem::is_symlink(filename)) {
+		remove(filename.c_str());
+	}
+
 	int fd = open(filename.c_str(), O_RDWR | O_CREAT, S_IRWXU);
 
 	if(fd == -1) {
@@ -185,7 +232,8 @@ Block::Block(const std::string& direction) {
 
 	_creator = false;
 	_direction = direction;
-	_filename = filename;
+	// aliases resolve to the block they point to, so the last accessor removes the real file
+	_filename = std::filesystem::canonical(filename).string();
 	_buffer = open_block(fd, *this);
 	close(fd);
 
@@ -197,8 +245,10 @@ Block::Block(const std::string& direction) {
 Block::Block(Block&& other) noexcept {
 	_filename = std::move(other._filename);
 	_direction = std::move(other._direction);
+	_aliases = std::move(other._aliases);
 	_buffer = other._buffer;
 	_creator = other._creator;
+	_consumer = other._consumer;
 	other._buffer = nullptr;
 }
 
@@ -206,8 +256,10 @@ Block& Block::operator=(Block&& other) {
 	if(this != &other) {
 		_filename = std::move(other._filename);
 		_direction = std::move(other._direction);
+		_aliases = std::move(other._aliases);
 		_buffer = other._buffer;
 		_creator = other._creator;
+		_consumer = other._consumer;
 		other._buffer = nullptr;
 	}
 
@@ -221,7 +273,13 @@ Block::~Block() {
 	}
 	if(_creator) {
 		_buffer->deleted = true;
+
+		filelock::Filelock master_lock(GLOBAL_LOCK);
+		for(const std::string& alias : _aliases) {
+			remove(alias.c_str());
+		}
 	}
+	release_consumer();
 
 	if(--_buffer->arc == 0) {
 		remove(_filename.c_str());
@@ -282,19 +340,9 @@ int Block::read_frame(Frame& frame, bool block_thread) {
 		return FRAMEWORK_DELETED;
 	}
 
-	int mutex_errno = pthread_mutex_lock(&_buffer->cond_mutex);
-	if(mutex_errno == EOWNERDEAD) {
-		pthread_mutex_consistent(&_buffer->cond_mutex);
-		mutex_errno = pthread_mutex_lock(&_buffer->cond_mutex);
-
-		if(mutex_errno != 0) {
-			_buffer->deleted = true;
-			throw std::runtime_error("Failed to lock mutex: " + std::string(strerror(mutex_errno)));
-		}
-	}
+	lock_buffer(_buffer);
 
 	if(block_thread && frame.uid >= _buffer->uid) {
-		std::cout << "sleep now" << std::endl;
 		struct timespec time_to_wait;
 		struct timeval now;
 		gettimeofday(&now, NULL);
@@ -336,9 +384,131 @@ int Block::read_frame(Frame& frame, bool block_thread) {
 		// std::cout << "repeat" << std::endl;
 	} while(v_a != v_b);
 
+	if(_consumer >= 0) {
+		_buffer->consumed[_consumer] = frame.uid;
+		if(_buffer->lockstep) {
+			lock_buffer(_buffer);
+			pthread_cond_broadcast(&_buffer->ack_cond);
+			pthread_mutex_unlock(&_buffer->cond_mutex);
+		}
+	}
+
 	return SUCCESS;
 }
 
+void Block::register_consumer() noexcept {
+	if(_consumer >= 0) {
+		return;
+	}
+
+	std::uint64_t mask = _buffer->consumer_mask.load();
+	while(mask != ~std::uint64_t{ 0 }) {
+		int slot = __builtin_ctzll(~mask);
+		if(_buffer->consumer_mask.compare_exchange_weak(mask, mask | (std::uint64_t{ 1 } << slot))) {
+			_buffer->consumer_pid[slot] = getpid();
+			_consumer = slot;
+			pthread_cond_broadcast(&_buffer->ack_cond);
+			return;
+		}
+	}
+	// more readers than slots; this one reads without being waited for
+}
+
+void Block::release_consumer() noexcept {
+	if(_consumer < 0) {
+		return;
+	}
+
+	// a slot is reset before it is freed, so the next owner starts clean
+	_buffer->consumed[_consumer] = 0;
+	_buffer->consumer_pid[_consumer] = 0;
+	_buffer->consumer_mask.fetch_and(~(std::uint64_t{ 1 } << _consumer));
+	pthread_cond_broadcast(&_buffer->ack_cond);
+	_consumer = -1;
+}
+
+void Block::set_lockstep(bool lockstep) {
+	if(!_creator) {
+		throw std::logic_error(
+			fmt::format("only the creator of '{}' can change lockstep mode", _direction));
+	}
+	_buffer->lockstep = lockstep;
+}
+
+bool Block::is_lockstep() const noexcept {
+	return _buffer->lockstep;
+}
+
+std::size_t Block::consumer_count() const noexcept {
+	return __builtin_popcountll(_buffer->consumer_mask.load());
+}
+
+bool Block::wait_consumers(std::size_t min_consumers, std::uint64_t timeout_ms) {
+	auto ready = [&]() {
+		std::uint64_t mask = _buffer->consumer_mask.load();
+		if(static_cast<std::size_t>(__builtin_popcountll(mask)) < min_consumers) {
+			return false;
+		}
+
+		std::uint64_t uid = _buffer->uid.load();
+		for(std::size_t slot = 0; slot < MAX_CONSUMERS; slot++) {
+			if((mask >> slot & 1) && _buffer->consumed[slot] < uid) {
+				return false;
+			}
+		}
+		return true;
+	};
+
+	// a reader killed without running its destructor would otherwise block forever
+	auto reap = [&]() {
+		std::uint64_t mask = _buffer->consumer_mask.load();
+		for(std::size_t slot = 0; slot < MAX_CONSUMERS; slot++) {
+			pid_t pid = _buffer->consumer_pid[slot];
+			if((mask >> slot & 1) && pid != 0 && kill(pid, 0) == -1 && errno == ESRCH) {
+				_buffer->consumed[slot] = 0;
+				_buffer->consumer_pid[slot] = 0;
+				_buffer->consumer_mask.fetch_and(~(std::uint64_t{ 1 } << slot));
+			}
+		}
+	};
+
+	auto deadline = std::chrono::steady_clock::now() + std::chrono::milliseconds(timeout_ms);
+
+	lock_buffer(_buffer);
+	bool ok = ready();
+	while(!ok && std::chrono::steady_clock::now() < deadline) {
+		// short waits, so readers that died are noticed and no wake-up is missed for long
+		struct timespec t = realtime_in(100);
+		pthread_cond_timedwait(&_buffer->ack_cond, &_buffer->cond_mutex, &t);
+		reap();
+		ok = ready();
+	}
+	pthread_mutex_unlock(&_buffer->cond_mutex);
+
+	return ok;
+}
+
+void Block::create_alias(const std::string& alias) {
+	if(!_creator) {
+		throw std::logic_error(fmt::format("only the creator of '{}' can alias it", _direction));
+	}
+
+	filelock::Filelock master_lock(GLOBAL_LOCK);
+	std::string alias_filename = filename_from_direction(alias);
+
+	// replace stale aliases, but never a real block
+	if(std::filesystem::is_symlink(alias_filename)) {
+		remove(alias_filename.c_str());
+	}
+
+	if(symlink(_filename.c_str(), alias_filename.c_str()) == -1) {
+		throw std::system_error(errno, std::generic_category(), alias_filename);
+	}
+
+	_aliases.push_back(alias_filename);
+	auvlog_info(fmt::format("Aliased block at '{}' as '{}'", _filename, alias_filename));
+}
+
 const std::size_t Block::shm_size() const noexcept {
 	return sizeof(Buffer) + _buffer->max_entry_size_bytes * BUFFER_CNT;
 }
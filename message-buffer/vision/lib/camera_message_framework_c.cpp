@@ -40,7 +40,7 @@ cmf::Block* create_block(const char* direction, const size_t max_entry_size_byte
 	}
 }
 
-cmf::Block* open_block(const char* direction) {
+cmf::Block* open_block(const char* direction, bool consumer) {
 	std::scoped_lock lock{ global_lock };
 	std::string name{ direction };
 	std::unordered_map<std::string, cmf::Block>::iterator it = cmf_heap.find(name);
@@ -48,15 +48,18 @@ cmf::Block* open_block(const char* direction) {
 	if(it == cmf_heap.end()) {
 		try {
 			// not found, so need to create
-			return &cmf_heap.emplace(name, std::move(cmf::Block(name))).first->second;
+			it = cmf_heap.emplace(name, std::move(cmf::Block(name))).first;
 		} catch(std::filesystem::filesystem_error& e) {
 			// allow python to handle this
 			return nullptr;
 		}
-	} else {
-		// already created it so return the pointer
-		return &it->second;
 	}
+
+	// accessors of one process share the block, which consumes if any of them does
+	if(consumer) {
+		it->second.register_consumer();
+	}
+	return &it->second;
 }
 
 void delete_block(cmf::Block* block) {
@@ -64,6 +67,33 @@ void delete_block(cmf::Block* block) {
 	cmf_heap.erase(block->direction());
 }
 
+bool create_alias(cmf::Block* block, const char* alias) {
+	std::scoped_lock lock{ global_lock };
+	try {
+		block->create_alias(alias);
+		return true;
+	} catch(std::exception&) {
+		// exceptions cannot cross into python, which raises on false instead
+		return false;
+	}
+}
+
+void set_lockstep(cmf::Block* block, bool lockstep) {
+	block->set_lockstep(lockstep);
+}
+
+bool is_lockstep(cmf::Block* block) {
+	return block->is_lockstep();
+}
+
+size_t consumer_count(cmf::Block* block) {
+	return block->consumer_count();
+}
+
+bool wait_consumers(cmf::Block* block, size_t min_consumers, uint64_t timeout_ms) {
+	return block->wait_consumers(min_consumers, timeout_ms);
+}
+
 int write_frame(cmf::Block* block,
 				std::uint64_t acquisition_time,
 				std::size_t width,
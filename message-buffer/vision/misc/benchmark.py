@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+"""Headless replay harness that runs a vision module as fast as possible.
+
+Frames are decoded from a video file or an image directory and handed straight
+to the module's process() method. Nothing touches shared memory, nothing sleeps,
+and the module's own command line is isolated from the harness' arguments.
+
+Examples:
+    auv-vision-benchmark vision/modules/poster.py:Poster clip.mp4
+    auv-vision-benchmark vision/modules/auto_calibrate.py:AutoCalibrate dataset/ --init '["forward"]'
+    auv-vision-benchmark vision/modules/poster.py:Poster clip.mp4 --compare HEAD~5 HEAD
+    auv-vision-benchmark vision/modules/poster.py:Poster clip.mp4 --module-args='--enable-performance'
+"""
+import os
+import sys
+import json
+import time
+import shlex
+import shutil
+import argparse
+import resource
+import tempfile
+import importlib
+import importlib.util
+import subprocess
+import numpy as np
+import cv2
+
+from typing import Any, Dict, Iterator, List
+
+from vision.core.base import ModuleBase, module_arguments
+
+
+def load_module_class(target: str) -> type:
+    """Load a ModuleBase subclass from 'path/to/file.py:Class' or 'dotted.module:Class'"""
+    location, _, class_name = target.rpartition(":")
+    if not location or not class_name:
+        raise ValueError(f"'{target}' is not in the format 'module:Class'")
+
+    if os.path.exists(location):
+        spec = importlib.util.spec_from_file_location("benchmark_target", location)
+        assert spec is not None and spec.loader is not None
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+    else:
+        module = importlib.import_module(location)
+
+    cls = getattr(module, class_name)
+    if not (isinstance(cls, type) and issubclass(cls, ModuleBase)):
+        raise TypeError(f"{class_name} is not a ModuleBase subclass")
+    return cls
+
+
+def read_frames(source: str) -> Iterator[np.ndarray]:
+    """Yield frames from a video file, or from every readable image of a directory"""
+    if os.path.isdir(source):
+        for name in sorted(os.listdir(source)):
+            image = cv2.imread(os.path.join(source, name))  # type: ignore
+            if image is not None:
+                yield image
+        return
+
+    cap = cv2.VideoCapture(source)  # type: ignore
+    try:
+        while True:
+            ok, image = cap.read()
+            if not ok or image is None:
+                return
+            yield image
+    finally:
+        cap.release()
+
+
+def run(args: argparse.Namespace) -> Dict[str, Any]:
+    cls = load_module_class(args.module)
+    init_args = json.loads(args.init)
+
+    with module_arguments([*shlex.split(args.module_args), args.direction]):
+        module = cls(*init_args)
+
+    frames = read_frames(args.source)
+    if args.preload:
+        frames = iter(list(frames))
+
+    samples: List[float] = []
+    wall_start = 0.0
+    for idx, image in enumerate(frames):
+        if args.frames and idx >= args.frames + args.warmup:
+            break
+        # the wall clock covers the timed frames only, decoding included
+        if idx == args.warmup:
+            wall_start = time.perf_counter()
+
+        acquisition_time = int(time.monotonic() * 1000)
+        start = time.perf_counter()
+        module._process_frame(args.direction, image, acquisition_time)
+        elapsed = time.perf_counter() - start
+
+        # posts are only copied, never published
+        module._post_queue.clear()
+
+        if idx >= args.warmup:
+            samples.append(elapsed * 1000)
+    wall_time = time.perf_counter() - wall_start
+
+    if not samples:
+        raise RuntimeError(f"no frames were read from '{args.source}'")
+
+    timings = np.array(samples)
+    return {
+        "module": args.module,
+        "frames": len(samples),
+        "process_fps": len(samples) / (timings.sum() / 1000),
+        "wall_fps": len(samples) / wall_time,
+        "mean_ms": float(timings.mean()),
+        "p50_ms": float(np.percentile(timings, 50)),
+        "p95_ms": float(np.percentile(timings, 95)),
+        "p99_ms": float(np.percentile(timings, 99)),
+        "max_ms": float(timings.max()),
+        # ru_maxrss is in kilobytes on linux
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    }
+
+
+def print_report(report: Dict[str, Any]):
+    print(f"{report['module']}: {report['frames']} frames")
+    print(f"  process fps  {report['process_fps']:10.2f}")
+    print(f"  wall fps     {report['wall_fps']:10.2f}")
+    for key in ("mean_ms", "p50_ms", "p95_ms", "p99_ms", "max_ms"):
+        print(f"  {key[:-3]:<12} {report[key]:10.3f} ms")
+    print(f"  peak rss     {report['peak_rss_mb']:10.1f} MB")
+
+
+def run_at_revision(rev: str, argv: List[str], args: argparse.Namespace) -> Dict[str, Any]:
+    """Run the harness of another commit in a temporary git worktree"""
+    toplevel = subprocess.check_output(
+        ["git", "rev-parse", "--show-toplevel"], text=True).strip()
+    here = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    prefix = os.path.relpath(here, toplevel)
+
+    worktree = tempfile.mkdtemp(prefix="vision-benchmark-")
+    subprocess.check_call(["git", "worktree", "add", "--detach", "-q", worktree, rev],
+                          cwd=toplevel)
+    try:
+        root = os.path.join(worktree, prefix)
+        harness = os.path.join(root, "vision", "misc", "benchmark.py")
+        if not os.path.exists(harness):
+            raise RuntimeError(f"{rev} does not have a benchmark harness")
+
+        # benchmark the module as it exists at that revision
+        location, _, class_name = args.module.rpartition(":")
+        if os.path.exists(location):
+            relative = os.path.relpath(os.path.abspath(location), toplevel)
+            argv = [a if a != args.module else
+                    f"{os.path.join(worktree, relative)}:{class_name}" for a in argv]
+
+        env = dict(os.environ)
+        env["PYTHONPATH"] = os.pathsep.join([root, env.get("PYTHONPATH", "")])
+        out = subprocess.check_output([sys.executable, harness, *argv, "--json"], env=env,
+                                      text=True)
+        return json.loads(out.strip().splitlines()[-1])
+    finally:
+        subprocess.call(["git", "worktree", "remove", "--force", worktree], cwd=toplevel)
+        shutil.rmtree(worktree, ignore_errors=True)
+
+
+def compare(args: argparse.Namespace, argv: List[str]) -> int:
+    base_rev, new_rev = args.compare
+    base = run_at_revision(base_rev, argv, args)
+    new = run_at_revision(new_rev, argv, args)
+
+    print(f"{'metric':<14}{base_rev:>14}{new_rev:>14}{'change':>10}")
+    for key in ("process_fps", "wall_fps", "mean_ms", "p50_ms", "p95_ms", "p99_ms",
+                "max_ms", "peak_rss_mb"):
+        change = (new[key] - base[key]) / base[key] * 100 if base[key] else 0.0
+        print(f"{key:<14}{base[key]:>14.3f}{new[key]:>14.3f}{change:>9.1f}%")
+
+    slowdown = (base["process_fps"] - new["process_fps"]) / base["process_fps"] * 100
+    if slowdown > args.threshold:
+        print(f"REGRESSION: {new_rev} is {slowdown:.1f}% slower than {base_rev}")
+        return 1
+    return 0
+
+
+def main(argv: List[str]) -> int:
+    parser = argparse.ArgumentParser(
+        "auv-vision-benchmark",
+        description="Replay frames through a vision module as fast as possible",
+        formatter_class=argparse.RawTextHelpFormatter,
+    )
+    parser.add_argument("module", help="'path/to/module.py:Class' or 'dotted.module:Class'")
+    parser.add_argument("source", help="video file or image directory")
+    parser.add_argument("--direction", default="forward",
+                        help="direction the frames are fed as (default=forward)")
+    parser.add_argument("--init", default="[]",
+                        help="JSON list of positional arguments for the module constructor")
+    parser.add_argument("--module-args", default="",
+                        help="command line passed to the module. Use the = form for options,\n"
+                             "e.g. --module-args='--enable-performance --fps 30'")
+    parser.add_argument("--frames", type=int, default=0,
+                        help="number of timed frames (default=all)")
+    parser.add_argument("--warmup", type=int, default=5,
+                        help="untimed frames processed first (default=5)")
+    parser.add_argument("--preload", action="store_true",
+                        help="decode every frame before timing starts")
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    parser.add_argument("--compare", nargs=2, metavar=("BASE", "NEW"),
+                        help="benchmark two commits and report the difference")
+    parser.add_argument("--threshold", type=float, default=10.0,
+                        help="fps drop in percent that counts as a regression (default=10)")
+    args = parser.parse_args(argv)
+
+    if args.compare:
+        forwarded = [a for a in argv if a not in ("--json",)]
+        idx = forwarded.index("--compare")
+        del forwarded[idx:idx + 3]
+        return compare(args, forwarded)
+
+    report = run(args)
+    if args.json:
+        print(json.dumps(report))
+    else:
+        print_report(report)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,310 @@
+#!/usr/bin/env python3
+"""Start vision modules by forking them from a process that has already imported
+everything they need.
+
+The server imports numpy, cv2, auvlog, shm and the vision framework once, then
+waits on a unix socket. Each launch request forks the server, so the module
+starts with a warm interpreter instead of paying for those imports again. The
+child takes over the launching terminal's stdin, stdout and stderr, working
+directory and environment, and runs the module file as __main__.
+
+The socket lives in $XDG_RUNTIME_DIR when it is set, is only accessible to the
+user running the server, and connections from other users are refused, since a
+launch runs arbitrary code as that user.
+
+Examples:
+    auv-vision-fork-server serve &
+    auv-vision-fork-server run vision/modules/poster.py forward --fps 5
+    auv-vision-fork-server run --detach vision/modules/poster.py forward
+    auv-vision-fork-server stop 12345
+"""
+import os
+import sys
+import json
+import time
+import runpy
+import signal
+import socket
+import struct
+import argparse
+import importlib
+import traceback
+
+from typing import Any, BinaryIO, Dict, List, Tuple
+
+DEFAULT_SOCKET = (
+    os.path.join(os.environ["XDG_RUNTIME_DIR"], "auv-vision-fork-server.sock")
+    if os.environ.get("XDG_RUNTIME_DIR")
+    else f"/tmp/auv-vision-fork-server-{os.getuid()}.sock"
+)
+
+# everything a typical module imports before it gets to its own code
+PRELOAD = [
+    "numpy",
+    "cv2",
+    "shm",
+    "auvlog.client",
+    "auv_python_helpers",
+    "vision.core.base",
+    "vision.core.tuners",
+    "vision.utils.color",
+    "vision.utils.draw",
+    "vision.utils.feature",
+    "vision.utils.transform",
+]
+
+MAX_MESSAGE = 1 << 20
+
+# launch requests carry the caller's environment and can span several reads, so
+# they are prefixed with their length
+_REQUEST_LENGTH = struct.Struct("!I")
+REQUEST_TIMEOUT = 5.0
+
+# pid, uid and gid of a unix socket peer
+_PEER_CREDENTIALS = struct.Struct("3i")
+
+
+def send_request(conn: socket.socket, request: Dict[str, Any], fds: List[int]):
+    payload = json.dumps(request).encode()
+    if len(payload) > MAX_MESSAGE:
+        raise ValueError(f"launch request of {len(payload)} bytes exceeds {MAX_MESSAGE}")
+    data = _REQUEST_LENGTH.pack(len(payload)) + payload
+
+    # the descriptors travel with the first chunk, the rest is plain data
+    sent = socket.send_fds(conn, [data], fds)
+    conn.sendall(data[sent:])
+
+
+def recv_request(conn: socket.socket) -> Tuple[Dict[str, Any], List[int]]:
+    data, fds, _, _ = socket.recv_fds(conn, _REQUEST_LENGTH.size + MAX_MESSAGE, 3)
+    try:
+        while True:
+            if len(data) >= _REQUEST_LENGTH.size:
+                length = _REQUEST_LENGTH.unpack_from(data)[0]
+                if length > MAX_MESSAGE:
+                    raise ValueError(f"launch request of {length} bytes exceeds {MAX_MESSAGE}")
+                if len(data) >= _REQUEST_LENGTH.size + length:
+                    break
+
+            chunk = conn.recv(MAX_MESSAGE)
+            if not chunk:
+                raise ConnectionError("connection closed in the middle of a request")
+            data += chunk
+
+        payload = data[_REQUEST_LENGTH.size:_REQUEST_LENGTH.size + length]
+        return json.loads(payload), list(fds)
+    except BaseException:
+        for fd in fds:
+            os.close(fd)
+        raise
+
+
+def send_message(conn: socket.socket, message: Dict[str, Any]):
+    conn.sendall(json.dumps(message).encode() + b"\n")
+
+
+def recv_message(stream: BinaryIO) -> Dict[str, Any]:
+    line = stream.readline()
+    if not line:
+        raise ConnectionError("connection closed")
+    return json.loads(line)
+
+
+def peer_uid(conn: socket.socket) -> int:
+    credentials = conn.getsockopt(socket.SOL_SOCKET, socket.SO_PEERCRED, _PEER_CREDENTIALS.size)
+    return _PEER_CREDENTIALS.unpack(credentials)[1]
+
+
+def preload(modules: List[str]):
+    start = time.perf_counter()
+    loaded = 0
+    for name in modules:
+        try:
+            importlib.import_module(name)
+            loaded += 1
+        except Exception as e:
+            print(f"could not preload {name}: {e}", file=sys.stderr)
+    print(f"preloaded {loaded} modules in {time.perf_counter() - start:.2f}s")
+
+
+def run_child(request: Dict[str, Any], fds: List[int]):
+    """Body of the forked child. Never returns"""
+    code = 0
+    try:
+        signal.signal(signal.SIGINT, signal.default_int_handler)
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+        os.setpgid(0, 0)
+
+        for target, fd in enumerate(fds):
+            os.dup2(fd, target)
+            os.close(fd)
+        sys.stdin = os.fdopen(0, "r", closefd=False)
+        sys.stdout = os.fdopen(1, "w", buffering=1, closefd=False)
+        sys.stderr = os.fdopen(2, "w", buffering=1, closefd=False)
+
+        os.chdir(request["cwd"])
+        os.environ.clear()
+        os.environ.update(request["env"])
+
+        sys.argv = [request["path"], *request["args"]]
+        sys.path[0] = os.path.dirname(os.path.abspath(request["path"]))
+        runpy.run_path(request["path"], run_name="__main__")
+    except SystemExit as e:
+        code = e.code if isinstance(e.code, int) else (0 if e.code is None else 1)
+    except KeyboardInterrupt:
+        code = 130
+    except BaseException:
+        traceback.print_exc()
+        code = 1
+    finally:
+        sys.stdout.flush()
+        sys.stderr.flush()
+        os._exit(code)
+
+
+def serve(args: argparse.Namespace) -> int:
+    preload(PRELOAD + args.preload)
+
+    if os.path.exists(args.socket):
+        os.unlink(args.socket)
+    listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    # created private, so there is no window in which others could connect
+    umask = os.umask(0o177)
+    try:
+        listener.bind(args.socket)
+    finally:
+        os.umask(umask)
+    os.chmod(args.socket, 0o600)
+    listener.listen()
+    listener.settimeout(0.5)
+    print(f"listening on {args.socket}")
+
+    # the server stays single threaded, since forking a process with threads is unsafe
+    children: Dict[int, socket.socket] = {}
+    try:
+        while True:
+            try:
+                conn, _ = listener.accept()
+            except socket.timeout:
+                conn = None
+
+            if conn is not None:
+                uid = peer_uid(conn)
+                if uid != os.getuid():
+                    print(f"refused a launch from uid {uid}", file=sys.stderr)
+                    conn.close()
+                    conn = None
+
+            if conn is not None:
+                # a launcher that stalls mid-request must not block the server
+                conn.settimeout(REQUEST_TIMEOUT)
+                try:
+                    request, fds = recv_request(conn)
+                except Exception as e:
+                    print(f"bad launch request: {e}", file=sys.stderr)
+                    conn.close()
+                    continue
+                conn.settimeout(None)
+
+                pid = os.fork()
+                if pid == 0:
+                    listener.close()
+                    conn.close()
+                    for other in children.values():
+                        other.close()
+                    run_child(request, fds)
+
+                for fd in fds:
+                    os.close(fd)
+                children[pid] = conn
+                try:
+                    send_message(conn, {"pid": pid})
+                except OSError:
+                    pass
+                print(f"started {request['path']} as {pid}")
+
+            # reap finished modules and tell their launchers
+            while children:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+                if pid == 0:
+                    break
+                conn = children.pop(pid)
+                try:
+                    send_message(conn, {"exit": os.waitstatus_to_exitcode(status)})
+                except OSError:
+                    pass
+                conn.close()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for pid in children:
+            os.kill(pid, signal.SIGINT)
+        listener.close()
+        os.unlink(args.socket)
+    return 0
+
+
+def launch(args: argparse.Namespace) -> int:
+    conn = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    conn.connect(args.socket)
+
+    request = {
+        "path": os.path.abspath(args.path),
+        "args": args.args,
+        "cwd": os.getcwd(),
+        "env": dict(os.environ),
+    }
+    send_request(conn, request, [0, 1, 2])
+    replies = conn.makefile("rb")
+    pid = recv_message(replies)["pid"]
+
+    if args.detach:
+        print(pid)
+        return 0
+
+    # the module is not our child, so interrupts are forwarded by hand
+    def forward(signum, _):
+        os.kill(pid, signum)
+
+    signal.signal(signal.SIGINT, forward)
+    signal.signal(signal.SIGTERM, forward)
+    return recv_message(replies)["exit"]
+
+
+def stop(args: argparse.Namespace) -> int:
+    os.kill(args.pid, signal.SIGINT)
+    return 0
+
+
+def main(argv: List[str]) -> int:
+    parser = argparse.ArgumentParser(
+        "auv-vision-fork-server",
+        description="Launch vision modules from a pre-warmed parent process",
+        formatter_class=argparse.RawTextHelpFormatter,
+    )
+    parser.add_argument("--socket", default=DEFAULT_SOCKET,
+                        help=f"unix socket of the server (default={DEFAULT_SOCKET})")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    serve_parser = commands.add_parser("serve", help="import the framework and wait for launches")
+    serve_parser.add_argument("--preload", nargs="*", default=[],
+                              help="additional modules to import up front")
+    serve_parser.set_defaults(func=serve)
+
+    run_parser = commands.add_parser("run", help="start a module through the server")
+    run_parser.add_argument("--detach", action="store_true",
+                            help="print the pid of the module and return immediately")
+    run_parser.add_argument("path", help="module file to run")
+    run_parser.add_argument("args", nargs=argparse.REMAINDER, help="module command line")
+    run_parser.set_defaults(func=launch)
+
+    stop_parser = commands.add_parser("stop", help="stop a module started with --detach")
+    stop_parser.add_argument("pid", type=int)
+    stop_parser.set_defaults(func=stop)
+
+    args = parser.parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
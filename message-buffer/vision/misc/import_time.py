@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""Measure how long vision code takes to import in a fresh interpreter.
+
+Every target is imported in a new process with `python -X importtime`, several
+times, and the interpreter's own startup is subtracted. The report lists the
+median import time of each target and the imports that contribute most to it.
+
+Examples:
+    auv-vision-import-time
+    auv-vision-import-time vision.modules.poster vision.utils.color --top 15
+"""
+import sys
+import json
+import time
+import argparse
+import subprocess
+import statistics
+
+from collections import defaultdict
+from typing import Any, Dict, List, Tuple
+
+DEFAULT_TARGETS = [
+    "vision.core.base",
+    "vision.utils",
+    "vision.utils.color",
+    "vision.modules.poster",
+]
+
+
+def import_once(target: str) -> Tuple[float, Dict[str, int]]:
+    """Import `target` in a fresh interpreter
+
+    Returns:
+        Tuple[float, Dict[str, int]]: wall time in seconds, cumulative microseconds per imported module
+    """
+    start = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {target}"],
+        capture_output=True, text=True,
+    )
+    elapsed = time.perf_counter() - start
+    if proc.returncode != 0:
+        raise RuntimeError(f"importing {target} failed:\n{proc.stderr}")
+
+    # lines look like 'import time:       123 |        456 |   package.module'
+    cumulative: Dict[str, int] = {}
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        fields = line[len("import time:"):].split("|")
+        if len(fields) != 3 or not fields[1].strip().isdigit():
+            continue
+        cumulative[fields[2].strip()] = int(fields[1])
+    return elapsed, cumulative
+
+
+def measure(target: str, repeat: int, baseline: float) -> Dict[str, Any]:
+    walls: List[float] = []
+    samples: Dict[str, List[int]] = defaultdict(list)
+    for _ in range(repeat):
+        wall, cumulative = import_once(target)
+        walls.append(wall)
+        for name, us in cumulative.items():
+            samples[name].append(us)
+
+    return {
+        "target": target,
+        "wall_ms": (statistics.median(walls) - baseline) * 1000,
+        "imports": {name: statistics.median(us) / 1000 for name, us in samples.items()},
+    }
+
+
+def print_report(report: Dict[str, Any], top: int):
+    print(f"{report['target']}: {report['wall_ms']:.1f} ms")
+    imports = sorted(report["imports"].items(), key=lambda x: x[1], reverse=True)
+    for name, ms in imports[:top]:
+        print(f"  {ms:10.1f} ms  {name}")
+
+
+def main(argv: List[str]) -> int:
+    parser = argparse.ArgumentParser(
+        "auv-vision-import-time",
+        description="Measure the cold import time of vision modules",
+        formatter_class=argparse.RawTextHelpFormatter,
+    )
+    parser.add_argument("targets", nargs="*", default=DEFAULT_TARGETS,
+                        help="dotted modules to import (default: the framework and a sample module)")
+    parser.add_argument("--repeat", type=int, default=5,
+                        help="fresh interpreters per target (default=5)")
+    parser.add_argument("--top", type=int, default=10,
+                        help="slowest imports to list per target (default=10)")
+    parser.add_argument("--json", action="store_true", help="print the reports as JSON")
+    args = parser.parse_args(argv)
+
+    baseline = statistics.median(import_once("sys")[0] for _ in range(args.repeat))
+    reports = [measure(target, args.repeat, baseline) for target in args.targets]
+
+    if args.json:
+        print(json.dumps(reports))
+    else:
+        for report in reports:
+            print_report(report, args.top)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+"""Compares the compiled Preprocessor plan against the previous implementation.
+
+Every scenario enables a set of preprocessor options, then runs both
+implementations over the same synthetic frame and reports per-frame timings and
+the largest pixel difference between their outputs. Scenarios with noise are
+random, so only their timings are comparable.
+
+Examples:
+    auv-vision-preprocessor-benchmark
+    auv-vision-preprocessor-benchmark --size 1920x1080 --frames 200 --scenario photometric
+"""
+import time
+import argparse
+import numpy
+import cv2
+
+from typing import Any, Callable, Dict, List
+
+from vision.modules.preprocessor import Preprocessor
+
+SCENARIOS: Dict[str, Dict[str, Any]] = {
+    'idle': {},
+    'photometric': {'PPX_r_bias': 20, 'PPX_g_bias': -15, 'PPX_b_bias': 5,
+                    'PPX_contrast': 1.3, 'PPX_brightness': -10},
+    'geometric': {'PPX_rotate': 15, 'PPX_resize': True, 'PPX_resize_width': 640,
+                  'PPX_resize_height': 360, 'PPX_translate_x': 12, 'PPX_translate_y': -8},
+    'morphology': {'PPX_gaussian_blur': True, 'PPX_gaussian_blur_kernel': 2,
+                   'PPX_erode': True, 'PPX_erode_kernel': 3, 'PPX_dilate': True, 'PPX_dilate_kernel': 3},
+    'noise': {'PPX_gaussian_noise': 20},
+    'splits': {'PPX_rgb_split': True, 'PPX_lab_split': True, 'PPX_hsv_split': True,
+               'PPX_grayscale': True, 'PPX_lab': True},
+}
+
+
+class _Host:
+    """the parts of a module the Preprocessor uses, posting into a dict"""
+
+    max_buffer_size = 1 << 30
+
+    def __init__(self):
+        self.options_dict: Dict[str, Any] = {}
+        self.posted: Dict[str, numpy.ndarray] = {}
+
+    def post(self, name: str, image: numpy.ndarray):
+        self.posted[name] = image
+
+
+def legacy_process(self, *images):
+    """Preprocessor.process before it compiled its options into a plan, kept
+    verbatim as the baseline"""
+    from vision.modules.color_balance import balance
+    preprocessed_images = []
+    for mat in images:
+        if self.options_dict['PPX_rgb_split'].value:
+            bgr_split = cv2.split(mat)
+            self.module.post("PPX_rgb_r_channel", bgr_split[2])
+            self.module.post("PPX_rgb_g_channel", bgr_split[1])
+            self.module.post("PPX_rgb_b_channel", bgr_split[0])
+        if self.options_dict['PPX_lab_split'].value:
+            lab_split = cv2.split(cv2.cvtColor(mat, cv2.COLOR_BGR2LAB))
+            self.module.post("PPX_lab_l_channel", lab_split[0])
+            self.module.post("PPX_lab_a_channel", lab_split[1])
+            self.module.post("PPX_lab_b_channel", lab_split[2])
+        if self.options_dict['PPX_hsv_split'].value:
+            hsv_split = cv2.split(cv2.cvtColor(mat, cv2.COLOR_BGR2HSV))
+            self.module.post("PPX_hsv_h_channel", hsv_split[0])
+            self.module.post("PPX_hsv_s_channel", hsv_split[1])
+            self.module.post("PPX_hsv_v_channel", hsv_split[2])
+        if self.options_dict['PPX_hls_split'].value:
+            hls_split = cv2.split(cv2.cvtColor(mat, cv2.COLOR_BGR2HLS))
+            self.module.post("PPX_hls_h_channel", hls_split[0])
+            self.module.post("PPX_hls_l_channel", hls_split[1])
+            self.module.post("PPX_hls_s_channel", hls_split[2])
+        if self.options_dict['PPX_ycrcb_split'].value:
+            ycrcb_split = cv2.split(cv2.cvtColor(mat, cv2.COLOR_BGR2YCrCb))
+            self.module.post("PPX_ycrcb_y_channel", ycrcb_split[0])
+            self.module.post("PPX_ycrcb_cr_channel", ycrcb_split[1])
+            self.module.post("PPX_ycrcb_cb_channel", ycrcb_split[2])
+        if self.options_dict['PPX_luv_split'].value:
+            luv_split = cv2.split(cv2.cvtColor(mat, cv2.COLOR_BGR2LUV))
+            self.module.post("PPX_luv_l_channel", luv_split[0])
+            self.module.post("PPX_luv_u_channel", luv_split[1])
+            self.module.post("PPX_luv_v_channel", luv_split[2])
+        if self.options_dict['PPX_grayscale'].value:
+            grayscale = cv2.cvtColor(mat, cv2.COLOR_BGR2GRAY)
+            self.module.post("PPX_grayscale", grayscale)
+        if self.options_dict['PPX_lab'].value:
+            lab = cv2.cvtColor(mat, cv2.COLOR_BGR2LAB)
+            self.module.post('PPX_lab', lab)
+        if self.options_dict['PPX_color_correction'].value:
+            mat = balance(mat)
+        if self.options_dict['PPX_r_bias'].value != 0:
+            bgr_split = cv2.split(mat)
+            bgr_split[2] = cv2.add(
+                self.options_dict['PPX_r_bias'].value, bgr_split[2])
+            mat = cv2.merge(bgr_split)
+        if self.options_dict['PPX_g_bias'].value != 0:
+            bgr_split = cv2.split(mat)
+            bgr_split[1] = cv2.add(
+                self.options_dict['PPX_g_bias'].value, bgr_split[1])
+            mat = cv2.merge(bgr_split)
+        if self.options_dict['PPX_b_bias'].value != 0:
+            bgr_split = cv2.split(mat)
+            bgr_split[0] = cv2.add(
+                self.options_dict['PPX_b_bias'].value, bgr_split[0])
+            mat = cv2.merge(bgr_split)
+        if self.options_dict['PPX_contrast'].value != 1:
+            temp = mat * self.options_dict['PPX_contrast'].value
+            mat = numpy.clip(temp, 0., 255.).astype(numpy.uint8)
+        if self.options_dict['PPX_brightness'].value != 0:
+            temp = mat + float(self.options_dict['PPX_brightness'].value)
+            mat = numpy.clip(temp, 0., 255.).astype(numpy.uint8)
+        if self.options_dict['PPX_gaussian_blur'].value:
+            mat = cv2.GaussianBlur(mat,
+                                   (self.options_dict['PPX_gaussian_blur_kernel'].value * 2 + 1,
+                                    self.options_dict['PPX_gaussian_blur_kernel'].value * 2 + 1),
+                                   0)
+        if self.options_dict['PPX_gaussian_noise'].value != 0:
+            noise = numpy.random.randn(
+                *mat.shape) * self.options_dict['PPX_gaussian_noise'].value
+            mat = mat + noise
+            mat = numpy.clip(mat, 0., 255.).astype(numpy.uint8)
+        if self.options_dict['PPX_erode'].value:
+            mat = cv2.erode(mat,
+                            cv2.getStructuringElement(cv2.MORPH_ELLIPSE,
+                                                      (self.options_dict['PPX_erode_kernel'].value * 2 + 1,
+                                                       self.options_dict['PPX_erode_kernel'].value * 2 + 1)))
+        if self.options_dict['PPX_dilate'].value:
+            mat = cv2.dilate(mat,
+                             cv2.getStructuringElement(cv2.MORPH_ELLIPSE,
+                                                       (self.options_dict['PPX_dilate_kernel'].value * 2 + 1,
+                                                        self.options_dict['PPX_dilate_kernel'].value * 2 + 1)))
+        if self.options_dict['PPX_rotate'].value != 0:
+            rot_mat = cv2.getRotationMatrix2D(
+                (mat.shape[1] / 2, mat.shape[0] / 2),
+                self.options_dict['PPX_rotate'].value, 1)
+            mat = cv2.warpAffine(mat, rot_mat, (mat.shape[1], mat.shape[0]),
+                                 borderMode=cv2.BORDER_REPLICATE)
+        if self.options_dict['PPX_resize'].value:
+            mat = cv2.resize(mat,
+                             (self.options_dict['PPX_resize_width'].value,
+                              self.options_dict['PPX_resize_height'].value))
+        if self.options_dict['PPX_resize_ratio'].value != 1:
+            mat = cv2.resize(mat,
+                             (int(mat.shape[1] * self.options_dict['PPX_resize_ratio'].value),
+                              int(mat.shape[0] * self.options_dict['PPX_resize_ratio'].value)))
+        if self.options_dict['PPX_translate_x'].value != 0 or \
+           self.options_dict['PPX_translate_y'].value != 0:
+            trans_mat = numpy.float32([[1, 0, self.options_dict['PPX_translate_x'].value],
+                                       [0, 1, self.options_dict['PPX_translate_y'].value]])
+            mat = cv2.warpAffine(
+                mat, trans_mat, (mat.shape[1], mat.shape[0]))
+        preprocessed_images.append(mat)
+    return preprocessed_images
+
+
+def _time(fn: Callable[[], Any], frames: int) -> List[float]:
+    fn()  # warm up caches and the compiled plan
+    times = []
+    for _ in range(frames):
+        start = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - start) * 1000)
+    return times
+
+
+def _size(arg: str):
+    width, height = arg.lower().split('x')
+    return int(width), int(height)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the compiled Preprocessor plan against the previous implementation')
+    parser.add_argument('--size', type=_size, default=(1280, 720), help='frame size as WIDTHxHEIGHT (default=1280x720)')
+    parser.add_argument('--frames', type=int, default=100, help='timed frames per scenario (default=100)')
+    parser.add_argument('--scenario', choices=sorted(SCENARIOS), action='append',
+                        help='scenario to run, may be repeated (default=all)')
+    args = parser.parse_args()
+
+    width, height = args.size
+    rng = numpy.random.default_rng(0)
+    frame = cv2.GaussianBlur(rng.integers(0, 256, (height, width, 3), dtype=numpy.uint8), (0, 0), 3)  # type: ignore
+
+    print(f"{'scenario':<12} {'legacy p50':>11} {'plan p50':>9} {'speedup':>8} {'max diff':>9}")
+    for name in args.scenario or list(SCENARIOS):
+        host = _Host()
+        preprocessor = Preprocessor(host)
+        for option, value in SCENARIOS[name].items():
+            preprocessor.options_dict[option].assign(value)
+
+        legacy = _time(lambda: legacy_process(preprocessor, frame), args.frames)
+        plan = _time(lambda: preprocessor.process(frame), args.frames)
+
+        expected, actual = legacy_process(preprocessor, frame)[0], preprocessor.process(frame)[0]
+        if expected.shape != actual.shape:
+            diff = f"{actual.shape}"
+        elif 'PPX_gaussian_noise' in SCENARIOS[name]:
+            diff = 'random'
+        else:
+            diff = str(int(cv2.absdiff(expected, actual).max()))  # type: ignore
+
+        legacy_p50, plan_p50 = numpy.median(legacy), numpy.median(plan)
+        print(f"{name:<12} {legacy_p50:>9.2f}ms {plan_p50:>7.2f}ms {legacy_p50 / plan_p50:>7.1f}x {diff:>9}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""Run several vision modules in one process, reading every video source once.
+
+Modules are given as 'path/to/module.py:Class' or 'dotted.module:Class', with an
+optional '@cpus' suffix pinning the module to those cpus. All modules run as
+threads of one process, so pinning confines a module but does not give it a cpu
+of its own: Python code still runs one module at a time under the GIL, only
+opencv and other native calls that release it overlap. Every module receives
+the same command line, given after '--'. For anything more, pass a JSON config:
+
+    [
+        {"name": "Poster", "module": "vision/modules/poster.py:Poster",
+         "args": ["forward", "--fps", "5"], "cpus": [2, 3]},
+        {"name": "Buoy", "module": "vision.modules.buoy:Buoy", "init": ["forward"]}
+    ]
+
+Examples:
+    auv-vision-supervisor vision/modules/poster.py:Poster@2 vision/modules/buoy.py:Buoy -- forward
+    auv-vision-supervisor --config modules.json
+"""
+import sys
+import json
+import signal
+import argparse
+import threading
+
+from typing import List
+
+from vision.core.supervisor import ModuleSpec, ModuleSupervisor
+from vision.misc.benchmark import load_module_class
+
+
+def parse_target(target: str, args: List[str]) -> ModuleSpec:
+    target, _, cpus = target.partition("@")
+    cls = load_module_class(target)
+    return ModuleSpec(
+        name=cls.__name__,
+        cls=cls,
+        args=args,
+        cpus=[int(c) for c in cpus.split(",")] if cpus else None,
+    )
+
+
+def parse_config(path: str) -> List[ModuleSpec]:
+    with open(path) as f:
+        entries = json.load(f)
+
+    specs = []
+    for entry in entries:
+        cls = load_module_class(entry["module"])
+        specs.append(ModuleSpec(
+            name=entry.get("name", cls.__name__),
+            cls=cls,
+            init=entry.get("init", []),
+            args=entry.get("args", []),
+            cpus=entry.get("cpus"),
+        ))
+    return specs
+
+
+def main(argv: List[str]) -> int:
+    module_args: List[str] = []
+    if "--" in argv:
+        idx = argv.index("--")
+        argv, module_args = argv[:idx], argv[idx + 1:]
+
+    parser = argparse.ArgumentParser(
+        "auv-vision-supervisor",
+        description="Host several vision modules in one process",
+        formatter_class=argparse.RawTextHelpFormatter,
+    )
+    parser.add_argument("modules", nargs="*",
+                        help="'path/to/module.py:Class[@cpu,cpu]' or 'dotted.module:Class[@cpu,cpu]'")
+    parser.add_argument("--config", help="JSON list of modules to host")
+    args = parser.parse_args(argv)
+
+    specs = [parse_target(t, module_args) for t in args.modules]
+    if args.config:
+        specs.extend(parse_config(args.config))
+    if not specs:
+        parser.error("no modules given")
+
+    supervisor = ModuleSupervisor(specs)
+    quit_flag = threading.Event()
+    signal.signal(signal.SIGINT, lambda *_: quit_flag.set())
+    signal.signal(signal.SIGTERM, lambda *_: quit_flag.set())
+
+    # the supervisor runs on its own thread so the main thread stays free to handle signals
+    thread = threading.Thread(target=supervisor.run, args=(quit_flag,))
+    thread.start()
+    while thread.is_alive():
+        thread.join(timeout=0.5)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
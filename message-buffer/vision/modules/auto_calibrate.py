@@ -11,6 +11,7 @@ from vision.core.tuners import IntTuner, BoolTuner, DoubleTuner
 from vision.utils.draw import draw_rect, draw_text
 
 from vision.utils.color import bgr_to_lab, lab_to_bgr
+from vision.utils import frame_context
 
 
 def get_module_options(direction):
@@ -54,6 +55,7 @@ def get_module_options(direction):
 
 
 class AutoCalibrate(ModuleBase):
+    MUTATES_FRAMES = True
 
     def __init__(self, direction: str):
         super().__init__([direction], get_module_options(direction))
@@ -111,7 +113,7 @@ class AutoCalibrate(ModuleBase):
         img = img[0]
         enabled = self.tuners['enable']
 
-        (b, g, r) = cv2.split(img)  # type: ignore
+        (b, g, r) = frame_context.split(img)
         _, lab_img = bgr_to_lab(img)
         (lab_l, lab_a, lab_b) = lab_img
 
@@ -142,6 +144,8 @@ class AutoCalibrate(ModuleBase):
 
             draw_rect(img, (start_x, start_y), (end_x, end_y),
                       color=(255, 255, 255), thickness=5)
+            # the channel is shared through the frame context, draw on a copy
+            lab_l = lab_l.copy()
             draw_rect(lab_l, (start_x, start_y), (end_x, end_y),
                       color=(255, 255, 255), thickness=5)
 
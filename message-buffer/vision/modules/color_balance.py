@@ -5,12 +5,10 @@ import shm
 import numpy
 import time
 import ctypes
-from auv_python_helpers import load_library
 from vision.core.base import ModuleBase
+from vision.utils.helpers import native_library
 from vision.core import tuners
 
-_lib_color_balance = load_library('libauv-color-balance.so')
-
 """
 Convert from RGB color space to HSI color space
 """
@@ -102,7 +100,7 @@ def balance(mat, equalize_rgb=True, rgb_contrast_correct=False,
     c_uint8_p = ctypes.POINTER(ctypes.c_int8)
     data = mat.flatten()
     data_p = data.ctypes.data_as(c_uint8_p)
-    _lib_color_balance.process_frame(data_p, rows, cols, depth, equalize_rgb,
+    native_library('libauv-color-balance.so').process_frame(data_p, rows, cols, depth, equalize_rgb,
             rgb_contrast_correct, hsv_contrast_correct, hsi_contrast_correct,
             rgb_extrema_clipping, adaptive_cast_correction, horizontal_blocks, vertical_blocks)
     # Convert to matrix of original shape
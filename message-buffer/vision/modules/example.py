@@ -9,6 +9,8 @@ module_options = [
 ]
 
 class Hello(ModuleBase):
+    MUTATES_FRAMES = True
+
     def process(self, img):
         draw_text(img, "Hello CUAUV!", (100, 200),
                   self.options["text_size"],
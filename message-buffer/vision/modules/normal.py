@@ -14,6 +14,8 @@ module_options = [
 
 
 class Normal(ModuleBase):
+    MUTATES_FRAMES = True
+
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self.x = self.y = self.z = 0
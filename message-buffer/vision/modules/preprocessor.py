@@ -1,7 +1,18 @@
 from vision.core import tuners
+from vision.utils import frame_context
 import numpy
 import cv2
 
+# (option, posted name prefix, conversion or None for the frame itself, (channel name, channel index))
+_SPLITS = [
+    ('PPX_rgb_split', 'PPX_rgb', None, [('r', 2), ('g', 1), ('b', 0)]),
+    ('PPX_lab_split', 'PPX_lab', cv2.COLOR_BGR2LAB, [('l', 0), ('a', 1), ('b', 2)]),
+    ('PPX_hsv_split', 'PPX_hsv', cv2.COLOR_BGR2HSV, [('h', 0), ('s', 1), ('v', 2)]),
+    ('PPX_hls_split', 'PPX_hls', cv2.COLOR_BGR2HLS, [('h', 0), ('l', 1), ('s', 2)]),
+    ('PPX_ycrcb_split', 'PPX_ycrcb', cv2.COLOR_BGR2YCrCb, [('y', 0), ('cr', 1), ('cb', 2)]),
+    ('PPX_luv_split', 'PPX_luv', cv2.COLOR_BGR2LUV, [('l', 0), ('u', 1), ('v', 2)]),
+]
+
 
 class Preprocessor:
     def __init__(self, module):
@@ -44,108 +55,171 @@ class Preprocessor:
         for option in self.options:
             self.module.options_dict[option.name] = option
 
+        # the enabled options are compiled into a list of steps, rebuilt only
+        # when an option changes
+        self._plan = tuners.Derived(self._compile, *self.options)
+
+    def _compile(self):
+        o = {option.name: option.value for option in self.options}
+        steps = []
+
+        for option, prefix, code, channels in _SPLITS:
+            if o[option]:
+                steps.append(self._split_step(prefix, code, channels))
+        if o['PPX_grayscale']:
+            steps.append(self._post_step('PPX_grayscale', cv2.COLOR_BGR2GRAY))
+        if o['PPX_lab']:
+            steps.append(self._post_step('PPX_lab', cv2.COLOR_BGR2LAB))
+
+        if o['PPX_color_correction']:
+            from vision.modules.color_balance import balance
+            steps.append(balance)
+
+        photometric = self._photometric_step(o)
+        if photometric is not None:
+            steps.append(photometric)
+
+        if o['PPX_gaussian_blur']:
+            size = o['PPX_gaussian_blur_kernel'] * 2 + 1
+            steps.append(lambda mat: cv2.GaussianBlur(mat, (size, size), 0))
+        if o['PPX_gaussian_noise'] != 0:
+            steps.append(self._noise_step(o['PPX_gaussian_noise']))
+        if o['PPX_erode']:
+            erode_kernel = self._ellipse(o['PPX_erode_kernel'])
+            steps.append(lambda mat: cv2.erode(mat, erode_kernel))
+        if o['PPX_dilate']:
+            dilate_kernel = self._ellipse(o['PPX_dilate_kernel'])
+            steps.append(lambda mat: cv2.dilate(mat, dilate_kernel))
+
+        geometric = self._geometric_step(o)
+        if geometric is not None:
+            steps.append(geometric)
+
+        return steps
+
+    @staticmethod
+    def _ellipse(size):
+        return cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (size * 2 + 1, size * 2 + 1))
+
+    def _split_step(self, prefix, code, channels):
+        def step(mat):
+            split = frame_context.split(mat, code)
+            for name, idx in channels:
+                self.module.post(f"{prefix}_{name}_channel", split[idx])
+            return mat
+        return step
+
+    def _post_step(self, name, code):
+        def step(mat):
+            self.module.post(name, frame_context.convert(mat, code))
+            return mat
+        return step
+
+    @staticmethod
+    def _photometric_step(o):
+        """channel biases, contrast and brightness fused into one lookup table per
+        channel, with the same saturation and truncation as applying them in turn"""
+        biases = [o['PPX_b_bias'], o['PPX_g_bias'], o['PPX_r_bias']]
+        contrast, brightness = o['PPX_contrast'], o['PPX_brightness']
+        if not any(biases) and contrast == 1 and brightness == 0:
+            return None
+
+        def table(bias):
+            values = numpy.clip(numpy.arange(256, dtype=numpy.float64) + bias, 0., 255.)
+            if contrast != 1:
+                values = numpy.floor(numpy.clip(values * contrast, 0., 255.))
+            if brightness != 0:
+                values = numpy.floor(numpy.clip(values + float(brightness), 0., 255.))
+            return values.astype(numpy.uint8)
+
+        tables = {}
+
+        def step(mat):
+            channels = mat.shape[2] if mat.ndim == 3 else 1
+            if channels not in tables:
+                if channels == 1:
+                    tables[channels] = table(biases[0])
+                else:
+                    tables[channels] = numpy.stack(
+                        [table(biases[c] if c < 3 else 0) for c in range(channels)], axis=-1
+                    ).reshape(256, 1, channels)
+            return cv2.LUT(mat, tables[channels])
+        return step
+
+    @staticmethod
+    def _noise_step(sigma):
+        buffers = {}
+
+        def step(mat):
+            noise = buffers.get(mat.shape)
+            if noise is None:
+                noise = buffers[mat.shape] = numpy.empty(mat.shape, numpy.int16)
+            cv2.randn(noise.reshape(mat.shape[0], -1), 0, sigma)
+            return cv2.add(mat, noise, dtype=cv2.CV_8U)
+        return step
+
+    @staticmethod
+    def _geometric_step(o):
+        """rotation, both resizes and translation composed into a single warp. The
+        matrix and output size only depend on the input size, and are cached per size"""
+        rotate = o['PPX_rotate']
+        resize = (o['PPX_resize_width'], o['PPX_resize_height']) if o['PPX_resize'] else None
+        ratio = o['PPX_resize_ratio']
+        tx, ty = o['PPX_translate_x'], o['PPX_translate_y']
+        if rotate == 0 and resize is None and ratio == 1 and tx == 0 and ty == 0:
+            return None
+
+        def scale(sx, sy):
+            # pixel centers map like cv2.resize maps them
+            return numpy.array([[sx, 0, 0.5 * sx - 0.5], [0, sy, 0.5 * sy - 0.5], [0, 0, 1]])
+
+        def plan(height, width):
+            m = numpy.eye(3)
+            if rotate != 0:
+                m = numpy.vstack([cv2.getRotationMatrix2D((width / 2, height / 2), rotate, 1), [0, 0, 1]])
+            if resize is not None:
+                m = scale(resize[0] / width, resize[1] / height) @ m
+                width, height = resize
+            if ratio != 1:
+                new_width, new_height = int(width * ratio), int(height * ratio)
+                m = scale(new_width / width, new_height / height) @ m
+                width, height = new_width, new_height
+            m = numpy.array([[1, 0, tx], [0, 1, ty], [0, 0, 1]]) @ m
+            only_resize = rotate == 0 and tx == 0 and ty == 0
+            return m[:2], (width, height), only_resize
+
+        plans = {}
+
+        def step(mat):
+            key = mat.shape[:2]
+            if key not in plans:
+                plans[key] = plan(*key)
+            matrix, size, only_resize = plans[key]
+
+            if only_resize:
+                return cv2.resize(mat, size)
+
+            # rotated corners replicate the edge, the area uncovered by the
+            # translation stays black
+            mat = cv2.warpAffine(mat, matrix, size, borderMode=cv2.BORDER_REPLICATE)
+            if tx > 0:
+                mat[:, :tx] = 0
+            elif tx < 0:
+                mat[:, tx:] = 0
+            if ty > 0:
+                mat[:ty] = 0
+            elif ty < 0:
+                mat[ty:] = 0
+            return mat
+        return step
+
     def process(self, *images):
-        from vision.modules.color_balance import balance
+        steps = self._plan.get()
         preprocessed_images = []
-        for mat in images:
-            if self.options_dict['PPX_rgb_split'].value:
-                bgr_split = cv2.split(mat)
-                self.module.post("PPX_rgb_r_channel", bgr_split[2])
-                self.module.post("PPX_rgb_g_channel", bgr_split[1])
-                self.module.post("PPX_rgb_b_channel", bgr_split[0])
-            if self.options_dict['PPX_lab_split'].value:
-                lab_split = cv2.split(cv2.cvtColor(mat, cv2.COLOR_BGR2LAB))
-                self.module.post("PPX_lab_l_channel", lab_split[0])
-                self.module.post("PPX_lab_a_channel", lab_split[1])
-                self.module.post("PPX_lab_b_channel", lab_split[2])
-            if self.options_dict['PPX_hsv_split'].value:
-                hsv_split = cv2.split(cv2.cvtColor(mat, cv2.COLOR_BGR2HSV))
-                self.module.post("PPX_hsv_h_channel", hsv_split[0])
-                self.module.post("PPX_hsv_s_channel", hsv_split[1])
-                self.module.post("PPX_hsv_v_channel", hsv_split[2])
-            if self.options_dict['PPX_hls_split'].value:
-                hls_split = cv2.split(cv2.cvtColor(mat, cv2.COLOR_BGR2HLS))
-                self.module.post("PPX_hls_h_channel", hls_split[0])
-                self.module.post("PPX_hls_l_channel", hls_split[1])
-                self.module.post("PPX_hls_s_channel", hls_split[2])
-            if self.options_dict['PPX_ycrcb_split'].value:
-                ycrcb_split = cv2.split(cv2.cvtColor(mat, cv2.COLOR_BGR2YCrCb))
-                self.module.post("PPX_ycrcb_y_channel", ycrcb_split[0])
-                self.module.post("PPX_ycrcb_cr_channel", ycrcb_split[1])
-                self.module.post("PPX_ycrcb_cb_channel", ycrcb_split[2])
-            if self.options_dict['PPX_luv_split'].value:
-                luv_split = cv2.split(cv2.cvtColor(mat, cv2.COLOR_BGR2LUV))
-                self.module.post("PPX_luv_l_channel", luv_split[0])
-                self.module.post("PPX_luv_u_channel", luv_split[1])
-                self.module.post("PPX_luv_v_channel", luv_split[2])
-            if self.options_dict['PPX_grayscale'].value:
-                grayscale = cv2.cvtColor(mat, cv2.COLOR_BGR2GRAY)
-                self.module.post("PPX_grayscale", grayscale)
-            if self.options_dict['PPX_lab'].value:
-                lab = cv2.cvtColor(mat, cv2.COLOR_BGR2LAB)
-                self.module.post('PPX_lab', lab)
-            if self.options_dict['PPX_color_correction'].value:
-                mat = balance(mat)
-            if self.options_dict['PPX_r_bias'].value != 0:
-                bgr_split = cv2.split(mat)
-                bgr_split[2] = cv2.add(
-                    self.options_dict['PPX_r_bias'].value, bgr_split[2])
-                mat = cv2.merge(bgr_split)
-            if self.options_dict['PPX_g_bias'].value != 0:
-                bgr_split = cv2.split(mat)
-                bgr_split[1] = cv2.add(
-                    self.options_dict['PPX_g_bias'].value, bgr_split[1])
-                mat = cv2.merge(bgr_split)
-            if self.options_dict['PPX_b_bias'].value != 0:
-                bgr_split = cv2.split(mat)
-                bgr_split[0] = cv2.add(
-                    self.options_dict['PPX_b_bias'].value, bgr_split[0])
-                mat = cv2.merge(bgr_split)
-            if self.options_dict['PPX_contrast'].value != 1:
-                temp = mat * self.options_dict['PPX_contrast'].value
-                mat = numpy.clip(temp, 0., 255.).astype(numpy.uint8)
-            if self.options_dict['PPX_brightness'].value != 0:
-                temp = mat + float(self.options_dict['PPX_brightness'].value)
-                mat = numpy.clip(temp, 0., 255.).astype(numpy.uint8)
-            if self.options_dict['PPX_gaussian_blur'].value:
-                mat = cv2.GaussianBlur(mat,
-                                       (self.options_dict['PPX_gaussian_blur_kernel'].value * 2 + 1,
-                                        self.options_dict['PPX_gaussian_blur_kernel'].value * 2 + 1),
-                                       0)
-            if self.options_dict['PPX_gaussian_noise'].value != 0:
-                noise = numpy.random.randn(
-                    *mat.shape) * self.options_dict['PPX_gaussian_noise'].value
-                mat = mat + noise
-                mat = numpy.clip(mat, 0., 255.).astype(numpy.uint8)
-            if self.options_dict['PPX_erode'].value:
-                mat = cv2.erode(mat,
-                                cv2.getStructuringElement(cv2.MORPH_ELLIPSE,
-                                                          (self.options_dict['PPX_erode_kernel'].value * 2 + 1,
-                                                           self.options_dict['PPX_erode_kernel'].value * 2 + 1)))
-            if self.options_dict['PPX_dilate'].value:
-                mat = cv2.dilate(mat,
-                                 cv2.getStructuringElement(cv2.MORPH_ELLIPSE,
-                                                           (self.options_dict['PPX_dilate_kernel'].value * 2 + 1,
-                                                            self.options_dict['PPX_dilate_kernel'].value * 2 + 1)))
-            if self.options_dict['PPX_rotate'].value != 0:
-                rot_mat = cv2.getRotationMatrix2D(
-                    (mat.shape[1] / 2, mat.shape[0] / 2),
-                    self.options_dict['PPX_rotate'].value, 1)
-                mat = cv2.warpAffine(mat, rot_mat, (mat.shape[1], mat.shape[0]),
-                                     borderMode=cv2.BORDER_REPLICATE)
-            if self.options_dict['PPX_resize'].value:
-                mat = cv2.resize(mat,
-                                 (self.options_dict['PPX_resize_width'].value,
-                                  self.options_dict['PPX_resize_height'].value))
-            if self.options_dict['PPX_resize_ratio'].value != 1:
-                mat = cv2.resize(mat,
-                                 (int(mat.shape[1] * self.options_dict['PPX_resize_ratio'].value),
-                                  int(mat.shape[0] * self.options_dict['PPX_resize_ratio'].value)))
-            if self.options_dict['PPX_translate_x'].value != 0 or \
-               self.options_dict['PPX_translate_y'].value != 0:
-                trans_mat = numpy.float32([[1, 0, self.options_dict['PPX_translate_x'].value],
-                                           [0, 1, self.options_dict['PPX_translate_y'].value]])
-                mat = cv2.warpAffine(
-                    mat, trans_mat, (mat.shape[1], mat.shape[0]))
-            preprocessed_images.append(mat)
+        # the splits, PPX_lab and the module itself share conversions of the frame
+        with frame_context.frame_context():
+            for mat in images:
+                for step in steps:
+                    mat = step(mat)
+                preprocessed_images.append(mat)
         return preprocessed_images
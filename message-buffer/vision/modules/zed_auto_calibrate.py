@@ -41,6 +41,8 @@ def get_module_options(direction):
     ]
     
 class AutoCalibrateZed(ModuleBase):
+    MUTATES_FRAMES = True
+
     def __init__(self, direction):
         super().__init__(direction, get_module_options(direction))
         self.direction = direction
@@ -0,0 +1,117 @@
+"""Grabber scheduling of CaptureSource, driven by a fake camera without threads,
+shared memory or a real device."""
+import sys
+import types
+import importlib
+
+from typing import Any, Callable, Dict, List, Tuple
+
+
+class _NullLogger:
+    """accepts any logger path and message"""
+
+    def __getattr__(self, name: str) -> '_NullLogger':
+        return self
+
+    def __call__(self, *args, **kwargs):
+        pass
+
+
+def _stub_missing(name: str, **attrs: Any):
+    """stands in for a dependency that is not installed, like the native frame
+    buffer library or the auvlog client outside the vehicle"""
+    try:
+        importlib.import_module(name)
+    except (ImportError, OSError):
+        module = types.ModuleType(name)
+        module.__dict__.update(attrs)
+        sys.modules[name] = module
+
+
+_stub_missing('auvlog')
+_stub_missing('auvlog.client', Logger=_NullLogger, log=_NullLogger())
+_stub_missing('vision.core.bindings.camera_message_framework', BlockAccessor=object,
+              encode_str=lambda s: s.encode(), decode_str=lambda b: bytes(b).decode())
+
+from vision.core.capture_source import CaptureSource, DerivedStream  # noqa: E402
+
+
+GRAB_FPS = 30
+
+
+class FakeCamera:
+    """counts grabs and hands out a distinct token per grab"""
+
+    def __init__(self, frames: int):
+        self.frames = frames
+        self.grabs = 0
+
+    def grab(self, args: Tuple[Any, ...]):
+        if self.grabs == self.frames:
+            return None
+        self.grabs += 1
+        return self.grabs
+
+
+class FakeLimiter:
+    """yields acquisition times in milliseconds on the grid of the requested rate,
+    as FpsLimiter does when it keeps up"""
+
+    def rate(self, fps: float):
+        return (int(i * 1000 / fps) for i in range(10 ** 6))
+
+
+def _drive(camera: FakeCamera, streams: List[DerivedStream]) -> None:
+    source = CaptureSource()
+    captured: List[Callable] = []
+    source._add_capture = lambda name, policy, frames, isolation: captured.append(frames)
+    source.register_grabber('fake', camera.grab, streams, fps=GRAB_FPS)
+
+    assert len(captured) == 1
+    for _ in captured[0](FakeLimiter()):
+        pass
+
+
+def _recording_stream(name: str, fps: Any, retrieved: Dict[str, List[int]]) -> DerivedStream:
+    retrieved[name] = []
+
+    def retrieve(grab: int, acquisition_time: int):
+        retrieved[name].append(grab)
+        yield name, grab
+
+    return DerivedStream(name, retrieve, fps)
+
+
+def test_grabs_once_per_iteration():
+    retrieved: Dict[str, List[int]] = {}
+    camera = FakeCamera(90)
+    _drive(camera, [
+        _recording_stream('full', None, retrieved),
+        _recording_stream('slow', 2, retrieved),
+    ])
+
+    assert camera.grabs == 90
+    assert retrieved['full'] == list(range(1, 91))
+
+
+def test_slow_stream_fires_every_fifteenth_grab():
+    retrieved: Dict[str, List[int]] = {}
+    _drive(FakeCamera(300), [_recording_stream('slow', 2, retrieved)])
+
+    grabs = retrieved['slow']
+    assert grabs[0] == 1
+    assert [b - a for a, b in zip(grabs, grabs[1:])] == [15] * (len(grabs) - 1)
+    assert len(grabs) == 20
+
+
+def test_no_stream_retrieves_a_grab_twice():
+    retrieved: Dict[str, List[int]] = {}
+    _drive(FakeCamera(300), [
+        _recording_stream('full', None, retrieved),
+        _recording_stream('slow', 2, retrieved),
+        _recording_stream('medium', 10, retrieved),
+    ])
+
+    for grabs in retrieved.values():
+        assert len(grabs) == len(set(grabs))
+    assert len(retrieved['medium']) == 100
@@ -0,0 +1,16 @@
+import importlib
+
+__all__ = ['color', 'draw', 'feature', 'frame_context', 'helpers', 'sift', 'transform']
+
+
+def __getattr__(name: str):
+    # submodules are imported on first use, so `import vision.utils` stays cheap
+    if name in __all__:
+        module = importlib.import_module(f'{__name__}.{name}')
+        globals()[name] = module
+        return module
+    raise AttributeError(f"module '{__name__}' has no attribute '{name}'")
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
@@ -3,11 +3,10 @@ import ctypes
 import cv2
 import numpy as np
 
-from auv_python_helpers import load_library
-from vision.utils.helpers import as_mat
+from vision.utils.helpers import as_mat, native_library
+from vision.utils import frame_context
 from typing import Callable, Tuple, List
 
-_lib_color_balance = load_library('libauv-color-balance.so')
 
 def _convert_colorspace(conv_type: int) -> Callable[[np.ndarray], Tuple[np.ndarray, List[np.ndarray]]]:
     """Function generator to create colorspace conversion of an image.
@@ -17,10 +16,12 @@ def _convert_colorspace(conv_type: int) -> Callable[[np.ndarray], Tuple[np.ndarr
 
     Returns:
         A function that takes an input image and returns (converted image, target colorspace split).
+        Inside a frame context the conversion and the split are computed once per
+        image and shared, so neither may be modified in place.
     """
     def _inner(mat: np.ndarray) -> Tuple[np.ndarray, List[np.ndarray]]:
-        conv = cv2.cvtColor(mat, conv_type)
-        return conv, cv2.split(conv)
+        conv = frame_context.convert(mat, conv_type)
+        return conv, frame_context.split(conv)
     return _inner
 
 
@@ -403,16 +404,17 @@ def color_correct(mat: np.ndarray,
     c_uint8_p = ctypes.POINTER(ctypes.c_int8)
     data = mat.flatten()
     data_p = data.ctypes.data_as(c_uint8_p)
-    _lib_color_balance.process_frame(data_p, rows, cols, depth, equalize_rgb,
-                                     rgb_contrast_correct, hsv_contrast_correct, hsi_contrast_correct,
-                                     rgb_extrema_clipping, adaptive_cast_correction, horizontal_blocks, vertical_blocks)
+    lib_color_balance = native_library('libauv-color-balance.so')
+    lib_color_balance.process_frame(data_p, rows, cols, depth, equalize_rgb,
+                                    rgb_contrast_correct, hsv_contrast_correct, hsi_contrast_correct,
+                                    rgb_extrema_clipping, adaptive_cast_correction, horizontal_blocks, vertical_blocks)
     # Convert to matrix of original shape
     mat = np.ctypeslib.as_array(data_p, (rows, cols, depth)).astype(np.uint8)
     return mat
 
 
 def white_balance_bgr(bgr_img):
-    lab_img = cv2.cvtColor(bgr_img, cv2.COLOR_BGR2LAB).astype(np.float32)
+    lab_img = frame_context.convert(bgr_img, cv2.COLOR_BGR2LAB).astype(np.float32)
     lab_l, lab_a, lab_b = cv2.split(lab_img)
     a_avg = np.mean(lab_a)
     b_avg = np.mean(lab_b)
@@ -425,7 +427,7 @@ def white_balance_bgr(bgr_img):
 def white_balance_bgr_blur(bgr_img, kernel_size):
     kernel_size //= 2
     kernel_size = 2 * kernel_size + 1
-    lab_img = cv2.cvtColor(bgr_img, cv2.COLOR_BGR2LAB).astype(np.float32)
+    lab_img = frame_context.convert(bgr_img, cv2.COLOR_BGR2LAB).astype(np.float32)
     lab_l, lab_a, lab_b = cv2.split(lab_img)
     lab_a_avg = cv2.blur(lab_a, (kernel_size, kernel_size), 0, borderType=cv2.BORDER_REPLICATE)
     lab_b_avg = cv2.blur(lab_b, (kernel_size, kernel_size), 0, borderType=cv2.BORDER_REPLICATE)
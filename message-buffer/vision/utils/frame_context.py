@@ -0,0 +1,118 @@
+import threading
+import contextlib
+import numpy as np
+
+from typing import Any, Dict, Iterator, Optional, Sequence, Tuple
+
+# opencv is imported on the first conversion, ModuleBase opens a context around
+# every frame and should not load it for modules that never convert
+_local = threading.local()
+
+
+class FrameContext:
+    """
+    Colorspace conversions and channel splits of the frames handled while one
+    frame is processed, computed on first use and shared by every helper that
+    asks for them afterwards. Entries are keyed by the identity of the input
+    image, and the context keeps a reference to it so the identity cannot be
+    reused before the context is released.
+
+    Cached results are shared, so they must be treated as read only, and an
+    image that is modified in place after it was converted would return the
+    stale conversion.
+    """
+
+    def __init__(self):
+        # (id of the input, conversion code) -> (input, result)
+        self._conversions: Dict[Tuple[int, int], Tuple[Any, Any]] = {}
+        # id of the input -> (input, channels)
+        self._splits: Dict[int, Tuple[Any, Sequence[np.ndarray]]] = {}
+
+    def convert(self, mat: np.ndarray, code: int) -> np.ndarray:
+        """
+        Args:
+            mat: image.
+            code: cv2.COLOR_* conversion code.
+
+        Returns:
+            the image converted with cv2.cvtColor.
+        """
+        key = (id(mat), code)
+        entry = self._conversions.get(key)
+        if entry is None:
+            import cv2
+
+            entry = self._conversions[key] = (mat, cv2.cvtColor(mat, code))
+        return entry[1]
+
+    def split(self, mat: np.ndarray, code: Optional[int] = None) -> Sequence[np.ndarray]:
+        """
+        Args:
+            mat: image.
+            code: cv2.COLOR_* conversion applied before splitting, or None to split
+                the image itself.
+
+        Returns:
+            the channels of the (converted) image, as cv2.split returns them.
+        """
+        if code is not None:
+            mat = self.convert(mat, code)
+        entry = self._splits.get(id(mat))
+        if entry is None:
+            import cv2
+
+            entry = self._splits[id(mat)] = (mat, cv2.split(mat))
+        return entry[1]
+
+    def release(self):
+        self._conversions.clear()
+        self._splits.clear()
+
+    @staticmethod
+    def current() -> Optional['FrameContext']:
+        """
+        Returns:
+            the context active on this thread, or None outside of frame_context.
+        """
+        return getattr(_local, 'context', None)
+
+
+@contextlib.contextmanager
+def frame_context() -> Iterator[FrameContext]:
+    """
+    Scope of one frame. Conversions requested through convert and split on this
+    thread are cached until the outermost scope exits, so nested scopes, like the
+    Preprocessor running inside a module's process(), share one cache.
+    """
+    context = FrameContext.current()
+    if context is not None:
+        yield context
+        return
+
+    context = _local.context = FrameContext()
+    try:
+        yield context
+    finally:
+        _local.context = None
+        context.release()
+
+
+def convert(mat: np.ndarray, code: int) -> np.ndarray:
+    """cv2.cvtColor, through the frame context of this thread if there is one"""
+    context = FrameContext.current()
+    if context is None:
+        import cv2
+
+        return cv2.cvtColor(mat, code)
+    return context.convert(mat, code)
+
+
+def split(mat: np.ndarray, code: Optional[int] = None) -> Sequence[np.ndarray]:
+    """cv2.split after an optional cv2.cvtColor, through the frame context of this
+    thread if there is one"""
+    context = FrameContext.current()
+    if context is None:
+        import cv2
+
+        return cv2.split(mat if code is None else cv2.cvtColor(mat, code))
+    return context.split(mat, code)
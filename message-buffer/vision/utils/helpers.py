@@ -1,4 +1,6 @@
 import cv2
+import ctypes
+import functools
 import numpy as np
 
 def to_odd_linear(n:int) -> int:
@@ -67,3 +69,18 @@ def as_mat(mat: cv2.UMat | cv2.Mat) -> cv2.Mat:
     """
     return from_umat(mat) if isinstance(mat, cv2.UMat) else mat
 
+
+@functools.lru_cache(maxsize=None)
+def native_library(name: str) -> ctypes.CDLL:
+    """
+    Loads a native library the first time it is needed, instead of when the
+    module using it is imported. Later calls return the same handle.
+
+    Args:
+        name: file name of the library, e.g. 'libauv-color-balance.so'
+
+    Returns:
+        the loaded library.
+    """
+    from auv_python_helpers import load_library
+    return load_library(name)
@@ -16,7 +16,7 @@ from handlers.shm import SHMHandler, SHMSocketHandler
 from handlers.status import StatusHandler
 from handlers.deadman import DeadmanHandler
 from handlers.admin import AdminHandler, KillHandler
-from handlers.vision import VisionIndexHandler, VisionActiveModulesHandler, VisionModuleHandler, VisionSocketHandler
+from handlers.vision import VisionIndexHandler, VisionActiveModulesHandler, VisionModuleHandler, VisionSocketHandler, VisionPresetHandler
 from handlers.map import MapHandler, MapSocketHandler
 
 DEFAULT_PORT = 8080
@@ -52,6 +52,7 @@ def make_app(debug=False):
         url(r"/vision/([^/]+)", VisionModuleHandler, name="vision_module"),
         url(r"/vision/modules/active", VisionActiveModulesHandler, name="vision active modules"),
         url(r"/vision/ws/([^/]+)", VisionSocketHandler, name="vision websocket"),
+        url(r"/vision/presets/([^/]+)", VisionPresetHandler, name="vision presets"),
         url(r"/map", MapHandler, name="map"),
         url(r"/map/ws", MapSocketHandler, name="map websocket"),
         url(r"/(favicon.ico)", tornado.web.StaticFileHandler, {"path": "static"})
@@ -17,6 +17,7 @@ from webserver import BaseHandler
 from vision import vision_common
 from vision.core.base import ModuleReader
 from vision.core.tuners import TunerBase, IntTuner, DoubleTuner, BoolTuner
+from vision.core.presets import PresetStore, module_class
 
 import shm
 
@@ -47,6 +48,7 @@ class GlobalState:
         mr =  ModuleReader(module_name)
         mr.register_post_udl(self._queue_post_message)
         mr.register_tuner_udl(self._queue_tuner_message)
+        mr.register_stats_udl(self._queue_stats_message)
         mr.run_forever()
 
         self.open_cmfs[module_name] = mr
@@ -106,6 +108,13 @@ class GlobalState:
         for listener in receivers:
             self.message_buffer[listener].append(msg)
         
+    def _queue_stats_message(self, module_name: str, stats: Dict[str, Dict[str, float]]):
+        msg = {'stats': stats}
+
+        receivers = self.websocket_listeners[module_name]
+        for listener in receivers:
+            self.message_buffer[listener].append(msg)
+
     def flush_buffer(self):
         for ws, messages in self.message_buffer.items():
             for message in messages:
@@ -231,3 +240,52 @@ class VisionModuleHandler(BaseHandler):
                         " i.e. It's controlled by a shm variable and that variable is 0")
         else:
             super(VisionModuleHandler, self).write_error(status_code, **kwargs)
+
+
+class VisionPresetHandler(BaseHandler):
+    """ resource with endpoint hosted at /vision/presets/<module name>
+    """
+
+    def _reader(self, module_name: str) -> ModuleReader:
+        if module_name not in GLOBAL_STATE.open_cmfs:
+            raise HTTPError(404)
+        return GLOBAL_STATE.open_cmfs[module_name]
+
+    def get(self, module_name: str):
+        """ returns the presets of the module class, and what each would change
+        in the running module as {tuner: [current, preset]}
+        """
+        current = self._reader(module_name).tuner_values()
+        store = PresetStore(module_class(module_name))
+
+        presets = {}
+        for name in store.names():
+            presets[name] = store.diff(current, store.load(name))
+        self.write(json.dumps({'presets': presets, 'values': current}))
+
+    def post(self, module_name: str):
+        """ takes {"action": "apply" | "save" | "delete", "name": preset name}.
+        Applying queues every value of the preset as one tuner write
+        """
+        reader = self._reader(module_name)
+        store = PresetStore(module_class(module_name))
+
+        try:
+            data = json.loads(self.request.body)
+            action, name = data['action'], data['name']
+        except (ValueError, KeyError):
+            raise HTTPError(400)
+
+        if action == 'apply':
+            try:
+                reader.update_tuner_values(store.load(name))
+            except KeyError:
+                raise HTTPError(404)
+        elif action == 'save':
+            store.save(name, reader.tuner_values())
+        elif action == 'delete':
+            store.delete(name)
+        else:
+            raise HTTPError(400)
+
+        self.write(json.dumps({'presets': store.names()}))
@@ -128,6 +128,100 @@ class ImageContainer extends React.Component {
     }
 }
 
+class StatsTable extends React.Component {
+    render() {
+        const sections = Object.keys(this.props.stats).sort();
+        if (sections.length === 0) {
+            return null;
+        }
+        const fmt = (ms) => ms.toFixed(2);
+        return (
+            <table className="table table-condensed" id="stats">
+                <thead>
+                    <tr><th>Section</th><th>Count</th><th>Mean</th><th>p50</th><th>p95</th><th>p99</th><th>Max (ms)</th></tr>
+                </thead>
+                <tbody>
+                    {sections.map(name => {
+                        const s = this.props.stats[name];
+                        return (
+                            <tr key={name}>
+                                <td>{name}</td><td>{s.count}</td><td>{fmt(s.mean)}</td><td>{fmt(s.p50)}</td>
+                                <td>{fmt(s.p95)}</td><td>{fmt(s.p99)}</td><td>{fmt(s.max)}</td>
+                            </tr>
+                        );
+                    })}
+                </tbody>
+            </table>
+        );
+    }
+}
+
+class PresetBar extends React.Component {
+    constructor(props) {
+        super(props);
+        this.state = {presets: {}, selected: '', newName: ''};
+        this.url = '/vision/presets/' + window.MODULE_NAME;
+        this.refresh = this.refresh.bind(this);
+        this.handleSelect = this.handleSelect.bind(this);
+        this.handleName = this.handleName.bind(this);
+    }
+
+    componentDidMount() {
+        this.refresh();
+    }
+
+    refresh() {
+        $.getJSON(this.url, function(data) {
+            const names = Object.keys(data.presets).sort();
+            const selected = names.indexOf(this.state.selected) !== -1 ? this.state.selected : (names[0] || '');
+            this.setState({presets: data.presets, selected: selected});
+        }.bind(this));
+    }
+
+    send(action, name) {
+        if (name === '') {
+            return;
+        }
+        $.ajax({
+            url: this.url,
+            type: 'POST',
+            contentType: 'application/json',
+            data: JSON.stringify({action: action, name: name}),
+            // applied values reach the module on its next tick
+            success: () => setTimeout(this.refresh, 200),
+        });
+    }
+
+    handleSelect(evt) {
+        this.setState({selected: evt.target.value}, this.refresh);
+    }
+
+    handleName(evt) {
+        this.setState({newName: evt.target.value});
+    }
+
+    render() {
+        const names = Object.keys(this.state.presets).sort();
+        const diff = this.state.presets[this.state.selected] || {};
+        return (
+            <div id="presets" class="margin-left-right">
+                <select value={this.state.selected} onChange={this.handleSelect}>
+                    {names.map(name => <option key={name} value={name}>{name}</option>)}
+                </select>
+                <button class="margin-left-right" onClick={() => this.send('apply', this.state.selected)}>Apply Preset</button>
+                <button class="margin-left-right" onClick={() => this.send('delete', this.state.selected)}>Delete Preset</button>
+                <input type="text" placeholder="preset name" value={this.state.newName} onChange={this.handleName}/>
+                <button class="margin-left-right" onClick={() => this.send('save', this.state.newName)}>Save Preset</button>
+                <ul class="list-unstyled">
+                    {Object.keys(diff).sort().map(name =>
+                        <li key={name}>{name}: {String(diff[name][0])} &rarr; {String(diff[name][1])}</li>
+                    )}
+                </ul>
+            </div>
+        );
+    }
+}
+
 class OptionItem extends React.Component {
     constructor(props) {
         super(props);
@@ -260,6 +354,7 @@ export class VisionModule extends React.Component {
         this.state = {
             images: {},
             options: {},
+            stats: {},
         };
         this.socket = null;
         this.handleOptionUpdate = this.handleOptionUpdate.bind(this);
@@ -324,6 +419,9 @@ export class VisionModule extends React.Component {
                 }
                 this.setState({options: Object.assign({}, this.state.options, {[msg.option_name]: msg})});
             }
+            else if ("stats" in msg) {
+                this.setState({stats: msg.stats});
+            }
         }.bind(this);
         // Dynamically resize grid layout when window is resized
         $(window).resize(resizeGrid);
@@ -349,6 +447,7 @@ export class VisionModule extends React.Component {
                 <span id="coordinate" class="margin-left-right"></span>
                 <span id="color-picker" class="margin-left-right"></span>
                 <div id="color-indicator" class="margin-left-right"></div>
+                <PresetBar/>
                 <div class="row">
                     <div class="col-xs-10">
                     <ul class="list-group row" id="images">
@@ -370,6 +469,7 @@ export class VisionModule extends React.Component {
                     </ul>
                     </div>
                 </div>
+                <StatsTable stats={this.state.stats}/>
             </div>
         );
     }